@@ -0,0 +1,20 @@
+"""电表余额查询工具包
+
+统一的命令行入口为 ``python -m meter_balance <子命令>``：
+
+- query: 查询电表余额（缓存 -> 接口 -> 浏览器），提交低余额提醒并写入数据库
+- ingest: 手动写入一条读数并导出网站数据
+- report: 输出仪表盘摘要，可附带充值记录和耗尽预测
+- daemon: 常驻守护进程，按间隔定时查询多个电表
+- build: 构建Cloudflare Pages部署目录
+- serve: 本地读取接口（最新余额、读数区间和摘要）
+
+各子命令只在执行时才导入所需模块，selenium、smtplib、numpy 等较重的依赖只在真正用到时加载。
+所有模块都在本包内；仓库根目录下的同名脚本只是兼容旧命令的入口。
+"""
+
+import os
+
+
+# 项目根目录：数据文件、数据库、日志、网站文件和缓存目录都放在这里
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
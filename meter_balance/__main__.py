@@ -0,0 +1,9 @@
+"""python -m meter_balance 入口"""
+
+import sys
+
+from meter_balance.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
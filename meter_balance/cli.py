@@ -0,0 +1,141 @@
+"""统一命令行入口：python -m meter_balance {query,ingest,report,daemon,build,serve}
+
+解析参数时不导入任何业务模块，子命令执行时才按 COMMAND_MODULES 导入，
+因此 ingest/report 等不需要浏览器的命令不会加载 selenium。
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+from datetime import datetime
+
+
+# 各子命令执行时导入的模块（启动基准测试按此测量导入耗时）
+COMMAND_MODULES = {
+    "query": ("meter_balance.query",),
+    "ingest": ("meter_balance.update_meter_data",),
+    "report": ("meter_balance.update_meter_data", "meter_balance.meter_summary"),
+    "daemon": ("meter_balance.meter_daemon",),
+    "build": ("meter_balance.meter_site",),
+    "serve": ("meter_balance.meter_server",),
+}
+
+
+def load_command_modules(command):
+    """导入子命令所需的模块，按 COMMAND_MODULES 中的顺序返回"""
+    return [importlib.import_module(name) for name in COMMAND_MODULES[command]]
+
+
+def beijing_time(value):
+    """解析北京时间 'YYYY-MM-DD HH:MM:SS'"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的读数时间: {value}")
+
+
+def cmd_query(args):
+    """查询电表余额"""
+    if args.engine:
+        os.environ["METER_ENGINE"] = args.engine
+    (query,) = load_command_modules("query")
+    return query.main(force_refresh=args.force_refresh or None, save=not args.no_save)
+
+
+def cmd_ingest(args):
+    """手动写入一条读数并导出网站数据"""
+    (update_meter_data,) = load_command_modules("ingest")
+    logger = update_meter_data.setup_logging()
+    meter = args.meter or update_meter_data.DEFAULT_METER
+    timestamp = args.time or update_meter_data.get_beijing_time()
+    if update_meter_data.ingest_readings([(meter, timestamp, args.balance)], export=not args.no_export):
+        logger.info(f"已写入电表 {meter} 的读数: {args.balance} 度")
+        return 0
+    logger.error("数据更新失败")
+    return 1
+
+
+def cmd_report(args):
+    """输出仪表盘摘要（JSON）"""
+    update_meter_data, meter_summary = load_command_modules("report")
+    meter = args.meter or update_meter_data.DEFAULT_METER
+    with update_meter_data.open_store() as store:
+        report = meter_summary.build_summary(store, meter)
+        if args.hours:
+            report["hourly"] = store.hourly_series(meter)[-args.hours:]
+        if args.forecast:
+            # 充值识别和耗尽预测依赖numpy，只在需要时导入
+            from meter_balance import meter_analytics
+
+            report["analytics"] = meter_analytics.analyze(meter_analytics.load_series(store, [meter]))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_daemon(args):
+    """运行常驻守护进程"""
+    (meter_daemon,) = load_command_modules("daemon")
+    return meter_daemon.main(args.config)
+
+
+def cmd_build(args):
+    """构建Cloudflare Pages部署目录"""
+    (meter_site,) = load_command_modules("build")
+    return meter_site.main(args.output or meter_site.DEFAULT_OUTPUT_DIR)
+
+
+def cmd_serve(args):
+    """运行本地读取接口"""
+    (meter_server,) = load_command_modules("serve")
+    return meter_server.main(args.host, args.port)
+
+
+def build_parser():
+    """构造命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="meter_balance", description="电表余额查询工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query = subparsers.add_parser("query", help="查询电表余额")
+    query.add_argument("--force-refresh", action="store_true", help="跳过读数缓存，总是重新查询")
+    query.add_argument("--no-save", action="store_true", help="只查询和提醒，不写入数据库")
+    query.add_argument("--engine", choices=("auto", "http", "selenium"), help="查询引擎（默认读取 METER_ENGINE）")
+    query.set_defaults(func=cmd_query)
+
+    ingest = subparsers.add_parser("ingest", help="手动写入一条读数")
+    ingest.add_argument("balance", type=float, help="电表余额（度）")
+    ingest.add_argument("--meter", help="电表名称（默认为默认电表）")
+    ingest.add_argument("--time", type=beijing_time, help="读数时间 YYYY-MM-DD HH:MM:SS（北京时间，默认为当前时间）")
+    ingest.add_argument("--no-export", action="store_true", help="只写入数据库，不导出网站数据")
+    ingest.set_defaults(func=cmd_ingest)
+
+    report = subparsers.add_parser("report", help="输出仪表盘摘要")
+    report.add_argument("--meter", help="电表名称（默认为默认电表）")
+    report.add_argument("--forecast", action="store_true", help="附带充值记录和余额耗尽预测")
+    report.add_argument("--hours", type=int, metavar="N", help="附带最近 N 个有读数的小时的余额和用电量")
+    report.set_defaults(func=cmd_report)
+
+    daemon = subparsers.add_parser("daemon", help="常驻守护进程，定时查询多个电表")
+    daemon.add_argument("config", nargs="?", help="电表配置文件（默认读取 METER_CONFIG）")
+    daemon.set_defaults(func=cmd_daemon)
+
+    build = subparsers.add_parser("build", help="构建Cloudflare Pages部署目录")
+    build.add_argument("output", nargs="?", help="输出目录（默认 dist）")
+    build.set_defaults(func=cmd_build)
+
+    serve = subparsers.add_parser("serve", help="运行本地读取接口")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8787)
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    """主函数"""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""预热的WebDriver实例池：在查询和重试之间复用浏览器，避免反复冷启动"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _read_proc_children():
+    """读取 /proc 中所有进程的父进程关系，返回 {ppid: [pid, ...]}"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名可能包含空格，从最后一个右括号之后解析
+        fields = stat[stat.rfind(")") + 2:].split()
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def _read_rss_kb(pid):
+    """读取单个进程的常驻内存（KB）"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss_mb(pid):
+    """统计进程及其所有子进程的常驻内存（MB），非Linux系统返回None"""
+    if not pid or not os.path.isdir("/proc"):
+        return None
+    children = _read_proc_children()
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total_kb += _read_rss_kb(current)
+        stack.extend(children.get(current, []))
+    return total_kb / 1024
+
+
+def driver_rss_mb(driver):
+    """统计一个WebDriver（驱动进程及浏览器子进程）占用的内存（MB）"""
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        return None
+    return process_tree_rss_mb(pid)
+
+
+class DriverPool:
+    """WebDriver实例池
+
+    - 实例归还时清理cookie和存储并跳转到空白页，下次直接复用
+    - 取出前做健康检查，崩溃的实例会被丢弃并重新启动
+    - 实例使用 max_uses 次后回收重启
+    - 池内浏览器总内存超过 max_memory_mb 时不再启动新实例，归还的实例直接回收
+    """
+
+    def __init__(self, factory, max_size=1, max_uses=20, max_memory_mb=None):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.logger = logging.getLogger(__name__)
+        self._drivers = {}
+        self._uses = {}
+        self._idle = []
+        self._launching = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    @property
+    def size(self):
+        """池中实例总数（空闲+使用中）"""
+        return len(self._drivers)
+
+    def acquire(self, timeout=None):
+        """取出一个可用实例，没有空闲实例且未达上限时启动新实例"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("WebDriver池已关闭")
+                    if self._idle:
+                        driver = self._idle.pop()
+                        break
+                    if len(self._drivers) + self._launching < self.max_size and (
+                        not self._drivers or not self._over_memory_limit()
+                    ):
+                        driver = None
+                        self._launching += 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("等待可用WebDriver超时")
+                    self._condition.wait(remaining)
+
+            if driver is not None:
+                if not self._is_healthy(driver):
+                    self.logger.warning("空闲浏览器实例健康检查失败，丢弃并重新启动")
+                    self._discard(driver)
+                    continue
+            else:
+                try:
+                    driver = self._launch()
+                finally:
+                    with self._condition:
+                        self._launching -= 1
+                        self._condition.notify()
+                with self._condition:
+                    self._drivers[id(driver)] = driver
+                    self._uses[id(driver)] = 0
+
+            with self._condition:
+                self._uses[id(driver)] += 1
+            return driver
+
+    def release(self, driver, healthy=True):
+        """归还实例，实例异常、用满次数或内存超限时回收"""
+        if driver is None:
+            return
+        uses = self._uses.get(id(driver), 0)
+        recycle_reason = None
+        if not healthy or not self._is_healthy(driver):
+            recycle_reason = "实例异常"
+        elif self.max_uses and uses >= self.max_uses:
+            recycle_reason = f"已使用 {uses} 次"
+        elif self._over_memory_limit():
+            recycle_reason = "内存超出上限"
+        elif not self._reset(driver):
+            recycle_reason = "状态重置失败"
+
+        if recycle_reason or self._closed:
+            if recycle_reason:
+                self.logger.info(f"回收浏览器实例: {recycle_reason}")
+            self._discard(driver)
+            return
+
+        with self._condition:
+            self._idle.append(driver)
+            self._condition.notify()
+
+    def discard(self, driver, quit=True):
+        """不再归还、直接回收实例（quit=False 表示实例已被关闭，只清理记录）"""
+        if driver is None:
+            return
+        if quit:
+            self._discard(driver)
+            return
+        with self._condition:
+            self._drivers.pop(id(driver), None)
+            self._uses.pop(id(driver), None)
+            self._condition.notify()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """以上下文管理器方式使用实例，出现异常时仍归还并由健康检查决定是否回收"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def memory_mb(self):
+        """池内所有浏览器实例占用的内存（MB），无法统计时返回None"""
+        with self._condition:
+            drivers = list(self._drivers.values())
+        total = None
+        for driver in drivers:
+            rss = driver_rss_mb(driver)
+            if rss is not None:
+                total = (total or 0) + rss
+        return total
+
+    def close(self):
+        """关闭所有空闲实例，使用中的实例归还时关闭"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+    def _launch(self):
+        self.logger.info("启动新的浏览器实例...")
+        start = time.monotonic()
+        driver = self.factory()
+        self.logger.info(f"浏览器实例启动完成，耗时 {time.monotonic() - start:.2f}秒")
+        return driver
+
+    def _discard(self, driver):
+        with self._condition:
+            self._drivers.pop(id(driver), None)
+            self._uses.pop(id(driver), None)
+            self._condition.notify()
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.error(f"关闭浏览器时出错: {str(e)}")
+
+    def _is_healthy(self, driver):
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def _reset(self, driver):
+        """清理cookie、本地存储并回到空白页，保留磁盘缓存"""
+        try:
+            try:
+                driver.execute_script(
+                    "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+                )
+            except Exception:
+                pass
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            self.logger.warning(f"重置浏览器状态失败: {str(e)}")
+            return False
+
+    def _over_memory_limit(self):
+        if not self.max_memory_mb:
+            return False
+        total = self.memory_mb()
+        return total is not None and total >= self.max_memory_mb
@@ -0,0 +1,88 @@
+"""精简页面加载模式：通过DevTools屏蔽非必要资源，使用eager加载策略并复用持久化的磁盘缓存
+
+设置 METER_LEAN_MODE=1 开启。只有查询余额所需的HTML、JS和接口请求会真正下载，
+图片、字体、样式表、音视频和统计脚本在浏览器内直接被拦截，不经过webvpn代理。
+"""
+
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+from meter_balance import PROJECT_DIR
+
+
+# 默认屏蔽的URL模式（DevTools Network.setBlockedURLs 通配符语法）
+DEFAULT_BLOCKED_PATTERNS = (
+    # 图片
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    # 字体
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # 样式表
+    "*.css",
+    # 音视频
+    "*.mp3", "*.mp4", "*.webm",
+    # 统计脚本
+    "*hm.baidu.com*", "*google-analytics.com*", "*googletagmanager.com*",
+    "*cnzz.com*", "*umeng.com*",
+)
+
+# 通过Resource Timing统计本页面实际传输的字节数（同源资源才有transferSize）
+TRANSFER_STATS_JS = """
+var entries = performance.getEntriesByType('navigation').concat(
+    performance.getEntriesByType('resource'));
+var stats = { bytes: 0, resources: 0, cached: 0 };
+entries.forEach(function (entry) {
+    stats.resources++;
+    stats.bytes += entry.transferSize || 0;
+    if (!entry.transferSize && entry.decodedBodySize > 0) { stats.cached++; }
+});
+return stats;
+"""
+
+
+def lean_mode_enabled():
+    """是否开启精简加载模式（环境变量 METER_LEAN_MODE=1）"""
+    return os.environ.get("METER_LEAN_MODE") == "1"
+
+
+def get_blocked_patterns():
+    """屏蔽的URL模式，可通过 METER_LEAN_BLOCK（逗号分隔）追加"""
+    extra = os.environ.get("METER_LEAN_BLOCK", "")
+    return list(DEFAULT_BLOCKED_PATTERNS) + [p.strip() for p in extra.split(",") if p.strip()]
+
+
+def get_browser_cache_dir():
+    """浏览器磁盘缓存目录，可通过 METER_BROWSER_CACHE_DIR 修改"""
+    return os.environ.get("METER_BROWSER_CACHE_DIR", os.path.join(PROJECT_DIR, ".browser_cache"))
+
+
+def apply_lean_options(options, cache_dir=None):
+    """为浏览器选项设置eager加载策略和持久化磁盘缓存"""
+    cache_dir = cache_dir or get_browser_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    # DOMContentLoaded后即返回，不等待图片等子资源
+    options.page_load_strategy = "eager"
+    # 多次启动浏览器之间复用已下载的JS包
+    options.add_argument(f"--disk-cache-dir={cache_dir}")
+    options.add_argument("--disk-cache-size=104857600")
+    return options
+
+
+def enable_request_blocking(driver, patterns=None):
+    """通过DevTools拦截匹配的请求，成功返回True"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": list(patterns or get_blocked_patterns())}
+        )
+        return True
+    except (WebDriverException, AttributeError):
+        return False
+
+
+def measure_transfer(driver):
+    """当前页面传输的字节数、资源数和命中缓存的资源数，失败时返回空字典"""
+    try:
+        return driver.execute_script(TRANSFER_STATS_JS) or {}
+    except WebDriverException:
+        return {}
@@ -0,0 +1,295 @@
+"""余额不足警告邮件：后台线程异步发送，同一批警告复用一个已登录的SMTP连接，并按电表去重和限频
+
+- 电表余额从正常变为低于阈值时立即提醒；持续低于阈值时最多每 METER_ALERT_REPEAT_HOURS 小时重复一次
+- 余额恢复到阈值以上后状态重置，下次再低于阈值时重新提醒
+- 提醒状态保存在 alert_state.json 中，跨运行生效
+
+smtplib 和 email 只在真正发送邮件时导入，余额正常时不会加载。
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_files import write_atomic
+from meter_balance.meter_metrics import span
+from meter_balance.meter_store import DEFAULT_METER
+
+
+DEFAULT_THRESHOLD = 50  # 低于该值（度）发送警告
+DEFAULT_REPEAT_HOURS = 72
+DEFAULT_SMTP_HOST = "smtp.gmail.com"
+DEFAULT_SMTP_PORT = 587
+BATCH_WINDOW = 1.0  # 收到第一条警告后再等待多久收集同一批的其他警告（秒）
+IDLE_TIMEOUT = 60.0  # SMTP连接空闲多久后断开（秒）
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_state_file_path():
+    """获取提醒状态文件路径"""
+    return os.path.join(PROJECT_DIR, "alert_state.json")
+
+
+def build_alert_message(sender_email, receiver_email, alerts):
+    """生成警告邮件，多个电表的警告合并为一封"""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    beijing_time = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=8)))
+
+    message = MIMEMultipart()
+    message["From"] = sender_email
+    message["To"] = receiver_email
+    message["Subject"] = f"电表余额不足警告 - {beijing_time.strftime('%Y-%m-%d')}"
+
+    if len(alerts) == 1 and alerts[0]["meter"] == DEFAULT_METER:
+        alert = alerts[0]
+        lines = f"警告：当前电表余额为 {alert['balance']} 度，已低于{alert['threshold']:g}度，请及时充值！"
+    else:
+        lines = "\n    ".join(
+            f"警告：电表 {alert['meter']} 当前余额为 {alert['balance']} 度，"
+            f"已低于{alert['threshold']:g}度，请及时充值！"
+            for alert in alerts
+        )
+    body = f"""
+    {lines}
+
+    此邮件由GitHub Actions自动发送于 {beijing_time.strftime("%Y-%m-%d %H:%M:%S")} (北京时间)
+    """
+    message.attach(MIMEText(body, "plain"))
+    return message
+
+
+class AlertDispatcher:
+    """异步警告邮件发送器
+
+    submit() 只做去重判断并放入队列，立即返回；后台线程把同一批警告合并后
+    通过一个保持登录的SMTP连接发送。flush()/close() 等待已提交的警告发送完成。
+    """
+
+    def __init__(self, host=DEFAULT_SMTP_HOST, port=DEFAULT_SMTP_PORT, sender_email=None,
+                 sender_password=None, receiver_email=None, starttls=True, state_file=None,
+                 threshold=DEFAULT_THRESHOLD, repeat_hours=DEFAULT_REPEAT_HOURS,
+                 batch_window=BATCH_WINDOW, idle_timeout=IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.receiver_email = receiver_email
+        self.starttls = starttls
+        self.state_file = state_file
+        self.threshold = threshold
+        self.repeat_seconds = repeat_hours * 3600
+        self.batch_window = batch_window
+        self.idle_timeout = idle_timeout
+        self.logger = logging.getLogger(__name__)
+        self.sent = 0
+        self._queue = queue.Queue()
+        self._state_lock = threading.Lock()
+        self._state = self._load_state()
+        self._smtp = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="alerts", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls):
+        """根据环境变量创建发送器
+
+        SMTP_HOST/SMTP_PORT 指定SMTP服务器（默认Gmail），SMTP_STARTTLS=0 关闭STARTTLS（本地测试用），
+        METER_ALERT_THRESHOLD/METER_ALERT_REPEAT_HOURS 设置阈值和重复提醒间隔。
+        """
+        return cls(
+            host=os.environ.get("SMTP_HOST", DEFAULT_SMTP_HOST),
+            port=int(os.environ.get("SMTP_PORT", DEFAULT_SMTP_PORT)),
+            sender_email=os.environ.get("SENDER_EMAIL"),
+            sender_password=os.environ.get("SENDER_PASSWORD"),
+            receiver_email=os.environ.get("RECEIVER_EMAIL"),
+            starttls=os.environ.get("SMTP_STARTTLS", "1") != "0",
+            state_file=os.environ.get("METER_ALERT_STATE", get_state_file_path()),
+            threshold=float(os.environ.get("METER_ALERT_THRESHOLD", DEFAULT_THRESHOLD)),
+            repeat_hours=float(os.environ.get("METER_ALERT_REPEAT_HOURS", DEFAULT_REPEAT_HOURS)),
+        )
+
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"提醒状态文件读取失败，将重新记录: {str(e)}")
+            return {}
+
+    def _save_state(self):
+        """保存提醒状态；写入失败只记录日志，不影响调用方写入读数（本进程内的去重仍然有效）"""
+        if not self.state_file:
+            return
+        content = json.dumps(self._state, ensure_ascii=False, indent=2, sort_keys=True)
+        try:
+            write_atomic(self.state_file, content.encode("utf-8"))
+        except OSError as e:
+            self.logger.error(f"保存提醒状态失败: {str(e)}")
+
+    def submit(self, meter, balance, now=None):
+        """提交一次余额读数，需要提醒时放入发送队列，返回是否会发送警告"""
+        now = now or time.time()
+        balance = float(balance)
+        if balance < self.threshold and not (self.sender_email and self.receiver_email):
+            self.logger.warning("邮箱配置不完整，无法发送警告邮件")
+            return False
+        with self._state_lock:
+            state = self._state.get(meter, {})
+            if balance >= self.threshold:
+                # 余额恢复，下次低于阈值时重新提醒
+                if state.get("low"):
+                    self._state[meter] = {"low": False}
+                    self._save_state()
+                return False
+
+            last_sent = state.get("last_sent", 0) if state.get("low") else 0
+            if now - last_sent < self.repeat_seconds:
+                self.logger.info(f"电表 {meter} 余额仍低于{self.threshold:g}度，距上次提醒不足间隔，跳过")
+                return False
+            # 先记录状态，同一批中重复提交的警告会被去重
+            self._state[meter] = {"low": True, "last_sent": now, "balance": balance}
+            self._save_state()
+
+        self._queue.put({"meter": meter, "balance": balance, "threshold": self.threshold})
+        return True
+
+    def flush(self, timeout=None):
+        """等待已提交的警告全部发送完成"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=60):
+        """发送完剩余警告后停止后台线程并断开SMTP连接"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if item is None:
+                self._queue.task_done()
+                self._disconnect()
+                return
+
+            # 收集同一批中的其他警告，合并成一封邮件
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            stop = False
+            while True:
+                try:
+                    extra = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if extra is None:
+                    stop = True
+                    break
+                batch.append(extra)
+
+            try:
+                self._send(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                self._disconnect()
+                return
+
+    def _connect(self):
+        import smtplib
+
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except smtplib.SMTPException:
+                self._disconnect()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            smtp.starttls()
+        if self.sender_password:
+            smtp.login(self.sender_email, self.sender_password)
+        self._smtp = smtp
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        import smtplib
+
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+    def _mark_failed(self, alerts):
+        """发送失败时撤销提醒记录，下次读数时重新尝试"""
+        with self._state_lock:
+            for alert in alerts:
+                self._state.pop(alert["meter"], None)
+            self._save_state()
+
+    def _send(self, alerts):
+        import smtplib
+
+        if not self.sender_email or not self.receiver_email:
+            self.logger.warning("邮箱配置不完整，无法发送警告邮件")
+            return False
+        message = build_alert_message(self.sender_email, self.receiver_email, alerts)
+        meters = ", ".join(alert["meter"] for alert in alerts)
+        for attempt in range(2):
+            try:
+                with span("email_send", alerts=len(alerts), attempt=attempt + 1):
+                    self._connect().send_message(message)
+                self.sent += 1
+                self.logger.info(f"警告邮件发送成功！（电表: {meters}）")
+                return True
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                # 保持的连接可能已被服务器断开，重新连接后再试一次
+                self._disconnect()
+                error = e
+            except Exception as e:
+                self._disconnect()
+                error = e
+                break
+        self.logger.error(f"发送邮件时出错: {str(error)}")
+        self._mark_failed(alerts)
+        return False
+
+
+def get_dispatcher():
+    """获取进程内共享的警告发送器（首次调用时创建，进程退出前发送完剩余警告）"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher.from_env()
+            atexit.register(_dispatcher.close)
+        return _dispatcher
@@ -0,0 +1,216 @@
+"""用电分析：基于数组的批量余额序列，识别充值、还原真实日用电量并预测余额耗尽日期
+
+所有计算都对全部电表一次性向量化完成，不逐条循环。
+"""
+
+import json
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from meter_balance.meter_store import DEFAULT_METER
+
+
+# 按 (电表, 日期) 升序排列的余额序列
+# meters: 电表名称列表; meter_idx: 每条读数所属电表的下标; day: 距1970-01-01的天数; balance: 余额
+BalanceSeries = namedtuple("BalanceSeries", ["meters", "meter_idx", "day", "balance"])
+
+# 每个区间（相邻两条读数之间）的分析结果，与读数一一对应，每个电表第一条读数处为NaN
+Consumption = namedtuple("Consumption", ["usage", "daily_rate", "recharge", "recharge_amount"])
+
+DEFAULT_RECHARGE_THRESHOLD = 1.0  # 余额上涨超过该值（度）视为充值
+DEFAULT_FORECAST_WINDOW = 14  # 预测使用最近多少天的用电量
+DEFAULT_Z = 1.96  # 95% 置信区间
+
+
+def series_from_arrays(meter_names, meter_idx, dates, balance):
+    """由原始数组构建按 (电表, 日期) 排序的余额序列，dates 可以是 'YYYY-MM-DD' 字符串或天数"""
+    meter_idx = np.asarray(meter_idx, dtype=np.int64)
+    dates = np.asarray(dates)
+    if dates.dtype.kind in "UOS":
+        day = dates.astype("datetime64[D]").astype(np.int64)
+    else:
+        day = dates.astype(np.int64)
+    balance = np.asarray(balance, dtype=np.float64)
+
+    # 已经有序时跳过排序
+    key = (meter_idx << 32) + day
+    if len(key) > 1 and not np.all(key[1:] >= key[:-1]):
+        order = np.argsort(key, kind="stable")
+        meter_idx, day, balance = meter_idx[order], day[order], balance[order]
+    return BalanceSeries(list(meter_names), meter_idx, day, balance)
+
+
+def load_series(store, meters=None):
+    """从数据库一次性读取多个电表的日余额序列"""
+    meters = meters or store.meters()
+    index = {meter: i for i, meter in enumerate(meters)}
+    rows = [
+        (index[meter], date, balance)
+        for meter in meters
+        for date, balance in store.daily_series(meter)
+    ]
+    if not rows:
+        return series_from_arrays(meters, [], np.array([], dtype=np.int64), [])
+    meter_idx, dates, balance = zip(*rows)
+    return series_from_arrays(meters, meter_idx, np.array(dates), balance)
+
+
+def _segment_starts(series):
+    """每条读数是否为所属电表的第一条"""
+    first = np.ones(len(series.meter_idx), dtype=bool)
+    first[1:] = series.meter_idx[1:] != series.meter_idx[:-1]
+    return first
+
+
+def _per_meter_sum(series, values):
+    """按电表对数组求和"""
+    return np.bincount(series.meter_idx, weights=values, minlength=len(series.meters))
+
+
+def _intervals(series):
+    """相邻读数之间的天数和余额下降量，每个电表第一条读数处为0"""
+    first = _segment_starts(series)
+    gap = np.zeros(len(series.day))
+    drop = np.zeros(len(series.balance))
+    np.subtract(series.day[1:], series.day[:-1], out=gap[1:])
+    np.subtract(series.balance[:-1], series.balance[1:], out=drop[1:])
+    gap[first] = 0
+    drop[first] = 0
+    return first, gap, drop
+
+
+def reconstruct_consumption(series, recharge_threshold=DEFAULT_RECHARGE_THRESHOLD):
+    """识别充值并还原真实用电量
+
+    相邻读数余额上涨超过阈值视为充值。充值区间内的用电量按该电表非充值区间的
+    平均日用电量估算，充值金额 = 余额上涨量 + 估算用电量。
+    小幅上涨（读数噪声）按0用电处理。
+    """
+    first, gap, drop = _intervals(series)
+    recharge = drop < -recharge_threshold
+    positive = np.maximum(drop, 0.0)
+
+    # 每个电表非充值区间的平均日用电量
+    usage_sum = _per_meter_sum(series, positive)
+    gap_sum = _per_meter_sum(series, np.where(recharge, 0.0, gap))
+    baseline = np.divide(usage_sum, gap_sum, out=np.zeros_like(usage_sum), where=gap_sum > 0)
+
+    estimated = baseline[series.meter_idx] * gap
+    usage = np.where(recharge, estimated, positive)
+    usage[first] = np.nan
+    recharge_amount = np.where(recharge, estimated - drop, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_rate = usage / gap
+
+    return Consumption(usage, daily_rate, recharge, recharge_amount)
+
+
+def detect_recharges(series, consumption=None, recharge_threshold=DEFAULT_RECHARGE_THRESHOLD):
+    """返回所有充值事件 [{meter, date, amount}]"""
+    if consumption is None:
+        consumption = reconstruct_consumption(series, recharge_threshold)
+    positions = np.flatnonzero(consumption.recharge)
+    meters = [series.meters[i] for i in series.meter_idx[positions].tolist()]
+    dates = series.day[positions].astype("datetime64[D]").astype(str).tolist()
+    amounts = np.round(consumption.recharge_amount[positions], 2).tolist()
+    return [
+        {"meter": meter, "date": date, "amount": amount}
+        for meter, date, amount in zip(meters, dates, amounts)
+    ]
+
+
+def forecast_depletion(series, consumption=None, window=DEFAULT_FORECAST_WINDOW, z=DEFAULT_Z,
+                       recharge_threshold=DEFAULT_RECHARGE_THRESHOLD):
+    """预测每个电表余额耗尽的日期及置信区间
+
+    使用最近 window 天内的日用电量：平均日用电量 = 用电量之和 / 天数之和，
+    置信区间由日用电量的标准误差给出（rate ± z * se）。
+    """
+    m = len(series.meters)
+    if len(series.balance) == 0:
+        return []
+    if consumption is None:
+        consumption = reconstruct_consumption(series, recharge_threshold)
+    first, gap, _ = _intervals(series)
+
+    # 每个电表最后一条读数
+    last = np.empty(m, dtype=np.int64)
+    last.fill(-1)
+    last[series.meter_idx] = np.arange(len(series.balance))
+    has_data = last >= 0
+    last_safe = np.where(has_data, last, 0)
+    last_day = series.day[last_safe]
+    last_balance = series.balance[last_safe]
+
+    in_window = ~first & (series.day > last_day[series.meter_idx] - window)
+    window_gap = np.where(in_window, gap, 0.0)
+
+    usage_sum = _per_meter_sum(series, np.where(in_window, consumption.usage, 0.0))
+    days = _per_meter_sum(series, window_gap)
+    count = _per_meter_sum(series, in_window.astype(np.float64))
+    rate = np.divide(usage_sum, days, out=np.zeros(m), where=days > 0)
+
+    # 按天数加权的日用电量方差
+    deviation = np.where(in_window, consumption.daily_rate - rate[series.meter_idx], 0.0)
+    var_sum = _per_meter_sum(series, window_gap * deviation ** 2)
+    variance = np.divide(var_sum, days, out=np.zeros(m), where=days > 0)
+    se = np.sqrt(variance) / np.sqrt(np.maximum(count, 1))
+
+    rate_low = np.maximum(rate - z * se, 0.0)
+    rate_high = rate + z * se
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(rate > 0, last_balance / rate, np.inf)
+        days_early = np.where(rate_high > 0, last_balance / rate_high, np.inf)
+        days_late = np.where(rate_low > 0, last_balance / rate_low, np.inf)
+
+    def to_dates(offsets):
+        finite = np.isfinite(offsets)
+        days = last_day + np.floor(np.where(finite, offsets, 0)).astype(np.int64)
+        return np.where(finite, days.astype("datetime64[D]").astype(str), None).tolist()
+
+    last_dates = last_day.astype("datetime64[D]").astype(str).tolist()
+    depletion = to_dates(days_left)
+    early = to_dates(days_early)
+    late = to_dates(days_late)
+
+    return [
+        {
+            "meter": series.meters[i],
+            "last_date": last_dates[i],
+            "balance": round(float(last_balance[i]), 2),
+            "daily_usage": round(float(rate[i]), 3),
+            "daily_usage_band": [round(float(rate_low[i]), 3), round(float(rate_high[i]), 3)],
+            "days_left": round(float(days_left[i]), 1) if np.isfinite(days_left[i]) else None,
+            "depletion_date": depletion[i],
+            "depletion_band": [early[i], late[i]],
+        }
+        for i in np.flatnonzero(has_data)
+    ]
+
+
+def analyze(series, recharge_threshold=DEFAULT_RECHARGE_THRESHOLD, window=DEFAULT_FORECAST_WINDOW):
+    """一次性完成充值识别、用电量还原和耗尽预测"""
+    consumption = reconstruct_consumption(series, recharge_threshold)
+    return {
+        "recharges": detect_recharges(series, consumption),
+        "forecasts": forecast_depletion(series, consumption, window=window),
+    }
+
+
+def main():
+    """主函数：输出数据库中所有电表的充值记录和耗尽预测（JSON）"""
+    from meter_balance.update_meter_data import open_store
+
+    meters = sys.argv[1:] or None
+    with open_store() as store:
+        series = load_series(store, meters or store.meters() or [DEFAULT_METER])
+
+    print(json.dumps(analyze(series), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
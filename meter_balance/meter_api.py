@@ -0,0 +1,206 @@
+"""直接调用电表查询后端接口获取余额（无需启动浏览器）"""
+
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from meter_balance.retry_policy import GATEWAY, classify_error
+
+
+# webvpn 网关地址，可通过 METER_BASE_URL 指向本地桩服务器进行测试
+DEFAULT_BASE_URL = "https://zndk-443.webvpn.tjise.edu.cn"
+# 电表查询页面（uni-app 单页应用）
+PAGE_PATH = "/electricmeter/index.html#/pages/meterlist/meterquery"
+# 查询按钮在页面中调用的后端JSON接口，如接口路径变化可通过 METER_API_PATH 覆盖
+DEFAULT_API_PATH = "/electricmeter/api/meterquery"
+# 接口返回的 data 对象中表示剩余电量的字段名，按优先级排列
+BALANCE_KEYS = ("remainPower", "remainValue", "surplus")
+# 接口返回中表示查询成功的 code
+SUCCESS_CODES = (0, 200, "0", "200")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_base_url():
+    """获取网关地址"""
+    return os.environ.get("METER_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def build_query_params(wechat_user_openid, meter_id, elemeter_type_remark):
+    """构造与页面一致的查询参数"""
+    return {
+        "wechatUserOpenid": wechat_user_openid,
+        "meterId": meter_id,
+        "elemeterTypeRemark": elemeter_type_remark,
+    }
+
+
+def build_page_url(wechat_user_openid, meter_id, elemeter_type_remark):
+    """构造电表查询页面的完整URL"""
+    params = build_query_params(wechat_user_openid, meter_id, elemeter_type_remark)
+    query = "&".join([f"{k}={v}" for k, v in params.items()])
+    return f"{get_base_url()}{PAGE_PATH}?{query}"
+
+
+def get_session():
+    """获取复用连接池的HTTP会话"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(
+                total=2,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=("GET", "POST"),
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(
+                {
+                    "Accept": "application/json, text/plain, */*",
+                    "User-Agent": "Mozilla/5.0 (meter-balance)",
+                }
+            )
+            _session = session
+        return _session
+
+
+def close_session():
+    """关闭HTTP会话，释放连接池"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def to_balance(value):
+    """数字或数字字符串转换为余额字符串，其他值返回None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, str) and value.strip():
+        try:
+            float(value)
+            return value.strip()
+        except ValueError:
+            pass
+    return None
+
+
+def find_key(payload, key):
+    """在嵌套的字典和列表中查找第一个名为 key 的字段的余额值"""
+    if isinstance(payload, dict):
+        balance = to_balance(payload.get(key))
+        if balance is not None:
+            return balance
+        children = payload.values()
+    elif isinstance(payload, list):
+        children = payload
+    else:
+        return None
+
+    for child in children:
+        if isinstance(child, (dict, list)):
+            balance = find_key(child, key)
+            if balance is not None:
+                return balance
+    return None
+
+
+def lookup_path(payload, path):
+    """按 'data.remainPower' 形式的路径取值（列表用数字下标），路径不存在时返回None"""
+    value = payload
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return None
+    return value
+
+
+def extract_balance(payload, key=None):
+    """从接口返回的JSON中提取剩余电量，返回结构不符合预期时返回None
+
+    key（METER_API_BALANCE_KEY）为 'data.remainPower' 形式的路径时只取该位置的值，
+    为单个字段名时在整个返回中查找该字段。未指定时要求返回带表示成功的 code，
+    并且 data 对象中有已知的剩余电量字段：网关登录页、错误响应或其他接口返回中
+    无关的数字不会被当作余额保存或触发低余额提醒。
+    """
+    if key:
+        if "." in key:
+            return to_balance(lookup_path(payload, key))
+        return find_key(payload, key)
+
+    if not isinstance(payload, dict) or payload.get("code") not in SUCCESS_CODES:
+        return None
+    data = payload.get("data")
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    if not isinstance(data, dict):
+        return None
+    for k in BALANCE_KEYS:
+        balance = to_balance(data.get(k))
+        if balance is not None:
+            return balance
+    return None
+
+
+def _is_gateway_failure(error):
+    """超时、连接失败和5xx响应说明网关不可用"""
+    response = getattr(error, "response", None)
+    if response is not None and response.status_code >= 500:
+        return True
+    return classify_error(error) == GATEWAY
+
+
+def fetch_balance(wechat_user_openid, meter_id, elemeter_type_remark, timeout=15, breaker=None):
+    """调用后端接口查询电表余额，成功返回余额字符串，失败返回None
+
+    传入 breaker（网关熔断器）时，熔断期间不发起请求，网关错误计入熔断器。
+    """
+    logger = logging.getLogger(__name__)
+    url = get_base_url() + os.environ.get("METER_API_PATH", DEFAULT_API_PATH)
+    method = os.environ.get("METER_API_METHOD", "GET").upper()
+    params = build_query_params(wechat_user_openid, meter_id, elemeter_type_remark)
+
+    if breaker is not None and not breaker.allow():
+        logger.warning(f"网关处于熔断状态，跳过接口请求（{breaker.retry_after():.0f}秒后再试）")
+        return None
+
+    try:
+        logger.info(f"直接请求电表接口: {url}")
+        session = get_session()
+        if method == "POST":
+            response = session.post(url, json=params, timeout=timeout)
+        else:
+            response = session.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        payload = response.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"直接请求电表接口失败: {str(e)}")
+        if breaker is not None:
+            if _is_gateway_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+        return None
+
+    if breaker is not None:
+        breaker.record_success()
+
+    balance = extract_balance(payload, os.environ.get("METER_API_BALANCE_KEY"))
+    if balance is None:
+        logger.warning("接口返回不是预期的电表查询结果，未找到电表余额字段")
+        return None
+
+    logger.info(f"接口返回电表剩余值: {balance}")
+    return balance
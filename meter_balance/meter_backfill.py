@@ -0,0 +1,150 @@
+"""从查询日志中补录电表读数：流式读取一个或多个日志（含轮转和gzip压缩的日志），
+找出所有 ===METER_BALANCE_RESULT=== 记录并批量写入数据库
+
+用法: python meter_backfill.py [--utc-offset 小时] <日志文件>...
+"""
+
+import gzip
+import logging
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from meter_balance.meter_store import DEFAULT_METER
+from meter_balance.update_meter_data import export_site_files, open_store, setup_logging, to_reading
+
+
+RESULT_MARKER = b"===METER_BALANCE_RESULT==="
+RUN_TIME_MARKER = "执行时间(北京): ".encode("utf-8")
+BATCH_SIZE = 5000  # 每积累多少条不同 (电表, 日期) 的读数写入一次数据库
+
+# setup_logging 的格式: "%(asctime)s - %(levelname)s - %(message)s"
+ASCTIME_RE = re.compile(rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d{3} - ")
+RESULT_RE = re.compile(
+    r"===METER_BALANCE_RESULT===(?:\[(?P<meter>[^\]]*)\] )?电表余额: (?P<balance>-?\d+(?:\.\d+)?)度==="
+    r"(?: 查询时间\(北京\): (?P<fetched_at>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}))?"
+    r"(?P<cached> \[cached\])?"
+)
+RUN_TIME_RE = re.compile(r"执行时间\(北京\): (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+ROTATION_RE = re.compile(r"\.(\d+)(?:\.gz)?$")
+
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+
+def rotation_order(path):
+    """日志轮转序号：meter_balance.log.2.gz 比 meter_balance.log.1 更早，未轮转的日志最新"""
+    match = ROTATION_RE.search(path)
+    return -int(match.group(1)) if match else 0
+
+
+def open_log(path):
+    """以二进制方式打开日志，.gz 文件自动解压"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_log_readings(lines, log_tz=None):
+    """从日志行中流式解析 (电表, 北京时间, 余额)
+
+    记录中带有查询时间（update_meter_data.result_line 的格式）时使用该时间，
+    与查询时写入数据库的读数时间一致，重复补录不会产生新的读数；带 [cached] 标记的缓存读数跳过。
+    旧格式的记录没有查询时间："执行时间(北京)"日志之后的第一条记录使用该时间作为读数时间（单电表查询脚本每次运行只输出一条）；
+    其他记录（守护进程、多电表查询写入同一日志时没有这一行）使用日志行自身的时间戳，
+    按 log_tz 时区解释（None 表示本机时区）。两者都没有的记录无法确定日期，跳过。
+    """
+    run_time = None
+    for line in lines:
+        # 大部分日志行不含标记，先用字节查找过滤，只解码匹配的行
+        if RUN_TIME_MARKER in line:
+            match = RUN_TIME_RE.search(line.decode("utf-8", "replace"))
+            if match:
+                run_time = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+            continue
+        if RESULT_MARKER not in line:
+            continue
+
+        match = RESULT_RE.search(line.decode("utf-8", "replace"))
+        if not match:
+            continue
+        # 执行时间只属于紧随其后的这一次查询结果
+        timestamp, run_time = run_time, None
+        if match.group("cached"):
+            # 缓存的读数在当时已经写入（并有自己的记录），不是新读数
+            continue
+        if match.group("fetched_at"):
+            timestamp = datetime.strptime(match.group("fetched_at"), "%Y-%m-%d %H:%M:%S")
+        elif timestamp is None:
+            prefix = ASCTIME_RE.match(line)
+            if not prefix:
+                continue
+            local_time = datetime.strptime(prefix.group(1).decode(), "%Y-%m-%d %H:%M:%S")
+            timestamp = local_time.replace(tzinfo=log_tz).astimezone(BEIJING_TZ)
+        yield match.group("meter") or DEFAULT_METER, timestamp, float(match.group("balance"))
+
+
+def backfill(store, paths, log_tz=None, batch_size=BATCH_SIZE):
+    """按从旧到新的顺序导入日志中的全部读数，同一电表同一天以最后一条为准
+
+    返回 {"records": 找到的记录数, "readings": 写入的读数条数, "months": {电表: 涉及的月份}}
+    """
+    logger = logging.getLogger(__name__)
+    stats = {"records": 0, "readings": 0, "months": {}}
+    pending = {}
+
+    def flush():
+        if pending:
+            stats["readings"] += store.upsert_many(pending.values())
+            pending.clear()
+
+    for path in sorted(paths, key=rotation_order):
+        count = 0
+        with open_log(path) as f:
+            for meter, timestamp, balance in iter_log_readings(f, log_tz):
+                reading = to_reading(meter, timestamp, balance)
+                # 同一时间的重复记录只保留一条，同一天的多条记录都作为日内读数保留
+                key = (reading[0], reading[3])
+                # 同一批中先删除再插入，保证写入顺序与日志顺序一致
+                pending.pop(key, None)
+                pending[key] = reading
+                stats["months"].setdefault(meter, set()).add(reading[1][:7])
+                count += 1
+                if len(pending) >= batch_size:
+                    flush()
+        stats["records"] += count
+        logger.info(f"{path}: 找到 {count} 条余额记录")
+
+    flush()
+    return stats
+
+
+def main():
+    """主函数"""
+    logger = setup_logging()
+    args = sys.argv[1:]
+    log_tz = None
+    if len(args) >= 2 and args[0] == "--utc-offset":
+        log_tz = timezone(timedelta(hours=float(args[1])))
+        args = args[2:]
+
+    if not args:
+        logger.error("缺少日志文件参数")
+        logger.info("用法: python meter_backfill.py [--utc-offset 小时] <日志文件>...")
+        return 1
+
+    with open_store() as store:
+        try:
+            stats = backfill(store, args, log_tz)
+        except (OSError, EOFError) as e:
+            logger.error(f"读取日志失败: {str(e)}")
+            return 1
+
+        logger.info(f"共找到 {stats['records']} 条余额记录，写入 {stats['readings']} 条读数")
+        months = stats["months"].get(DEFAULT_METER)
+        if months and not export_site_files(store, DEFAULT_METER, sorted(months)):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
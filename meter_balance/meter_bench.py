@@ -0,0 +1,259 @@
+"""端到端查询基准测试：基于离线回放服务器多次运行各查询引擎，统计冷/热启动耗时分布、峰值内存和重试次数
+
+用法: python meter_bench.py [--engines http,selenium,selenium-lean,selenium-hedged] [--cold 3] [--warm 10] [--output bench.json]
+      回放行为参数（延迟、故障注入）与 meter_replay.py 相同。全程只访问本机，不需要网络。
+      selenium-lean 为开启精简加载模式（METER_LEAN_MODE=1）的浏览器查询，报告中包含页面传输字节数，
+      可与 selenium 直接对比。
+      selenium-hedged 为开启对冲模式（METER_HEDGE=1）的浏览器查询，报告中包含并行尝试和取消的次数，
+      配合 --fail-mode timeout 注入慢请求时可对比 selenium 的 p95/p99 尾延迟。
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+
+from meter_balance import meter_api
+from meter_balance.driver_pool import process_tree_rss_mb
+from meter_balance.meter_metrics import get_recorder
+from meter_balance.meter_replay import ReplayServer, add_replay_arguments, config_from_args
+
+
+BENCH_OPENID = "replay-openid"
+BENCH_METER_ID = "replay-meter"
+BENCH_REMARK = "replay"
+
+
+class PeakRssSampler:
+    """后台定时采样本进程及子进程（浏览器驱动和浏览器）的常驻内存峰值"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        """立即采样一次（短于采样间隔的运行也能得到峰值）"""
+        rss = process_tree_rss_mb(os.getpid())
+        if rss is not None:
+            self.peak_mb = max(self.peak_mb, rss)
+
+    def reset(self):
+        """清零并返回当前峰值"""
+        peak, self.peak_mb = self.peak_mb, 0.0
+        return round(peak, 1)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+
+def _http_engine():
+    return meter_api.fetch_balance(BENCH_OPENID, BENCH_METER_ID, BENCH_REMARK)
+
+
+def _selenium_engine():
+    from meter_balance.query import get_meter_balance_selenium
+
+    return get_meter_balance_selenium(BENCH_OPENID, BENCH_METER_ID, BENCH_REMARK)
+
+
+def _reset_http():
+    meter_api.close_session()
+
+
+def _reset_selenium():
+    from meter_balance.query import close_driver_pool
+
+    # 精简模式在启动浏览器时生效，关闭实例池后下次查询按当前设置重新启动
+    os.environ.pop("METER_LEAN_MODE", None)
+    os.environ.pop("METER_HEDGE", None)
+    close_driver_pool()
+
+
+def _reset_selenium_lean():
+    _reset_selenium()
+    os.environ["METER_LEAN_MODE"] = "1"
+
+
+def _reset_selenium_hedged():
+    _reset_selenium()
+    # 对冲模式下实例池默认容纳两个浏览器
+    os.environ["METER_HEDGE"] = "1"
+
+
+# 引擎名称 -> (查询函数, 冷启动前的重置函数)
+ENGINES = {
+    "http": (_http_engine, _reset_http),
+    "selenium": (_selenium_engine, _reset_selenium),
+    "selenium-lean": (_selenium_engine, _reset_selenium_lean),
+    "selenium-hedged": (_selenium_engine, _reset_selenium_hedged),
+}
+
+
+def summarize(values):
+    """耗时分布：最小、p50、p95、p99、最大、平均（秒）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "runs": len(ordered),
+        "min": round(ordered[0], 4),
+        "p50": round(pick(0.5), 4),
+        "p95": round(pick(0.95), 4),
+        "p99": round(pick(0.99), 4),
+        "max": round(ordered[-1], 4),
+        "mean": round(sum(ordered) / len(ordered), 4),
+    }
+
+
+def run_once(query, server, sampler):
+    """运行一次查询，返回耗时、结果、重试次数、并行尝试次数、接口请求次数和内存峰值"""
+    recorder = get_recorder()
+    recorder.drain()
+    server.reset_counts()
+    sampler.reset()
+    sampler.sample()
+    start = time.monotonic()
+    try:
+        balance = query()
+        error = None if balance is not None else "未能获取电表余额"
+    except Exception as e:
+        balance, error = None, f"{type(e).__name__}: {str(e)}"
+    elapsed = time.monotonic() - start
+    sampler.sample()
+
+    spans = recorder.drain()
+    requests = server.reset_counts()
+    api_requests = requests.get(server.config.api_path, 0)
+    # 浏览器重试记录为 retry_wait 区间；HTTP连接池内部的重试只能从接口请求次数看出
+    retry_waits = sum(1 for record in spans if record["phase"] == "retry_wait")
+    transfer = [record for record in spans if record["phase"] == "page_transfer"]
+    # 对冲模式：启动的并行尝试数和被取消的落败尝试数（落败尝试可能在下一次运行期间才结束）
+    attempts = [record for record in spans if record["phase"] == "selenium_attempt"]
+    return {
+        "seconds": round(elapsed, 4),
+        "balance": balance,
+        "error": error,
+        "retries": max(retry_waits, api_requests - 1),
+        "api_requests": api_requests,
+        "page_requests": sum(requests.values()) - requests.get("__failures__", 0),
+        "bytes": sum(record.get("bytes", 0) for record in transfer) if transfer else None,
+        "cached_resources": sum(record.get("cached", 0) for record in transfer),
+        "injected_failures": requests.get("__failures__", 0),
+        "hedges": sum(1 for record in attempts if record.get("hedge", 0) > 0),
+        "cancelled": sum(1 for record in attempts if record.get("error") == "AttemptCancelled"),
+        "peak_rss_mb": sampler.reset(),
+    }
+
+
+def bench_engine(name, server, sampler, cold_runs, warm_runs):
+    """对单个引擎运行冷启动和热启动测试"""
+    logger = logging.getLogger(__name__)
+    query, reset = ENGINES[name]
+    runs = {"cold": [], "warm": []}
+
+    for i in range(cold_runs):
+        reset()
+        runs["cold"].append(run_once(query, server, sampler))
+        logger.info(f"[{name}] 冷启动第 {i + 1} 次: {runs['cold'][-1]['seconds']}秒")
+    if not cold_runs:
+        # 没有冷启动时也要先应用该引擎的设置（如精简加载模式）
+        reset()
+    for i in range(warm_runs):
+        runs["warm"].append(run_once(query, server, sampler))
+        logger.info(f"[{name}] 热启动第 {i + 1} 次: {runs['warm'][-1]['seconds']}秒")
+    reset()
+
+    report = {}
+    for kind, results in runs.items():
+        succeeded = [r for r in results if r["error"] is None]
+        transferred = [r["bytes"] for r in succeeded if r["bytes"] is not None]
+        report[kind] = {
+            "latency": summarize([r["seconds"] for r in succeeded]),
+            # 浏览器引擎：每次查询页面传输的平均字节数、到达回放服务器的请求数、命中磁盘缓存的资源数
+            "bytes_per_run": round(sum(transferred) / len(transferred)) if transferred else None,
+            "server_requests": sum(r["page_requests"] for r in results),
+            "cached_resources": sum(r["cached_resources"] for r in results),
+            "succeeded": len(succeeded),
+            "failed": len(results) - len(succeeded),
+            "retries": sum(r["retries"] for r in results),
+            "api_requests": sum(r["api_requests"] for r in results),
+            "injected_failures": sum(r["injected_failures"] for r in results),
+            "hedges": sum(r["hedges"] for r in results),
+            "cancelled": sum(r["cancelled"] for r in results),
+            "peak_rss_mb": max((r["peak_rss_mb"] for r in results), default=0.0),
+            "errors": sorted({r["error"] for r in results if r["error"]}),
+        }
+    return report
+
+
+def main():
+    """主函数"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="电表查询端到端基准测试（离线）")
+    parser.add_argument(
+        "--engines", default="http,selenium", help="逗号分隔: http,selenium,selenium-lean,selenium-hedged"
+    )
+    parser.add_argument("--cold", type=int, default=3, help="冷启动运行次数")
+    parser.add_argument("--warm", type=int, default=10, help="热启动运行次数")
+    parser.add_argument("--output", help="报告输出文件（默认只打印）")
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+
+    engines = [name.strip() for name in args.engines.split(",") if name.strip()]
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"未知的查询引擎: {', '.join(unknown)}")
+
+    with ReplayServer(config_from_args(args)) as server, PeakRssSampler() as sampler:
+        # 所有查询都指向本机回放服务器
+        os.environ["METER_BASE_URL"] = server.base_url
+        # 注入故障时熔断会让后续查询直接失败，基准测试默认关闭熔断
+        os.environ.setdefault("METER_CIRCUIT_THRESHOLD", "0")
+        # 回放页面没有webvpn登录流程，默认不使用会话缓存，各次运行互不影响
+        os.environ.setdefault("METER_SESSION_CACHE", "0")
+        report = {
+            "replay": {
+                "latency_ms": args.latency,
+                "api_latency_ms": args.api_latency,
+                "fail_rate": args.fail_rate,
+                "fail_mode": args.fail_mode,
+                "fail_target": args.fail_target,
+            },
+            "engines": {
+                name: bench_engine(name, server, sampler, args.cold, args.warm)
+                for name in engines
+            },
+        }
+
+    # ru_maxrss 在Linux上以KB为单位，只包含本进程
+    report["python_max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
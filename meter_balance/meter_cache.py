@@ -0,0 +1,155 @@
+"""电表读数缓存：短时间内重复查询时直接返回上次的读数，不再启动查询引擎
+
+- 读数在 METER_CACHE_TTL 秒内视为新鲜，直接返回
+- 过期但未超过 METER_CACHE_STALE 秒时立即返回旧读数，同时在后台刷新（stale-while-revalidate）
+- 更旧或没有缓存时同步查询；force=True 时总是同步查询
+- 缓存按电表参数的哈希保存在 meter_cache.json 中，文件中不包含openid等原始参数
+- fetch 返回的 Reading 带有查询时间和是否来自缓存，调用方据此避免把旧读数当作新读数保存；
+  后台刷新得到的读数通过 on_refresh 回调交给调用方
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_files import lock_for, write_atomic
+
+
+DEFAULT_TTL = 3600
+DEFAULT_STALE = 6 * 3600
+
+# 余额、实际查询时间（时间戳）、是否来自缓存
+Reading = namedtuple("Reading", ["balance", "fetched_at", "cached"])
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache_file_path():
+    """获取缓存文件路径"""
+    return os.path.join(PROJECT_DIR, "meter_cache.json")
+
+
+def cache_key(*params):
+    """由电表查询参数生成缓存键"""
+    return hashlib.sha256("|".join(str(p) for p in params).encode("utf-8")).hexdigest()[:16]
+
+
+class ReadingCache:
+    """按电表保存最近一次成功查询到的余额"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, stale=DEFAULT_STALE):
+        self.path = path
+        self.ttl = ttl
+        self.stale = stale
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        """返回缓存的 Reading，没有缓存时返回None"""
+        with self._lock:
+            entry = self._load().get(key)
+        if not entry:
+            return None
+        return Reading(entry["balance"], entry["fetched_at"], True)
+
+    def put(self, key, balance, fetched_at=None):
+        """写入一次成功查询的余额，返回对应的 Reading
+
+        读取、修改和写回都在跨进程文件锁内完成，多个进程同时写入不会丢失彼此的条目或损坏文件。
+        """
+        reading = Reading(balance, fetched_at or time.time(), False)
+        with self._lock:
+            try:
+                with lock_for(self.path):
+                    entries = self._load()
+                    entries[key] = {"balance": balance, "fetched_at": reading.fetched_at}
+                    content = json.dumps(entries, ensure_ascii=False, indent=2, sort_keys=True)
+                    write_atomic(self.path, content.encode("utf-8"))
+            except (OSError, TimeoutError) as e:
+                self.logger.warning(f"写入读数缓存失败: {str(e)}")
+        return reading
+
+    def fetch(self, key, loader, force=False, on_refresh=None):
+        """按缓存策略返回 Reading，查询失败时返回None
+
+        loader 为实际查询函数（失败返回None）；返回旧值并在后台刷新时，
+        刷新成功后以新的 Reading 调用 on_refresh。
+        """
+        cached = None if force or self.ttl <= 0 else self.get(key)
+        if cached is not None:
+            age = time.time() - cached.fetched_at
+            if age < self.ttl:
+                self.logger.info(f"使用缓存的电表余额: {cached.balance}（{age:.0f}秒前查询）")
+                return cached
+            if age < self.ttl + self.stale:
+                self.logger.info(f"缓存的电表余额已过期（{age:.0f}秒前查询），先返回旧值并在后台刷新")
+                self._refresh_in_background(key, loader, on_refresh)
+                return cached
+
+        balance = loader()
+        if balance is None:
+            return None
+        return self.put(key, balance)
+
+    def _refresh_in_background(self, key, loader, on_refresh=None):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                balance = loader()
+                if balance is not None:
+                    reading = self.put(key, balance)
+                    self.logger.info(f"后台刷新完成，电表余额: {balance}")
+                    if on_refresh is not None:
+                        on_refresh(reading)
+                else:
+                    self.logger.warning("后台刷新失败，保留缓存的读数")
+            except Exception as e:
+                self.logger.error(f"后台刷新时出错: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # 非守护线程：脚本返回结果后，进程会等后台刷新完成再退出
+        threading.Thread(target=refresh, name="cache-refresh").start()
+
+
+def get_cache():
+    """获取进程内共享的读数缓存
+
+    缓存文件、新鲜时长和允许返回旧值的时长分别由环境变量
+    METER_CACHE_FILE、METER_CACHE_TTL、METER_CACHE_STALE 设置，TTL 为0时关闭缓存。
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReadingCache(
+                os.environ.get("METER_CACHE_FILE", get_cache_file_path()),
+                ttl=float(os.environ.get("METER_CACHE_TTL", DEFAULT_TTL)),
+                stale=float(os.environ.get("METER_CACHE_STALE", DEFAULT_STALE)),
+            )
+        return _cache
+
+
+def force_refresh_requested(argv=None):
+    """命令行包含 --force-refresh 或设置了 METER_FORCE_REFRESH=1 时强制重新查询"""
+    argv = sys.argv[1:] if argv is None else argv
+    return "--force-refresh" in argv or os.environ.get("METER_FORCE_REFRESH") == "1"
@@ -0,0 +1,192 @@
+"""常驻守护进程模式：保持查询引擎预热，由内部调度器定时查询电表余额"""
+
+import heapq
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from meter_balance.meter_api import close_session
+from meter_balance.query import get_meter_reading, init_driver_pool, setup_logging
+from meter_balance.meter_files import DEFAULT_COALESCE_DELAY, CoalescingWriter
+from meter_balance.meter_metrics import span, write_metrics
+from meter_balance.meter_store import DEFAULT_METER
+from meter_balance.multi_meter import DEFAULT_CONFIG_FILE, load_meter_config, query_meter, result_time
+from meter_balance.update_meter_data import ingest_readings, open_store, result_line
+
+
+DEFAULT_INTERVAL = 3600  # 默认每小时查询一次
+DEFAULT_JITTER = 60  # 默认随机抖动范围（秒），避免同时请求webvpn网关
+DEFAULT_WORKERS = 2
+
+
+class MeterScheduler:
+    """按电表分别设置查询间隔的调度器
+
+    - 每个电表按自己的 interval 定时查询，实际时间加上 ±jitter 秒的随机抖动
+    - 同一电表上一次查询尚未结束时跳过本轮，避免重叠
+    - stop() 后不再调度新查询，等待进行中的查询结束后退出
+    """
+
+    def __init__(self, meters, query_func=get_meter_reading, on_result=None,
+                 default_interval=DEFAULT_INTERVAL, jitter=DEFAULT_JITTER,
+                 max_workers=DEFAULT_WORKERS):
+        self.meters = {meter["name"]: meter for meter in meters}
+        self.query_func = query_func
+        self.on_result = on_result
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poll")
+        self._stop_event = threading.Event()
+        self._running = set()
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = 0
+
+    def interval_of(self, name):
+        """电表的查询间隔（秒）"""
+        return float(self.meters[name].get("interval", self.default_interval))
+
+    def _jittered(self, when):
+        return when + random.uniform(-self.jitter, self.jitter) if self.jitter else when
+
+    def _schedule(self, name, planned, when):
+        """planned 为不含抖动的计划时间，when 为实际触发时间"""
+        self._seq += 1
+        heapq.heappush(self._queue, (when, self._seq, name, planned))
+
+    def run(self):
+        """运行调度循环，直到调用stop()"""
+        if not self.meters:
+            self.logger.warning("没有需要调度的电表")
+            return
+        now = time.time()
+        for name in self.meters:
+            # 首次查询在 [0, jitter] 秒内错开
+            self._schedule(name, now, now + random.uniform(0, self.jitter))
+
+        while not self._stop_event.is_set():
+            when, _, name, planned = self._queue[0]
+            delay = when - time.time()
+            if delay > 0:
+                self._stop_event.wait(delay)
+                continue
+
+            heapq.heappop(self._queue)
+            # 按不含抖动的计划时间推进，抖动和查询耗时都不会累积成漂移；落后太多时从现在重新开始
+            planned = max(planned + self.interval_of(name), time.time())
+            self._schedule(name, planned, self._jittered(planned))
+
+            with self._lock:
+                if name in self._running:
+                    self.logger.warning(f"电表 {name} 上一次查询尚未结束，跳过本轮")
+                    continue
+                self._running.add(name)
+            self._executor.submit(self._poll, name)
+
+        self.logger.info("调度器已停止，等待进行中的查询结束...")
+        self._executor.shutdown(wait=True)
+
+    def _poll(self, name):
+        try:
+            result = query_meter(self.meters[name], self.query_func)
+            if self.on_result:
+                self.on_result(self.meters[name], result)
+        except Exception as e:
+            self.logger.error(f"处理电表 {name} 查询结果时出错: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.discard(name)
+
+    def stop(self, *args):
+        """请求停止调度（可直接作为信号处理函数）"""
+        self.logger.info("收到停止信号，准备退出...")
+        self._stop_event.set()
+
+
+def load_daemon_meters(config_file):
+    """读取要调度的电表列表，没有配置文件时使用环境变量中的单个电表"""
+    if os.path.exists(config_file):
+        meters = load_meter_config(config_file)
+        if not meters:
+            raise ValueError(f"配置文件 {config_file} 中没有电表")
+        return meters
+    return [
+        {
+            "name": DEFAULT_METER,
+            "openid": os.environ.get("METER_OPENID"),
+            "meter_id": os.environ.get("METER_ID"),
+            "type_remark": os.environ.get("METER_TYPE_REMARK"),
+        }
+    ]
+
+
+def write_readings(store, readings):
+    """一次写入合并后的多条读数；默认电表同时导出data.json、摘要和月度分区"""
+    with span("data_update", meters=len(readings)):
+        return ingest_readings(readings, store=store)
+
+
+def record_result(writer, meter, result):
+    """将查询结果交给合并写入器，几乎同时完成的多个电表只写入和导出一次"""
+    logger = logging.getLogger(__name__)
+    if result["error"] is None:
+        logger.info(result_line(meter["name"], result_time(result), result["balance"], result["cached"]))
+        # 守护进程总是跳过缓存；缓存的读数在当时已经写入
+        if not result["cached"]:
+            writer.submit((meter["name"], result_time(result), result["balance"]))
+    # 每次查询后导出耗时统计，避免常驻进程中积累
+    write_metrics()
+
+
+def main(config_file=None):
+    """主函数"""
+    logger = setup_logging()
+    config_file = config_file or os.environ.get("METER_CONFIG", DEFAULT_CONFIG_FILE)
+
+    try:
+        meters = load_daemon_meters(config_file)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"加载电表配置失败: {str(e)}")
+        return 1
+
+    workers = int(os.environ.get("METER_WORKERS", DEFAULT_WORKERS))
+    store = open_store()
+    # METER_WRITE_COALESCE 秒内完成的查询合并为一次写入
+    writer = CoalescingWriter(
+        lambda readings: write_readings(store, readings),
+        delay=float(os.environ.get("METER_WRITE_COALESCE", DEFAULT_COALESCE_DELAY)),
+    )
+    scheduler = MeterScheduler(
+        meters,
+        # 守护进程按自己的间隔定时查询，每次都跳过读数缓存
+        query_func=lambda *params: get_meter_reading(*params, force_refresh=True),
+        on_result=lambda meter, result: record_result(writer, meter, result),
+        default_interval=float(os.environ.get("METER_POLL_INTERVAL", DEFAULT_INTERVAL)),
+        jitter=float(os.environ.get("METER_POLL_JITTER", DEFAULT_JITTER)),
+        max_workers=workers,
+    )
+    pool = init_driver_pool(max_size=workers)
+
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+
+    logger.info(f"=== 电表余额守护进程启动，共 {len(meters)} 个电表 ===")
+    try:
+        scheduler.run()
+    finally:
+        pool.close()
+        close_session()
+        writer.close()
+        store.close()
+        logger.info("=== 电表余额守护进程已退出 ===")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,329 @@
+"""数据层基准测试：生成多电表、多年的合成读数历史，测量写入吞吐、单次更新延迟、峰值内存和输出文件大小
+
+用法: python meter_data_bench.py [--meters 1000] [--years 5] [--updates 200] [--json-updates 50]
+                                [--seed 1] [--output data_bench.json]
+
+- 合成历史：每个电表有自己的日均用电量，每天的用电量带随机波动（夏冬季和周末偏高），
+  余额低于各自的阈值后随机某天充值（与 2025-05-01 一样余额跳升），每天在查询时段内读数一次
+- 数据库写入：按天批量写入 MeterStore（与守护进程的合并写入一致），记录吞吐和每批耗时分布
+- 单次更新：随机电表写入一条新读数，再按线上的方式导出默认电表的 data.json、摘要和当月分区
+- 摘要：为每个电表生成仪表盘摘要，记录耗时和摘要大小
+- data.json：一个电表全部历史的 load_existing_data / update_data / save_data
+- 相同的参数和种子总是生成相同的历史，报告可以逐次对比；全部在临时目录中进行，不修改项目数据
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from meter_balance.driver_pool import process_tree_rss_mb
+from meter_balance.meter_bench import PeakRssSampler, summarize
+from meter_balance.meter_store import DEFAULT_METER, MeterStore
+from meter_balance.meter_summary import build_summary
+from meter_balance.update_meter_data import (
+    export_data,
+    export_partition_files,
+    export_summary,
+    get_beijing_time,
+    get_retention,
+    load_existing_data,
+    save_data,
+    to_reading,
+    update_data,
+)
+
+
+DEFAULT_METERS = 1000
+DEFAULT_YEARS = 5
+# 常见的充值金额（度）
+RECHARGE_AMOUNTS = (20, 30, 50, 100)
+
+
+class SyntheticHistory:
+    """合成的多电表读数历史，按天生成 (电表, 读数时间, 余额)"""
+
+    def __init__(self, meters, seed=1):
+        self.rng = random.Random(seed)
+        self.meters = []
+        for index in range(meters):
+            self.meters.append({
+                # 第一个电表使用默认名称，导出路径与线上一致
+                "meter": DEFAULT_METER if index == 0 else f"meter-{index:04d}",
+                "usage": self.rng.uniform(1.5, 4.5),
+                "threshold": self.rng.uniform(5, 15),
+                "balance": self.rng.uniform(20, 60),
+            })
+
+    def _usage(self, state, date):
+        # 夏季空调和冬季取暖用电偏高，周末在宿舍的时间更长
+        season = 1 + 0.25 * math.cos(4 * math.pi * (date.timetuple().tm_yday - 15) / 365)
+        weekend = 1.15 if date.weekday() >= 5 else 1.0
+        mean = state["usage"] * season * weekend
+        return max(0.0, self.rng.gauss(mean, mean * 0.3))
+
+    def _next_balance(self, state, usage):
+        balance = state["balance"] - usage
+        # 低于阈值后随机某天充值，余额耗尽时当天一定充值
+        if balance < state["threshold"] and (balance <= 0 or self.rng.random() < 0.4):
+            balance = max(balance, 0.0) + self.rng.choice(RECHARGE_AMOUNTS)
+        state["balance"] = round(max(balance, 0.0), 2)
+        return state["balance"]
+
+    def day(self, date):
+        """一天中所有电表的读数"""
+        batch = []
+        for state in self.meters:
+            balance = self._next_balance(state, self._usage(state, date))
+            taken_at = datetime(date.year, date.month, date.day, self.rng.randint(8, 22),
+                                self.rng.randint(0, 59), self.rng.randint(0, 59))
+            batch.append((state["meter"], taken_at, balance))
+        return batch
+
+    def reading(self, index, taken_at):
+        """某个电表在 taken_at 的一条日内读数（用电量为日均的一小部分）"""
+        state = self.meters[index]
+        balance = self._next_balance(state, self._usage(state, taken_at) * self.rng.uniform(0.05, 0.2))
+        return (state["meter"], taken_at, balance)
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def dir_size(path, suffix=".json"):
+    """目录中以 suffix 结尾的文件数和总字节数"""
+    count = total = 0
+    for name in os.listdir(path):
+        if name.endswith(suffix):
+            count += 1
+            total += os.path.getsize(os.path.join(path, name))
+    return count, total
+
+
+def section_peak(sampler):
+    """本阶段的内存峰值；阶段短于采样间隔时使用当前值"""
+    return round(max(sampler.reset(), process_tree_rss_mb(os.getpid()) or 0.0), 1)
+
+
+@contextlib.contextmanager
+def quiet():
+    """计时期间不输出每次写入的INFO日志"""
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def bench_ingest(store, history, start, days, sampler):
+    """按天批量写入全部历史，返回吞吐和每批耗时分布"""
+    logger = logging.getLogger(__name__)
+    latencies = []
+    readings = 0
+    started = time.monotonic()
+    for offset in range(days):
+        date = start + timedelta(days=offset)
+        rows = [to_reading(meter, taken_at, balance) for meter, taken_at, balance in history.day(date)]
+        batch_start = time.monotonic()
+        store.upsert_many(rows)
+        latencies.append(time.monotonic() - batch_start)
+        readings += len(rows)
+        if (offset + 1) % 365 == 0:
+            logger.info(f"已写入 {offset + 1}/{days} 天，{readings} 条读数")
+    elapsed = time.monotonic() - started
+    write_seconds = sum(latencies)
+    return {
+        "readings": readings,
+        "batches": days,
+        "seconds": round(elapsed, 2),
+        # 只计数据库写入的耗时，不含合成数据和格式转换
+        "readings_per_second": round(readings / write_seconds, 1) if write_seconds else None,
+        "batch_latency": summarize(latencies),
+        "peak_rss_mb": section_peak(sampler),
+    }
+
+
+def bench_updates(store, history, updates, output_dir, now, sampler):
+    """随机电表逐条写入新读数并导出默认电表的网站文件，返回写入和导出的耗时分布"""
+    rng = random.Random(len(history.meters))
+    partition_dir = os.path.join(output_dir, "data")
+    write_latencies = []
+    export_latencies = []
+    with quiet():
+        for i in range(updates):
+            index = rng.randrange(len(history.meters))
+            meter, taken_at, balance = history.reading(index, now + timedelta(seconds=i))
+            reading = to_reading(meter, taken_at, balance)
+            start = time.monotonic()
+            store.upsert_many([reading])
+            written = time.monotonic()
+            export_data(store, os.path.join(output_dir, "data.json"))
+            export_summary(store, os.path.join(output_dir, "summary.json"))
+            export_partition_files(store, partition_dir, DEFAULT_METER, [reading[1][:7]])
+            write_latencies.append(written - start)
+            export_latencies.append(time.monotonic() - written)
+    return {
+        "updates": updates,
+        "write_latency": summarize(write_latencies),
+        "export_latency": summarize(export_latencies),
+        "total_latency": summarize([w + e for w, e in zip(write_latencies, export_latencies)]),
+        "peak_rss_mb": section_peak(sampler),
+    }
+
+
+def bench_summaries(store, sampler):
+    """为每个电表生成摘要，返回耗时分布和摘要大小"""
+    latencies = []
+    sizes = []
+    for meter in store.meters():
+        start = time.monotonic()
+        summary = build_summary(store, meter)
+        latencies.append(time.monotonic() - start)
+        sizes.append(len(json.dumps(summary, ensure_ascii=False, separators=(",", ":")).encode("utf-8")))
+    return {
+        "meters": len(latencies),
+        "latency": summarize(latencies),
+        "bytes_per_meter": round(sum(sizes) / len(sizes)) if sizes else None,
+        "total_bytes": sum(sizes),
+        "peak_rss_mb": section_peak(sampler),
+    }
+
+
+def bench_output_files(store, output_dir, sampler):
+    """完整导出默认电表的网站文件，返回耗时和各文件大小"""
+    partition_dir = os.path.join(output_dir, "data")
+    data_path = os.path.join(output_dir, "data.json")
+    summary_path = os.path.join(output_dir, "summary.json")
+    start = time.monotonic()
+    with quiet():
+        export_data(store, data_path, DEFAULT_METER)
+        export_summary(store, summary_path, DEFAULT_METER)
+        export_partition_files(store, partition_dir, DEFAULT_METER)
+    elapsed = time.monotonic() - start
+    partitions, partition_bytes = dir_size(partition_dir)
+    _, partition_gzip_bytes = dir_size(partition_dir, ".json.gz")
+    return {
+        "export_seconds": round(elapsed, 4),
+        "database_bytes": file_size(store.path),
+        "data_json_bytes": file_size(data_path),
+        "summary_json_bytes": file_size(summary_path),
+        "partitions": partitions,
+        "partition_bytes": partition_bytes,
+        "partition_gzip_bytes": partition_gzip_bytes,
+        "peak_rss_mb": section_peak(sampler),
+    }
+
+
+def bench_json_file(store, updates, output_dir, sampler):
+    """一个电表全部历史的 data.json：加载、更新今天的记录和保存的耗时分布"""
+    path = os.path.join(output_dir, "legacy", "data.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = store.export_json(DEFAULT_METER)
+    balance = data["daily_data"][-1]["balance"] if data["daily_data"] else 0.0
+    timings = {"load": [], "update": [], "save": []}
+    with quiet():
+        save_data(data, path)
+        for _ in range(updates):
+            start = time.monotonic()
+            data = load_existing_data(path)
+            loaded = time.monotonic()
+            balance = round(max(0.0, balance - 0.1), 2)
+            update_data(data, balance)
+            updated = time.monotonic()
+            save_data(data, path)
+            timings["load"].append(loaded - start)
+            timings["update"].append(updated - loaded)
+            timings["save"].append(time.monotonic() - updated)
+    return {
+        "entries": len(data["daily_data"]),
+        "updates": updates,
+        **{f"{step}_latency": summarize(values) for step, values in timings.items()},
+        "file_bytes": file_size(path),
+        "peak_rss_mb": section_peak(sampler),
+    }
+
+
+def run_benchmark(meters, years, updates, json_updates, seed, work_dir):
+    """生成历史并依次运行各项测试，返回报告"""
+    logger = logging.getLogger(__name__)
+    days = round(years * 365.25)
+    # 历史截止到昨天，之后的单次更新和 update_data 都写入今天
+    now = get_beijing_time().replace(tzinfo=None, microsecond=0)
+    start = now.date() - timedelta(days=days)
+    history = SyntheticHistory(meters, seed)
+    output_dir = os.path.join(work_dir, "site")
+    os.makedirs(output_dir, exist_ok=True)
+
+    report = {
+        "config": {
+            "meters": meters,
+            "years": years,
+            "days": days,
+            "seed": seed,
+            "start": start.isoformat(),
+            "updates": updates,
+            "json_updates": json_updates,
+            **get_retention(),
+        },
+    }
+    with PeakRssSampler() as sampler, MeterStore(os.path.join(work_dir, "meter_data.db"),
+                                                 **get_retention()) as store:
+        sampler.reset()
+        logger.info(f"写入 {meters} 个电表 {days} 天的历史...")
+        report["ingest"] = bench_ingest(store, history, start, days, sampler)
+        logger.info(f"写入完成: {report['ingest']['readings_per_second']} 条/秒")
+        report["summary"] = bench_summaries(store, sampler)
+        report["output_files"] = bench_output_files(store, output_dir, sampler)
+        logger.info(f"逐条更新 {updates} 次...")
+        report["updates"] = bench_updates(store, history, updates, output_dir, now, sampler)
+        logger.info(f"data.json 更新 {json_updates} 次...")
+        report["json_file"] = bench_json_file(store, json_updates, work_dir, sampler)
+    return report
+
+
+def main():
+    """主函数"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="数据层基准测试（合成多电表、多年历史）")
+    parser.add_argument("--meters", type=int, default=DEFAULT_METERS, help="电表数量")
+    parser.add_argument("--years", type=float, default=DEFAULT_YEARS, help="历史年数")
+    parser.add_argument("--updates", type=int, default=200, help="逐条更新的次数")
+    parser.add_argument("--json-updates", type=int, default=50, help="data.json 加载/更新/保存的次数")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子，相同种子生成相同的历史")
+    parser.add_argument("--work-dir", help="保留数据库和导出文件的目录（默认使用临时目录并在结束后删除）")
+    parser.add_argument("--output", help="报告输出文件（默认只打印）")
+    args = parser.parse_args()
+    if args.meters < 1 or args.years <= 0:
+        parser.error("电表数量和历史年数必须为正数")
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        report = run_benchmark(args.meters, args.years, args.updates, args.json_updates, args.seed, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="meter_data_bench.") as work_dir:
+            report = run_benchmark(args.meters, args.years, args.updates, args.json_updates, args.seed, work_dir)
+
+    # ru_maxrss 在Linux上以KB为单位
+    report["python_max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""数据文件的并发安全写入：跨进程文件锁、原子替换、损坏恢复和合并写入
+
+- 写入先落到同目录下唯一命名的临时文件，fsync 后再 os.replace，读者要么看到旧文件要么看到新文件
+- 多个进程（查询工作流、部署工作流、并发的电表查询）通过 .lock 文件互斥，不会交错写入
+- JSON文件写入时同时保存 .bak 快照；读取时发现文件损坏则从快照恢复，
+  快照也不可用时把损坏的文件改名保留，不会直接用空数据覆盖历史
+- CoalescingWriter 把短时间内的多次写入合并为一次提交
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows下使用msvcrt
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_LOCK_TIMEOUT = 60.0
+LOCK_POLL_INTERVAL = 0.05
+SNAPSHOT_SUFFIX = ".bak"
+DEFAULT_COALESCE_DELAY = 2.0
+DEFAULT_COALESCE_MAX_BATCH = 100
+
+
+def _current_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# 新文件的默认权限，与 open() 创建的文件一致；在导入时读取一次 umask，避免多线程下临时修改 umask
+DEFAULT_FILE_MODE = 0o666 & ~_current_umask()
+
+
+class FileLock:
+    """跨进程的排他文件锁（同一进程内的多个线程同样互斥）
+
+    用法:
+        with FileLock(f"{path}.lock"):
+            ...
+    """
+
+    def __init__(self, path, timeout=DEFAULT_LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._file = None
+
+    def _try_lock(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        self._file = open(self.path, "a+b")
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                self._file.close()
+                self._file = None
+                raise TimeoutError(f"等待文件锁 {self.path} 超时（{self.timeout:g}秒）")
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def lock_for(path, timeout=DEFAULT_LOCK_TIMEOUT):
+    """保护 path 的文件锁（锁文件为 path.lock）"""
+    return FileLock(f"{path}.lock", timeout)
+
+
+def write_atomic(path, content, mode=DEFAULT_FILE_MODE):
+    """原子写入字节内容：唯一命名的临时文件 + fsync + os.replace
+
+    临时文件名各不相同，多个写入者同时写入同一文件时不会互相截断临时文件。
+    mkstemp 创建的临时文件权限为0600，替换前改为 mode（默认按 umask，与普通写入相同），
+    否则网站文件对以其他用户运行的web服务器不可读；会话等敏感文件传入0o600。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_json(path, data, snapshot=True, **dump_options):
+    """加锁后原子写入JSON文件，snapshot 为真时同时更新 .bak 快照"""
+    content = json.dumps(data, ensure_ascii=False, **dump_options).encode("utf-8")
+    with lock_for(path):
+        write_atomic(path, content)
+        if snapshot:
+            write_atomic(f"{path}{SNAPSHOT_SUFFIX}", content)
+
+
+def _load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def quarantine(path):
+    """把损坏的文件改名保留（path.corrupt-时间戳），返回新路径"""
+    corrupt_path = f"{path}.corrupt-{time.strftime('%Y%m%d%H%M%S')}"
+    os.replace(path, corrupt_path)
+    return corrupt_path
+
+
+def read_json(path, default=None):
+    """读取JSON文件，文件损坏时从 .bak 快照恢复
+
+    文件不存在时返回 default；文件和快照都损坏时把损坏的文件改名保留后返回 default。
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        return _load_json(path)
+    except FileNotFoundError:
+        return default
+    except ValueError as e:
+        logger.warning(f"数据文件 {path} 已损坏: {str(e)}")
+
+    snapshot_path = f"{path}{SNAPSHOT_SUFFIX}"
+    with lock_for(path):
+        try:
+            # 等待锁期间其他进程可能已经写入了新文件
+            return _load_json(path)
+        except (OSError, ValueError):
+            pass
+        try:
+            data = _load_json(snapshot_path)
+        except (OSError, ValueError):
+            data = None
+        if data is not None:
+            with open(snapshot_path, "rb") as f:
+                write_atomic(path, f.read())
+            logger.warning(f"已从快照 {snapshot_path} 恢复 {path}")
+            return data
+        corrupt_path = quarantine(path)
+        logger.error(f"快照不可用，损坏的文件已保留为 {corrupt_path}")
+        return default
+
+
+class CoalescingWriter:
+    """合并写入：短时间内提交的多条记录合并为一次 flush_func(records) 调用
+
+    第一条记录到达后等待 delay 秒（期间到达的记录一起写入），
+    累积到 max_batch 条时立即写入；close() 时写入剩余记录。
+    """
+
+    def __init__(self, flush_func, delay=DEFAULT_COALESCE_DELAY, max_batch=DEFAULT_COALESCE_MAX_BATCH):
+        self.flush_func = flush_func
+        self.delay = delay
+        self.max_batch = max_batch
+        self.logger = logging.getLogger(__name__)
+        self.flushes = 0
+        self.records = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._closed = False
+
+    def submit(self, *records):
+        """提交记录，由后台定时器合并写入"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("写入器已关闭")
+            self._pending.extend(records)
+            full = len(self._pending) >= self.max_batch
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """立即写入所有待写记录，返回 flush_func 的结果（没有待写记录时返回None）"""
+        with self._flush_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not records:
+                return None
+            try:
+                result = self.flush_func(records)
+            except Exception as e:
+                self.logger.error(f"合并写入 {len(records)} 条记录失败: {str(e)}")
+                return False
+            self.flushes += 1
+            self.records += len(records)
+            return result
+
+    def close(self):
+        """停止接收新记录并写入剩余记录"""
+        with self._lock:
+            self._closed = True
+        self.flush()
+        self.logger.info(f"合并写入器已关闭: {self.records} 条记录，共写入 {self.flushes} 次")
@@ -0,0 +1,205 @@
+"""查询流程各阶段的耗时统计：记录结构化的计时区间，导出为JSON Lines和Prometheus文本格式"""
+
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_files import write_atomic
+
+
+# 与其他数据文件一样放在项目根目录，从其他目录运行时也写入同一份历史
+DEFAULT_METRICS_FILE = os.path.join(PROJECT_DIR, "meter_metrics.jsonl")
+DEFAULT_PROM_FILE = os.path.join(PROJECT_DIR, "meter_metrics.prom")
+DEFAULT_HISTORY = 10000  # 计算分位数时使用最近多少条记录
+QUANTILES = (0.5, 0.95)
+
+
+class SpanRecorder:
+    """记录计时区间
+
+    每个区间包含阶段名称、开始时间、耗时、结果（ok/timeout/error，也可由调用方指定）
+    以及附加标签（如第几次尝试）。通过 labels() 设置的标签（如电表名称）对当前线程内
+    的所有区间生效，多个电表并发查询时互不影响。
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self._spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _context(self):
+        if not hasattr(self._local, "labels"):
+            self._local.labels = {}
+        return self._local.labels
+
+    @contextmanager
+    def labels(self, **labels):
+        """在当前线程内为之后记录的区间附加标签"""
+        context = self._context()
+        saved = dict(context)
+        context.update(labels)
+        try:
+            yield
+        finally:
+            context.clear()
+            context.update(saved)
+
+    @contextmanager
+    def span(self, phase, **labels):
+        """记录一个阶段的耗时，yield 的字典可用于修改 outcome 或补充标签"""
+        record = {"run": self.run_id, "phase": phase, **self._context(), **labels}
+        record["start"] = round(time.time(), 3)
+        start = time.monotonic()
+        try:
+            yield record
+            record.setdefault("outcome", "ok")
+        except BaseException as e:
+            record["outcome"] = "timeout" if "Timeout" in type(e).__name__ else "error"
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["seconds"] = round(time.monotonic() - start, 4)
+            with self._lock:
+                self._spans.append(record)
+
+    def drain(self):
+        """取出所有尚未导出的区间"""
+        with self._lock:
+            spans, self._spans = self._spans, []
+        return spans
+
+
+_recorder = SpanRecorder()
+_write_lock = threading.Lock()
+
+
+def get_recorder():
+    """进程内共享的区间记录器"""
+    return _recorder
+
+
+def span(phase, **labels):
+    """在共享记录器中记录一个阶段的耗时"""
+    return _recorder.span(phase, **labels)
+
+
+def labels(**values):
+    """为当前线程之后记录的区间附加标签"""
+    return _recorder.labels(**values)
+
+
+def current_labels():
+    """当前线程的标签（传给工作线程，使其记录的区间带有相同的电表名称等标签）"""
+    return dict(_recorder._context())
+
+
+def append_jsonl(spans, file_path):
+    """将区间追加写入JSON Lines文件"""
+    with open(file_path, "a", encoding="utf-8") as f:
+        for record in spans:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_history(file_path, limit=DEFAULT_HISTORY):
+    """读取JSON Lines文件中最近 limit 条区间"""
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, "r", encoding="utf-8") as f:
+        lines = deque(f, maxlen=limit)
+    history = []
+    for line in lines:
+        try:
+            history.append(json.loads(line))
+        except ValueError:
+            continue
+    return history
+
+
+def quantile(sorted_values, q):
+    """最近秩法分位数"""
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(label_map):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in label_map.items())
+
+
+def format_prometheus(spans):
+    """按 (阶段, 电表) 汇总耗时分位数，并按结果统计次数，返回Prometheus文本格式"""
+    durations = {}
+    outcomes = {}
+    for record in spans:
+        key = (record.get("phase", ""), record.get("meter", ""))
+        durations.setdefault(key, []).append(record.get("seconds", 0.0))
+        outcome_key = key + (record.get("outcome", ""),)
+        outcomes[outcome_key] = outcomes.get(outcome_key, 0) + 1
+
+    lines = [
+        "# HELP meter_phase_seconds Duration of each scrape pipeline phase.",
+        "# TYPE meter_phase_seconds summary",
+    ]
+    for (phase, meter), values in sorted(durations.items()):
+        values.sort()
+        base = {"phase": phase, "meter": meter}
+        for q in QUANTILES:
+            label_text = _label_text({**base, "quantile": q})
+            lines.append(f"meter_phase_seconds{{{label_text}}} {quantile(values, q):.4f}")
+        lines.append(f"meter_phase_seconds_sum{{{_label_text(base)}}} {sum(values):.4f}")
+        lines.append(f"meter_phase_seconds_count{{{_label_text(base)}}} {len(values)}")
+
+    lines += [
+        "# HELP meter_phase_total Number of scrape pipeline phases by outcome in the recent history.",
+        "# TYPE meter_phase_total gauge",
+    ]
+    for (phase, meter, outcome), count in sorted(outcomes.items()):
+        label_text = _label_text({"phase": phase, "meter": meter, "outcome": outcome})
+        lines.append(f"meter_phase_total{{{label_text}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(metrics_file=None, prom_file=None):
+    """导出本进程新记录的区间，并根据最近的历史记录重新生成Prometheus文件
+
+    文件路径由环境变量 METER_METRICS_FILE、METER_METRICS_PROM 设置，写入失败只记录警告。
+    """
+    metrics_file = metrics_file or os.environ.get("METER_METRICS_FILE", DEFAULT_METRICS_FILE)
+    prom_file = prom_file or os.environ.get("METER_METRICS_PROM", DEFAULT_PROM_FILE)
+    spans = _recorder.drain()
+    if not spans:
+        return False
+    try:
+        with _write_lock:
+            append_jsonl(spans, metrics_file)
+            content = format_prometheus(load_history(metrics_file))
+            write_atomic(prom_file, content.encode("utf-8"))
+        return True
+    except OSError as e:
+        logging.warning(f"写入耗时统计失败: {str(e)}")
+        return False
+
+
+def main():
+    """主函数：打印最近历史记录中各阶段的耗时分位数"""
+    metrics_file = sys.argv[1] if len(sys.argv) > 1 else os.environ.get(
+        "METER_METRICS_FILE", DEFAULT_METRICS_FILE
+    )
+    print(format_prometheus(load_history(metrics_file)), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
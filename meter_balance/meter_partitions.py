@@ -0,0 +1,109 @@
+"""按月分区导出网站数据：每月一个JSON文件加一个很小的清单文件，并生成预压缩版本
+
+本地读取接口（meter_server）按 Accept-Encoding 直接返回 .br/.gz 版本，不必每次重新压缩。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from meter_balance.meter_files import write_atomic
+from meter_balance.meter_store import DEFAULT_METER
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只生成gzip版本
+    brotli = None
+
+
+MANIFEST_FILE = "manifest.json"
+VARIANT_SUFFIXES = (".gz", ".br") if brotli is not None else (".gz",)
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_compressed(path, content):
+    """写入文件及其 .gz（和 .br）预压缩版本，内容未变化时跳过，返回是否写入
+
+    预压缩版本在原文件之后写入（修改时间不早于原文件）；内容未变化但缺少预压缩版本时补写。
+    """
+    try:
+        with open(path, "rb") as f:
+            unchanged = f.read() == content
+    except OSError:
+        unchanged = False
+
+    if unchanged and all(os.path.exists(f"{path}{suffix}") for suffix in VARIANT_SUFFIXES):
+        return False
+
+    if not unchanged:
+        write_atomic(path, content)
+    # mtime=0 保证相同内容生成相同的压缩文件
+    write_atomic(f"{path}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write_atomic(f"{path}.br", brotli.compress(content, quality=11))
+    return not unchanged
+
+
+def load_manifest(output_dir):
+    """读取已有清单，不存在或格式错误时返回None"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_partitions(store, output_dir, meter=DEFAULT_METER, months=None):
+    """将电表数据按月导出到 output_dir 并更新清单，返回清单
+
+    指定 months（如 ["2025-05"]）且已有清单时只重新导出这些月份，
+    否则导出全部历史；内容未变化的分区文件不会重写。
+    """
+    logger = logging.getLogger(__name__)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = load_manifest(output_dir)
+    if months and manifest and manifest.get("meter") == meter:
+        partitions = {p["month"]: p for p in manifest["partitions"]}
+        rows = []
+        for month in months:
+            partitions.pop(month, None)
+            rows.extend(store.daily_series(meter, f"{month}-01", f"{month}-31"))
+    else:
+        partitions = {}
+        rows = store.daily_series(meter)
+
+    grouped = {}
+    for date, balance in rows:
+        grouped.setdefault(date[:7], []).append({"date": date, "balance": balance})
+
+    written = 0
+    for month, daily_data in grouped.items():
+        content = _dumps({"month": month, "daily_data": daily_data})
+        file_name = f"{month}.json"
+        if write_compressed(os.path.join(output_dir, file_name), content):
+            written += 1
+        partitions[month] = {
+            "month": month,
+            "file": file_name,
+            "count": len(daily_data),
+            "bytes": len(content),
+            # 内容哈希用于客户端缓存失效
+            "hash": hashlib.sha256(content).hexdigest()[:12],
+        }
+
+    ordered = [partitions[month] for month in sorted(partitions)]
+    manifest = {
+        "meter": meter,
+        "last_updated": store.last_updated(meter),
+        "latest": ordered[-1]["month"] if ordered else None,
+        "partitions": ordered,
+    }
+    write_compressed(os.path.join(output_dir, MANIFEST_FILE), _dumps(manifest))
+    logger.info(f"月度分区已更新: 共 {len(ordered)} 个，重写 {written} 个")
+    return manifest
@@ -0,0 +1,238 @@
+"""离线回放服务器：提供录制的电表查询页面和后端接口响应，可注入延迟和故障
+
+用法: python meter_replay.py [--port 8765] [--latency 毫秒] [--fail-rate 0.2] [--fail-mode error]
+然后设置 METER_BASE_URL=http://127.0.0.1:8765 运行查询脚本。
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_api import DEFAULT_API_PATH
+
+
+DEFAULT_FIXTURE_DIR = os.path.join(PROJECT_DIR, "replay")
+DEFAULT_PORT = 8765
+FAIL_MODES = ("error", "timeout", "garbage", "reset")
+FAIL_TARGETS = ("api", "page", "all")
+# 静态资源（JS包、样式、图片）允许浏览器缓存，页面和接口每次重新请求
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json; charset=utf-8",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+}
+
+
+class ReplayConfig:
+    """回放行为配置
+
+    - latency/jitter: 每个请求额外增加的延迟（秒）及随机抖动范围，api_latency 只作用于接口
+    - fail_rate: 请求失败的概率；fail_mode: error(HTTP 503) / timeout(挂起 hang 秒) /
+      garbage(返回非JSON内容) / reset(直接断开连接)；fail_target: api / page / all
+    - balance: 指定时接口返回该余额，否则返回录制的响应文件
+    """
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR, api_path=None, latency=0.0, jitter=0.0,
+                 api_latency=0.0, fail_rate=0.0, fail_mode="error", fail_target="api",
+                 hang=30.0, balance=None, seed=None):
+        self.fixture_dir = fixture_dir
+        self.api_path = api_path or os.environ.get("METER_API_PATH", DEFAULT_API_PATH)
+        self.latency = latency
+        self.jitter = jitter
+        self.api_latency = api_latency
+        self.fail_rate = fail_rate
+        self.fail_mode = fail_mode
+        self.fail_target = fail_target
+        self.hang = hang
+        self.balance = balance
+        self.random = random.Random(seed)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """按路径返回录制文件；接口路径返回录制的JSON响应"""
+
+    server_version = "MeterReplay/1.0"
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._handle()
+
+    def _handle(self):
+        config = self.server.config
+        path = urlsplit(self.path).path
+        is_api = path == config.api_path
+        self.server.count(path)
+
+        delay = config.latency + (config.api_latency if is_api else 0.0)
+        if config.jitter:
+            delay += config.random.uniform(0, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        targeted = config.fail_target == "all" or (config.fail_target == "api") == is_api
+        if targeted and config.fail_rate and config.random.random() < config.fail_rate:
+            self.server.count("__failures__")
+            return self._fail(config)
+
+        if is_api:
+            return self._send_api(config)
+        return self._send_file(config, path)
+
+    def _fail(self, config):
+        if config.fail_mode == "reset":
+            self.close_connection = True
+            self.connection.close()
+            return
+        if config.fail_mode == "timeout":
+            time.sleep(config.hang)
+        if config.fail_mode == "garbage":
+            return self._send(200, b"<html>webvpn login</html>", "application/json; charset=utf-8")
+        return self._send(503, b"Service Unavailable", "text/plain; charset=utf-8")
+
+    def _send_api(self, config):
+        if config.balance is not None:
+            body = json.dumps(
+                {"code": 200, "msg": "success", "data": {"remainPower": str(config.balance)}}
+            ).encode("utf-8")
+            return self._send(200, body, CONTENT_TYPES[".json"])
+        return self._send_file(config, f"{config.api_path}.json")
+
+    def _send_file(self, config, path):
+        root = os.path.realpath(config.fixture_dir)
+        file_path = os.path.realpath(os.path.join(root, path.lstrip("/")))
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "index.html")
+        if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+            return self._send(404, b"Not Found", "text/plain; charset=utf-8")
+        with open(file_path, "rb") as f:
+            body = f.read()
+        content_type = CONTENT_TYPES.get(os.path.splitext(file_path)[1], "application/octet-stream")
+        is_static = "/static/" in path
+        return self._send(200, body, content_type, STATIC_CACHE_CONTROL if is_static else "no-store")
+
+    def _send(self, status, body, content_type, cache_control="no-store"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """在后台线程中运行的回放服务器，记录各路径的请求次数"""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), ReplayHandler)
+        self.config = config or ReplayConfig()
+        self.requests = {}
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path):
+        with self._count_lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def reset_counts(self):
+        """清空并返回请求计数"""
+        with self._count_lock:
+            counts, self.requests = self.requests, {}
+        return counts
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self.serve_forever, name="replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_replay_arguments(parser):
+    """添加回放行为相关的命令行参数（基准测试脚本共用）"""
+    parser.add_argument("--fixture-dir", default=DEFAULT_FIXTURE_DIR, help="录制文件目录")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的额外延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机抖动范围（毫秒）")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="接口请求的额外延迟（毫秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="请求失败的概率（0-1）")
+    parser.add_argument("--fail-mode", choices=FAIL_MODES, default="error")
+    parser.add_argument("--fail-target", choices=FAIL_TARGETS, default="api")
+    parser.add_argument("--hang", type=float, default=30.0, help="timeout 故障挂起的秒数")
+    parser.add_argument("--balance", type=float, default=None, help="接口返回的余额")
+    parser.add_argument("--seed", type=int, default=None, help="故障注入的随机种子")
+
+
+def config_from_args(args):
+    """由命令行参数构造回放配置"""
+    return ReplayConfig(
+        fixture_dir=args.fixture_dir,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        api_latency=args.api_latency / 1000,
+        fail_rate=args.fail_rate,
+        fail_mode=args.fail_mode,
+        fail_target=args.fail_target,
+        hang=args.hang,
+        balance=args.balance,
+        seed=args.seed,
+    )
+
+
+def main():
+    """主函数：在前台运行回放服务器"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="电表查询页面离线回放服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+
+    server = ReplayServer(config_from_args(args), args.host, args.port)
+    logging.info(f"回放服务器已启动: {server.base_url}（设置 METER_BASE_URL={server.base_url}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
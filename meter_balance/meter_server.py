@@ -0,0 +1,453 @@
+"""本地读取接口：基于标准库的HTTP服务器，直接从读数数据库提供最新余额、读数区间和摘要
+
+用法: python meter_server.py [--host 127.0.0.1] [--port 8787]
+
+接口（meter 参数省略时为默认电表）:
+- GET /api/meters                      所有电表及最后更新时间
+- GET /api/latest?meter=               最新余额
+- GET /api/readings?meter=&start=&end=&resolution=daily|hourly|raw
+                                       读数区间，start/end 为日期或时间前缀（闭区间）；
+                                       daily 的返回格式与 data.json 相同
+- GET /api/summary?meter=              仪表盘摘要（与 summary.json 相同）
+- GET /data/<文件>.json                 月度分区和清单（meter_partitions 导出的文件）
+
+响应带有 ETag 和 Last-Modified，未变化时返回304；客户端支持时使用gzip压缩，
+有 .br/.gz 预压缩版本的文件按 Accept-Encoding 直接返回预压缩版本。
+数据库没有新的写入时，相同请求直接返回缓存的响应，不再查询数据库。
+同时提供网站文件，打开 http://127.0.0.1:8787/?api 即可让仪表盘改用本接口。
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_store import DEFAULT_METER
+from meter_balance.meter_summary import build_summary
+from meter_balance.update_meter_data import get_partition_dir, open_store
+
+
+DEFAULT_PORT = 8787
+SITE_DIR = PROJECT_DIR
+SITE_FILES = {
+    "/": "index.html",
+    "/index.html": "index.html",
+    "/script.js": "script.js",
+    "/styles.css": "styles.css",
+    "/favicon.svg": "favicon.svg",
+}
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".json": "application/json; charset=utf-8",
+}
+PARTITION_PREFIX = "/data/"
+PARTITION_FILE_RE = re.compile(r"[\w-]+\.json")
+# 预压缩版本的后缀和对应的 Content-Encoding，按优先级排列
+PRECOMPRESSED = ((".br", "br"), (".gz", "gzip"))
+# 每次使用前向服务器验证（配合ETag返回304）
+CACHE_CONTROL = "no-cache"
+# 小于该字节数的响应不压缩
+GZIP_MIN_SIZE = 512
+RESOLUTIONS = ("daily", "hourly", "raw")
+BEIJING_TZ = timezone(timedelta(hours=8))
+TIME_PREFIX_RE = re.compile(r"\d{4}(-\d{2}(-\d{2}( \d{2}(:\d{2}(:\d{2})?)?)?)?)?")
+
+
+class ApiError(Exception):
+    """返回给客户端的错误（HTTP状态码和说明）"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _time_param(params, name):
+    value = _param(params, name)
+    if value is not None and not TIME_PREFIX_RE.fullmatch(value):
+        raise ApiError(400, f"无效的 {name}: {value}（应为 YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS 的前缀）")
+    return value
+
+
+def _meter_param(store, params):
+    meter = _param(params, "meter", DEFAULT_METER)
+    if meter not in store.meters():
+        raise ApiError(404, f"未知的电表: {meter}")
+    return meter
+
+
+def meters_view(store, params):
+    meters = [{"meter": meter, "last_updated": store.last_updated(meter)} for meter in store.meters()]
+    last_updated = max((m["last_updated"] for m in meters if m["last_updated"]), default=None)
+    return {"meters": meters}, last_updated
+
+
+def latest_view(store, params):
+    meter = _meter_param(store, params)
+    last_updated = store.last_updated(meter)
+    recent = store.recent_days(meter, limit=1)
+    if not recent:
+        raise ApiError(404, f"电表 {meter} 没有读数")
+    date, balance, usage = recent[-1]
+    payload = {
+        "meter": meter,
+        "date": date,
+        "balance": balance,
+        "usage": None if usage is None else round(usage, 2),
+        "last_updated": last_updated,
+    }
+    return payload, last_updated
+
+
+def readings_view(store, params):
+    meter = _meter_param(store, params)
+    resolution = _param(params, "resolution", "daily")
+    if resolution not in RESOLUTIONS:
+        raise ApiError(400, f"无效的 resolution: {resolution}（可选 {', '.join(RESOLUTIONS)}）")
+    start = _time_param(params, "start")
+    end = _time_param(params, "end")
+    last_updated = store.last_updated(meter)
+
+    payload = {"meter": meter, "resolution": resolution}
+    if last_updated:
+        payload["last_updated"] = last_updated
+    if resolution == "daily":
+        # 与 data.json 相同的格式，仪表盘可以直接使用；end 按前缀匹配（end=2025-05 包含整个5月）
+        rows = store.daily_series(meter, start, end + "\uffff" if end else None)
+        payload["daily_data"] = [{"date": date, "balance": balance} for date, balance in rows]
+    elif resolution == "hourly":
+        payload["hourly_data"] = store.hourly_series(meter, start, end)
+    else:
+        payload["raw_data"] = [
+            {"time": taken_at, "balance": balance}
+            for taken_at, balance in store.raw_series(meter, start, end)
+        ]
+    return payload, last_updated
+
+
+def summary_view(store, params):
+    meter = _meter_param(store, params)
+    summary = build_summary(store, meter)
+    return summary, summary.get("last_updated")
+
+
+ROUTES = {
+    "/api/meters": meters_view,
+    "/api/latest": latest_view,
+    "/api/readings": readings_view,
+    "/api/summary": summary_view,
+}
+
+
+def http_date(beijing_time):
+    """北京时间字符串转换为HTTP日期（Last-Modified）"""
+    moment = datetime.strptime(beijing_time, "%Y-%m-%d %H:%M:%S").replace(tzinfo=BEIJING_TZ)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def make_etag(body):
+    return f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+def accepted_encodings(accept_encoding):
+    """Accept-Encoding 中客户端接受的编码（q=0 表示不接受）"""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+def gzip_matches(body, compressed):
+    """gzip尾部记录的CRC32和长度是否与原内容一致（预压缩文件与原文件属于同一次写入）"""
+    if len(compressed) < 18:
+        return False
+    return struct.unpack("<II", compressed[-8:]) == (zlib.crc32(body), len(body) & 0xFFFFFFFF)
+
+
+class Response:
+    """一个可缓存的响应：原始内容、压缩版本、ETag和Last-Modified
+
+    variants 为预压缩的内容 {Content-Encoding: 内容}；没有预压缩的gzip版本时按需生成。
+    """
+
+    def __init__(self, body, content_type, last_modified=None, status=200, variants=None):
+        self.body = body
+        self.content_type = content_type
+        self.last_modified = last_modified
+        self.status = status
+        self.etag = make_etag(body)
+        self._variants = dict(variants or {})
+
+    def encoded(self, accept_encoding):
+        """按客户端支持的编码返回 (内容, Content-Encoding, ETag)"""
+        accepted = accepted_encodings(accept_encoding)
+        if len(self.body) < GZIP_MIN_SIZE:
+            return self.body, None, self.etag
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self._variants:
+                return self._variants[encoding], encoding, f'{self.etag[:-1]}-{encoding}"'
+        if "gzip" not in accepted:
+            return self.body, None, self.etag
+        # mtime=0 保证相同内容生成相同的压缩结果
+        self._variants["gzip"] = gzip.compress(self.body, mtime=0)
+        return self._variants["gzip"], "gzip", f'{self.etag[:-1]}-gzip"'
+
+    def not_modified(self, headers, etag):
+        """请求中的条件是否表明客户端缓存仍然有效"""
+        if_none_match = headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if_modified_since = headers.get("If-Modified-Since")
+        if if_modified_since and self.last_modified:
+            try:
+                return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(self.last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """处理接口请求和网站文件请求"""
+
+    server_version = "MeterServer/1.0"
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._send_cors_headers()
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "If-None-Match, If-Modified-Since")
+        self.send_header("Access-Control-Max-Age", "86400")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _handle(self, send_body):
+        url = urlsplit(self.path)
+        if url.path in ROUTES:
+            response = self.server.api_response(url.path, url.query)
+        elif url.path in SITE_FILES:
+            response = self.server.site_response(SITE_FILES[url.path])
+        elif url.path.startswith(PARTITION_PREFIX):
+            response = self.server.partition_response(url.path[len(PARTITION_PREFIX):])
+        else:
+            response = error_response(404, "Not Found")
+        self._send(response, send_body)
+
+    def _send_cors_headers(self):
+        # 仪表盘部署在其他域名时也可以使用本接口
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "ETag, Last-Modified")
+
+    def _send(self, response, send_body):
+        body, encoding, etag = response.encoded(self.headers.get("Accept-Encoding"))
+        cacheable = response.status == 200
+        status = 304 if cacheable and response.not_modified(self.headers, etag) else response.status
+        self.server.count(status)
+
+        self.send_response(status)
+        self._send_cors_headers()
+        if cacheable:
+            self.send_header("ETag", etag)
+            if response.last_modified:
+                self.send_header("Last-Modified", response.last_modified)
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.send_header("Vary", "Accept-Encoding")
+        else:
+            self.send_header("Cache-Control", "no-store")
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", response.content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def json_response(payload, last_updated=None, status=200):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    last_modified = http_date(last_updated) if last_updated else None
+    return Response(body, CONTENT_TYPES[".json"], last_modified, status)
+
+
+def error_response(status, message):
+    return json_response({"error": message}, status=status)
+
+
+class MeterApiServer(ThreadingHTTPServer):
+    """读取接口服务器
+
+    接口响应按 (数据库版本, 路径, 查询参数) 缓存；其他进程写入数据库后 PRAGMA data_version 变化，
+    缓存随之失效。网站文件和月度分区按修改时间缓存。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, store, host="127.0.0.1", port=DEFAULT_PORT, site_dir=SITE_DIR,
+                 partition_dir=None):
+        super().__init__((host, port), ApiHandler)
+        self.store = store
+        self.site_dir = site_dir
+        self.partition_dir = partition_dir or get_partition_dir()
+        self.stats = {}
+        self._cache = {}
+        self._cache_version = None
+        self._site_cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, status):
+        with self._lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    def api_response(self, path, query):
+        version = self.store.data_version()
+        key = (path, query)
+        with self._lock:
+            if version != self._cache_version:
+                self._cache = {}
+                self._cache_version = version
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            payload, last_updated = ROUTES[path](self.store, parse_qs(query))
+            response = json_response(payload, last_updated)
+        except ApiError as e:
+            return error_response(e.status, str(e))
+        except Exception as e:
+            logging.getLogger(__name__).error(f"处理请求 {path}?{query} 时出错: {str(e)}")
+            return error_response(500, "Internal Server Error")
+
+        with self._lock:
+            if version == self._cache_version:
+                self._cache[key] = response
+        return response
+
+    def site_response(self, name):
+        return self.file_response(os.path.join(self.site_dir, name))
+
+    def partition_response(self, name):
+        if not PARTITION_FILE_RE.fullmatch(name):
+            return error_response(404, "Not Found")
+        return self.file_response(os.path.join(self.partition_dir, name))
+
+    def file_response(self, path):
+        """读取文件及其预压缩版本，文件和预压缩版本的修改时间都未变化时返回缓存的响应
+
+        预压缩版本比原文件旧（原文件已更新、预压缩版本尚未写入）时不使用，改为按需压缩。
+        """
+        def mtime(file_path):
+            try:
+                return os.path.getmtime(file_path)
+            except OSError:
+                return None
+
+        versions = (mtime(path),) + tuple(mtime(f"{path}{suffix}") for suffix, _ in PRECOMPRESSED)
+        if versions[0] is None:
+            return error_response(404, "Not Found")
+        with self._lock:
+            cached = self._site_cache.get(path)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+            variants = {}
+            for (suffix, encoding), variant_mtime in zip(PRECOMPRESSED, versions[1:]):
+                if variant_mtime is None or variant_mtime < versions[0]:
+                    continue
+                with open(f"{path}{suffix}", "rb") as f:
+                    variants[encoding] = f.read()
+        except OSError:
+            return error_response(404, "Not Found")
+        if "gzip" in variants and not gzip_matches(body, variants["gzip"]):
+            del variants["gzip"]
+
+        last_modified = format_datetime(datetime.fromtimestamp(int(versions[0]), timezone.utc), usegmt=True)
+        response = Response(body, CONTENT_TYPES[os.path.splitext(path)[1]], last_modified,
+                            variants=variants)
+        with self._lock:
+            self._site_cache[path] = (versions, response)
+        return response
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        threading.Thread(target=self.serve_forever, name="meter-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(host=None, port=None):
+    """主函数：在前台运行读取接口服务器"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if host is None and port is None:
+        parser = argparse.ArgumentParser(description="电表读数本地读取接口")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+        args = parser.parse_args()
+        host, port = args.host, args.port
+
+    with open_store() as store:
+        server = MeterApiServer(store, host or "127.0.0.1", port or DEFAULT_PORT)
+        logging.info(f"读取接口已启动: {server.base_url}（仪表盘: {server.base_url}/?api）")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""构建Cloudflare Pages部署目录：内联最新摘要、压缩静态资源并按内容哈希命名、生成 _headers
+
+用法: python meter_site.py [输出目录]（默认 dist）
+
+- index.html 中内联 summary.json，首次打开页面不必再单独请求摘要
+- script.js/styles.css 去除注释和缩进，与 favicon.svg 一起以内容哈希命名放在 assets/ 下，可永久缓存
+- 数据文件（data.json、summary.json、data/ 月度分区）原名复制，使用较短的缓存时间
+- 内容未变化的文件不会重写，上次构建遗留的文件会被删除；相同输入总是生成相同的输出，
+  Wrangler部署时只上传内容发生变化的文件
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_files import write_atomic
+
+SITE_DIR = PROJECT_DIR
+DEFAULT_OUTPUT_DIR = os.path.join(SITE_DIR, "dist")
+ASSET_DIR = "assets"
+# 按内容哈希命名的静态资源
+ASSET_FILES = ("script.js", "styles.css", "favicon.svg")
+# 原名复制的数据文件和目录
+DATA_FILES = ("data.json", "summary.json")
+DATA_DIRS = ("data",)
+SUMMARY_FILE = "summary.json"
+INLINE_SUMMARY_ID = "initial-summary"
+
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PAGE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+DATA_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=3600"
+
+# 可以出现在正则表达式字面量之前的字符和关键字（否则 / 为除号）
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "void", "yield", "await")
+
+
+def content_hash(content, length=10):
+    """内容哈希，用于资源文件名"""
+    return hashlib.sha256(content).hexdigest()[:length]
+
+
+def hashed_name(name, content):
+    """script.js -> script.<哈希>.js"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{content_hash(content)}{ext}"
+
+
+def _skip_quoted(source, i, quote):
+    """返回从 i（引号位置）开始的字符串字面量结束后的位置"""
+    j = i + 1
+    while j < len(source) and source[j] != quote:
+        j += 2 if source[j] == "\\" else 1
+    return j + 1
+
+
+def minify_js(source):
+    """去除JS中的注释、缩进、行尾空白和空行
+
+    保留换行以避免自动分号插入的问题；字符串、模板字符串和正则表达式字面量原样保留。
+    """
+    out = []
+    templates = []  # 模板字符串中 ${...} 的花括号嵌套深度
+    i = 0
+    n = len(source)
+
+    def last_code_char():
+        for chunk in reversed(out):
+            stripped = chunk.strip()
+            if stripped:
+                return stripped[-1]
+        return ""
+
+    def regex_allowed():
+        last = last_code_char()
+        if not last or last in _REGEX_PRECEDERS:
+            return True
+        word = re.search(r"[A-Za-z_$]+$", "".join(out[-12:]).rstrip())
+        return bool(word) and word.group() in _REGEX_KEYWORDS
+
+    while i < n:
+        c = source[i]
+
+        if c in "'\"":
+            j = _skip_quoted(source, i, c)
+            out.append(source[i:j])
+            i = j
+            continue
+
+        if c == "`" or (c == "}" and templates and templates[-1] == 0):
+            # 模板字符串开始，或 ${...} 结束后继续模板字符串
+            if c == "}":
+                templates.pop()
+            j = i + 1
+            while j < n and source[j] != "`":
+                if source[j] == "\\":
+                    j += 2
+                    continue
+                if source.startswith("${", j):
+                    templates.append(0)
+                    j += 2
+                    break
+                j += 1
+            else:
+                j += 1
+            out.append(source[i:j])
+            i = j
+            continue
+
+        if c == "/" and source.startswith("//", i):
+            i = source.find("\n", i)
+            i = n if i < 0 else i
+            continue
+
+        if c == "/" and source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            if "\n" in source[i:end]:
+                out.append("\n")
+            i = end
+            continue
+
+        if c == "/" and regex_allowed():
+            # 正则表达式字面量
+            j = i + 1
+            in_class = False
+            while j < n and (source[j] != "/" or in_class) and source[j] != "\n":
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "[":
+                    in_class = True
+                elif source[j] == "]":
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and source[j].isalpha():
+                j += 1
+            out.append(source[i:j])
+            i = j
+            continue
+
+        if c == "{" and templates:
+            templates[-1] += 1
+        elif c == "}" and templates:
+            templates[-1] -= 1
+
+        if c in "\r\n":
+            # 去掉行尾空白，合并空行
+            while out and out[-1] in (" ", "\t"):
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+        elif c in " \t":
+            if out and out[-1] not in (" ", "\n"):
+                out.append(" ")
+        else:
+            out.append(c)
+        i += 1
+
+    return "".join(out).strip() + "\n"
+
+
+def minify_css(source):
+    """去除CSS中的注释和多余空白（字符串原样保留）"""
+    out = []
+    i = 0
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c in "'\"":
+            j = _skip_quoted(source, i, c)
+            out.append(source[i:j])
+            i = j
+            continue
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if c.isspace():
+            # 空白合并为一个空格，分隔符两侧的空白删除
+            while i < n and source[i].isspace():
+                i += 1
+            if out and out[-1] not in "{};:,>" and i < n and source[i] not in "{};,>":
+                out.append(" ")
+            continue
+        if c == "}" and out and out[-1] == ";":
+            out.pop()
+        out.append(c)
+        i += 1
+    return "".join(out).strip() + "\n"
+
+
+def minify_asset(name, content):
+    """按扩展名压缩资源，其他类型原样返回"""
+    if name.endswith(".js"):
+        return minify_js(content.decode("utf-8")).encode("utf-8")
+    if name.endswith(".css"):
+        return minify_css(content.decode("utf-8")).encode("utf-8")
+    return content
+
+
+def render_html(html, asset_paths, summary=None):
+    """改写 index.html：引用哈希命名的资源、外部脚本延迟执行并预连接其域名、内联摘要"""
+    for name, path in asset_paths.items():
+        # 去掉手工维护的 ?v= 缓存参数
+        html = re.sub(rf'((?:href|src)=")(?:\./)?{re.escape(name)}(?:\?[^"]*)?"', rf'\g<1>{path}"', html)
+
+    # 脚本全部改为defer，不再阻塞首次渲染；执行顺序与原来一致
+    html = re.sub(r"<script (?![^>]*\bdefer\b)([^>]*\bsrc=)", r"<script defer \1", html)
+
+    newline = "\r\n" if "\r\n" in html else "\n"
+    # 在第一个外部脚本之前预连接其域名
+    external = re.search(r'<script[^>]*\bsrc="(https?://[^/"]+)', html)
+    if external:
+        origins = sorted(set(re.findall(r'<script[^>]*\bsrc="(https?://[^/"]+)', html)))
+        links = f"{newline}    ".join(f'<link rel="preconnect" href="{origin}" crossorigin>' for origin in origins)
+        html = f"{html[:external.start()]}{links}{newline}    {html[external.start():]}"
+    if summary is not None:
+        data = json.dumps(summary, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+        tag = f'<script id="{INLINE_SUMMARY_ID}" type="application/json">{data}</script>'
+        html = html.replace("</head>", f"    {tag}{newline}</head>", 1)
+    return html
+
+
+def build_headers(asset_dir=ASSET_DIR, data_files=DATA_FILES, data_dirs=DATA_DIRS):
+    """生成Cloudflare Pages的 _headers 文件内容"""
+    rules = [
+        (f"/{asset_dir}/*", ASSET_CACHE_CONTROL),
+        ("/", PAGE_CACHE_CONTROL),
+        ("/index.html", PAGE_CACHE_CONTROL),
+    ]
+    rules += [(f"/{name}", DATA_CACHE_CONTROL) for name in data_files]
+    rules += [(f"/{name}/*", DATA_CACHE_CONTROL) for name in data_dirs]
+    lines = ["# 由 meter_site.py 生成：哈希命名的资源永久缓存，页面每次验证，数据短时间缓存"]
+    for path, cache_control in rules:
+        lines += [path, f"  Cache-Control: {cache_control}", ""]
+    return "\n".join(lines).encode("utf-8")
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def collect_site_files(source_dir=SITE_DIR):
+    """生成部署目录中的全部文件：{相对路径: 内容}"""
+    files = {}
+    asset_paths = {}
+    for name in ASSET_FILES:
+        content = minify_asset(name, _read(os.path.join(source_dir, name)))
+        path = f"{ASSET_DIR}/{hashed_name(name, content)}"
+        files[path] = content
+        asset_paths[name] = path
+
+    summary = None
+    summary_path = os.path.join(source_dir, SUMMARY_FILE)
+    if os.path.exists(summary_path):
+        try:
+            summary = json.loads(_read(summary_path))
+        except ValueError as e:
+            logging.warning(f"摘要文件格式错误，不内联摘要: {str(e)}")
+
+    html = _read(os.path.join(source_dir, "index.html")).decode("utf-8")
+    files["index.html"] = render_html(html, asset_paths, summary).encode("utf-8")
+
+    for name in DATA_FILES:
+        path = os.path.join(source_dir, name)
+        if os.path.exists(path):
+            files[name] = _read(path)
+    for name in DATA_DIRS:
+        for root, _, filenames in os.walk(os.path.join(source_dir, name)):
+            for filename in sorted(filenames):
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, filename)
+                files[os.path.relpath(path, source_dir).replace(os.sep, "/")] = _read(path)
+
+    files["_headers"] = build_headers()
+    return files
+
+
+def sync_dir(output_dir, files):
+    """把文件写入输出目录：只重写内容变化的文件，删除不再需要的文件，返回统计"""
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+    for relpath, content in files.items():
+        path = os.path.join(output_dir, *relpath.split("/"))
+        try:
+            if _read(path) == content:
+                stats["unchanged"] += 1
+                continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, content)
+        stats["written"] += 1
+
+    wanted = {os.path.join(output_dir, *relpath.split("/")) for relpath in files}
+    for root, dirs, filenames in os.walk(output_dir, topdown=False):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if path not in wanted:
+                os.remove(path)
+                stats["removed"] += 1
+        if root != output_dir and not os.listdir(root):
+            os.rmdir(root)
+    return stats
+
+
+def build_site(output_dir=DEFAULT_OUTPUT_DIR, source_dir=SITE_DIR):
+    """构建部署目录，返回写入、未变化和删除的文件数"""
+    os.makedirs(output_dir, exist_ok=True)
+    stats = sync_dir(output_dir, collect_site_files(source_dir))
+    logging.info(
+        f"网站已构建到 {output_dir}: 写入 {stats['written']} 个文件，"
+        f"未变化 {stats['unchanged']} 个，删除 {stats['removed']} 个"
+    )
+    return stats
+
+
+def main(output_dir=None):
+    """主函数"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if output_dir is None:
+        output_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_OUTPUT_DIR
+    try:
+        build_site(output_dir)
+    except OSError as e:
+        logging.error(f"构建网站失败: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""电表读数存储：SQLite数据库，按 (电表, 日期) 建立主键索引
+
+除每天一条的读数外，还按保留期限分级保存日内读数：
+- 原始读数（每次查询的时间和余额）保留 raw_retention_days 天（默认30）
+- 每小时汇总（首末、最低、最高余额和读数次数）保留 hourly_retention_days 天（默认365）
+- 每日读数永久保留
+
+每小时汇总在写入原始读数时增量更新，原始读数过期后直接删除，不需要额外的降采样任务。
+"""
+
+import datetime
+import sqlite3
+import threading
+
+
+DEFAULT_METER = "default"
+# 其他进程正在写入时等待的秒数
+BUSY_TIMEOUT = 30.0
+RAW_RETENTION_DAYS = 30
+HOURLY_RETENTION_DAYS = 365
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_readings (
+    meter TEXT NOT NULL,
+    date TEXT NOT NULL,
+    balance REAL NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (meter, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meters (
+    meter TEXT PRIMARY KEY,
+    last_updated TEXT
+);
+
+CREATE TABLE IF NOT EXISTS daily_usage (
+    meter TEXT NOT NULL,
+    date TEXT NOT NULL,
+    usage REAL NOT NULL,
+    PRIMARY KEY (meter, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS usage_rollups (
+    meter TEXT NOT NULL,
+    period TEXT NOT NULL,
+    key TEXT NOT NULL,
+    usage REAL NOT NULL,
+    PRIMARY KEY (meter, period, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS raw_readings (
+    meter TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    balance REAL NOT NULL,
+    PRIMARY KEY (meter, taken_at)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS raw_readings_taken_at ON raw_readings (taken_at);
+
+CREATE TABLE IF NOT EXISTS hourly_readings (
+    meter TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    first_at TEXT NOT NULL,
+    first_balance REAL NOT NULL,
+    last_at TEXT NOT NULL,
+    last_balance REAL NOT NULL,
+    min_balance REAL NOT NULL,
+    max_balance REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (meter, hour)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS hourly_readings_hour ON hourly_readings (hour);
+"""
+
+
+def retention_cutoff(timestamp, days):
+    """timestamp（'YYYY-MM-DD HH:MM:SS'）之前 days 天的时间字符串"""
+    moment = datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    return (moment - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def rollup_keys(date):
+    """日期所属的周（ISO周）和月份汇总键"""
+    year, week, _ = datetime.date.fromisoformat(date).isocalendar()
+    return {"week": f"{year}-W{week:02d}", "month": date[:7]}
+
+
+class MeterStore:
+    """电表读数存储
+
+    - 同一电表同一天的读数通过主键索引直接更新（upsert），不需要扫描历史
+    - 每次写入都在一个事务中完成，写入中途崩溃不会破坏已有数据
+    - 可以随时导出与 data.json 相同格式的数据
+    - 日内读数按保留期限分级保存，期限以最新读数的时间为准
+    """
+
+    def __init__(self, path, raw_retention_days=RAW_RETENTION_DAYS,
+                 hourly_retention_days=HOURLY_RETENTION_DAYS):
+        self.path = path
+        self.raw_retention_days = raw_retention_days
+        self.hourly_retention_days = hourly_retention_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        self._backfill_usage()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def check_integrity(self):
+        """快速检查数据库文件是否损坏"""
+        with self._lock:
+            return self._conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+
+    def data_version(self):
+        """数据库版本号：其他连接（包括其他进程）提交写入后会变化，可用于判断缓存是否过期"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def is_empty(self):
+        """数据库中是否还没有任何读数"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM daily_readings LIMIT 1").fetchone() is None
+
+    def upsert_many(self, readings, raw=True):
+        """批量写入 (电表, 日期, 余额, 更新时间) 读数，同一天已有读数时只用更新时间不早于它的读数覆盖
+
+        raw 为真时更新时间是实际的读数时间，同时保存原始读数并更新每小时汇总，
+        然后删除超过保留期限的原始读数和每小时汇总。
+        """
+        readings = list(readings)
+        if not readings:
+            return 0
+        last_updated = {}
+        for meter, _, _, updated_at in readings:
+            last_updated[meter] = max(updated_at, last_updated.get(meter, updated_at))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO daily_readings (meter, date, balance, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (meter, date) DO UPDATE SET
+                    balance = excluded.balance,
+                    updated_at = excluded.updated_at
+                WHERE excluded.updated_at >= daily_readings.updated_at
+                """,
+                readings,
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO meters (meter, last_updated) VALUES (?, ?)
+                ON CONFLICT (meter) DO UPDATE SET
+                    last_updated = max(coalesce(last_updated, ''), excluded.last_updated)
+                """,
+                list(last_updated.items()),
+            )
+            # 增量更新受影响日期及其后一天的用电量和汇总
+            for meter, date in sorted({(r[0], r[1]) for r in readings}):
+                self._refresh_usage(meter, date)
+                next_row = self._conn.execute(
+                    "SELECT date FROM daily_readings WHERE meter = ? AND date > ? "
+                    "ORDER BY date LIMIT 1",
+                    (meter, date),
+                ).fetchone()
+                if next_row:
+                    self._refresh_usage(meter, next_row[0])
+            if raw:
+                now = self._conn.execute("SELECT max(last_updated) FROM meters").fetchone()[0]
+                raw_cutoff = (
+                    retention_cutoff(now, self.raw_retention_days)
+                    if self.raw_retention_days is not None else ""
+                )
+                for meter, _, balance, taken_at in readings:
+                    self._add_raw(meter, taken_at, balance, raw_cutoff)
+                self._expire(now)
+        return len(readings)
+
+    def _add_raw(self, meter, taken_at, balance, raw_cutoff=""):
+        """保存一条原始读数并合并到所在小时的汇总中（同一时间的重复读数只计一次）
+
+        早于原始读数保留期限的读数（如补录的旧日志）无法再与已删除的原始读数去重，
+        只在该小时还没有汇总时写入汇总。
+        """
+        hour = taken_at[:13]
+        if taken_at < raw_cutoff:
+            self._conn.execute(
+                """
+                INSERT OR IGNORE INTO hourly_readings (meter, hour, first_at, first_balance, last_at,
+                                                       last_balance, min_balance, max_balance, samples)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+                """,
+                (meter, hour, taken_at, balance, taken_at, balance, balance, balance),
+            )
+            return
+        inserted = self._conn.execute(
+            "INSERT OR IGNORE INTO raw_readings (meter, taken_at, balance) VALUES (?, ?, ?)",
+            (meter, taken_at, balance),
+        ).rowcount
+        if not inserted:
+            return
+        self._conn.execute(
+            """
+            INSERT INTO hourly_readings (meter, hour, first_at, first_balance, last_at,
+                                         last_balance, min_balance, max_balance, samples)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT (meter, hour) DO UPDATE SET
+                first_balance = CASE WHEN excluded.first_at < first_at
+                                     THEN excluded.first_balance ELSE first_balance END,
+                first_at = min(first_at, excluded.first_at),
+                last_balance = CASE WHEN excluded.last_at >= last_at
+                                    THEN excluded.last_balance ELSE last_balance END,
+                last_at = max(last_at, excluded.last_at),
+                min_balance = min(min_balance, excluded.min_balance),
+                max_balance = max(max_balance, excluded.max_balance),
+                samples = samples + 1
+            """,
+            (meter, hour, taken_at, balance, taken_at, balance, balance, balance),
+        )
+
+    def _expire(self, now):
+        """删除超过保留期限的原始读数和每小时汇总（每日读数永久保留）"""
+        if self.raw_retention_days is not None:
+            self._conn.execute(
+                "DELETE FROM raw_readings WHERE taken_at < ?",
+                (retention_cutoff(now, self.raw_retention_days),),
+            )
+        if self.hourly_retention_days is not None:
+            self._conn.execute(
+                "DELETE FROM hourly_readings WHERE hour < ?",
+                (retention_cutoff(now, self.hourly_retention_days)[:13],),
+            )
+
+    def _refresh_usage(self, meter, date):
+        """重新计算某天的用电量（与前一条读数的差值，充值时记为0），并把变化量计入周/月汇总"""
+        row = self._conn.execute(
+            "SELECT balance FROM daily_readings WHERE meter = ? AND date = ?", (meter, date)
+        ).fetchone()
+        prev = self._conn.execute(
+            "SELECT balance FROM daily_readings WHERE meter = ? AND date < ? "
+            "ORDER BY date DESC LIMIT 1",
+            (meter, date),
+        ).fetchone()
+        old = self._conn.execute(
+            "SELECT usage FROM daily_usage WHERE meter = ? AND date = ?", (meter, date)
+        ).fetchone()
+
+        new_usage = max(0.0, prev[0] - row[0]) if row and prev else None
+        if new_usage is None:
+            self._conn.execute(
+                "DELETE FROM daily_usage WHERE meter = ? AND date = ?", (meter, date)
+            )
+        else:
+            self._conn.execute(
+                "INSERT INTO daily_usage (meter, date, usage) VALUES (?, ?, ?) "
+                "ON CONFLICT (meter, date) DO UPDATE SET usage = excluded.usage",
+                (meter, date, new_usage),
+            )
+
+        delta = (new_usage or 0.0) - (old[0] if old else 0.0)
+        if delta:
+            for period, key in rollup_keys(date).items():
+                self._conn.execute(
+                    "INSERT INTO usage_rollups (meter, period, key, usage) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (meter, period, key) DO UPDATE SET usage = usage + excluded.usage",
+                    (meter, period, key, delta),
+                )
+
+    def _backfill_usage(self):
+        """旧数据库没有用电量表时，一次性按历史读数补算"""
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM daily_usage LIMIT 1").fetchone():
+                return
+            rows = self._conn.execute(
+                "SELECT meter, date FROM daily_readings ORDER BY meter, date"
+            ).fetchall()
+            for meter, date in rows:
+                self._refresh_usage(meter, date)
+
+    def recent_days(self, meter=DEFAULT_METER, limit=7):
+        """最近 limit 条读数及当天用电量（没有前一条读数时为None），按日期升序"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT r.date, r.balance, u.usage
+                FROM daily_readings r
+                LEFT JOIN daily_usage u ON u.meter = r.meter AND u.date = r.date
+                WHERE r.meter = ?
+                ORDER BY r.date DESC
+                LIMIT ?
+                """,
+                (meter, limit),
+            ).fetchall()
+        return rows[::-1]
+
+    def rollups(self, meter=DEFAULT_METER, period="month", limit=12):
+        """最近 limit 个周期（week/month）的用电量汇总，按时间升序"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, usage FROM usage_rollups WHERE meter = ? AND period = ? "
+                "ORDER BY key DESC LIMIT ?",
+                (meter, period, limit),
+            ).fetchall()
+        return rows[::-1]
+
+    def raw_series(self, meter=DEFAULT_METER, start=None, end=None):
+        """按时间升序返回保留期内的原始读数 (时间, 余额)，可选时间范围（闭区间，前缀匹配）"""
+        sql = "SELECT taken_at, balance FROM raw_readings WHERE meter = ?"
+        params = [meter]
+        if start:
+            sql += " AND taken_at >= ?"
+            params.append(start)
+        if end:
+            sql += " AND taken_at <= ?"
+            params.append(end + "\uffff")
+        sql += " ORDER BY taken_at"
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def hourly_series(self, meter=DEFAULT_METER, start=None, end=None):
+        """按小时升序返回每小时汇总及用电量
+
+        每行为 {"hour": "YYYY-MM-DD HH", "balance": 该小时最后一次读数, "min", "max", "samples",
+        "usage": 与上一个有读数的小时相比的用电量（充值时记为0，没有前一个小时时为None）}。
+        start/end 为 'YYYY-MM-DD HH' 或其前缀（闭区间）。
+        """
+        sql = (
+            "SELECT hour, last_balance, min_balance, max_balance, samples "
+            "FROM hourly_readings WHERE meter = ?"
+        )
+        params = [meter]
+        prev = None
+        with self._lock:
+            if start:
+                sql += " AND hour >= ?"
+                params.append(start)
+                row = self._conn.execute(
+                    "SELECT last_balance FROM hourly_readings WHERE meter = ? AND hour < ? "
+                    "ORDER BY hour DESC LIMIT 1",
+                    (meter, start),
+                ).fetchone()
+                prev = row[0] if row else None
+            if end:
+                sql += " AND hour <= ?"
+                params.append(end + "\uffff")
+            rows = self._conn.execute(sql + " ORDER BY hour", params).fetchall()
+
+        series = []
+        for hour, balance, low, high, samples in rows:
+            series.append({
+                "hour": hour,
+                "balance": balance,
+                "min": low,
+                "max": high,
+                "samples": samples,
+                "usage": round(max(0.0, prev - balance), 2) if prev is not None else None,
+            })
+            prev = balance
+        return series
+
+    def upsert(self, meter, date, balance, updated_at):
+        """写入单条读数"""
+        return self.upsert_many([(meter, date, float(balance), updated_at)])
+
+    def meters(self):
+        """所有电表名称"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT meter FROM meters ORDER BY meter")]
+
+    def last_updated(self, meter=DEFAULT_METER):
+        """电表最后更新时间"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_updated FROM meters WHERE meter = ?", (meter,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def daily_series(self, meter=DEFAULT_METER, start=None, end=None):
+        """按日期升序返回电表的 (日期, 余额) 列表，可选日期范围（闭区间）"""
+        sql = "SELECT date, balance FROM daily_readings WHERE meter = ?"
+        params = [meter]
+        if start:
+            sql += " AND date >= ?"
+            params.append(start)
+        if end:
+            sql += " AND date <= ?"
+            params.append(end)
+        sql += " ORDER BY date"
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def import_json(self, data, meter=DEFAULT_METER):
+        """导入 data.json 格式的数据"""
+        last_updated = data.get("last_updated") or ""
+        readings = [
+            (meter, entry["date"], float(entry["balance"]), f"{entry['date']} 00:00:00")
+            for entry in data.get("daily_data", [])
+        ]
+        # data.json 中没有实际读数时间，只写入每日读数
+        count = self.upsert_many(readings, raw=False)
+        if last_updated:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO meters (meter, last_updated) VALUES (?, ?) "
+                    "ON CONFLICT (meter) DO UPDATE SET last_updated = excluded.last_updated",
+                    (meter, last_updated),
+                )
+        return count
+
+    def export_json(self, meter=DEFAULT_METER):
+        """导出与 data.json 相同格式的数据"""
+        data = {}
+        last_updated = self.last_updated(meter)
+        if last_updated:
+            data["last_updated"] = last_updated
+        data["daily_data"] = [
+            {"date": date, "balance": balance} for date, balance in self.daily_series(meter)
+        ]
+        return data
@@ -0,0 +1,49 @@
+"""生成仪表盘摘要：当前余额、昨日用电、7日平均、预计可用天数及日/周/月用电汇总"""
+
+import math
+
+from meter_balance.meter_store import DEFAULT_METER
+
+
+def build_summary(store, meter=DEFAULT_METER, recent_limit=7, weekly_limit=8, monthly_limit=12):
+    """根据数据库中预先计算好的用电量生成摘要，只读取最近的少量记录"""
+    # 多取一条，用于计算7日平均（最近8条读数之间的7个差值）
+    recent = store.recent_days(meter, limit=recent_limit + 1)
+    summary = {"meter": meter, "last_updated": store.last_updated(meter)}
+    if not recent:
+        summary["current_balance"] = None
+        return summary
+
+    latest_date, current_balance, latest_usage = recent[-1]
+
+    # 与网站原有算法一致：只统计正的用电量（排除充值的情况）
+    usages = [usage for _, _, usage in recent[1:] if usage and usage > 0]
+    avg_usage = sum(usages) / len(usages) if usages else 0
+    estimated_days = math.floor(current_balance / avg_usage) if avg_usage > 0 else None
+
+    summary.update(
+        {
+            "latest_date": latest_date,
+            "current_balance": round(current_balance, 2),
+            "yesterday_usage": round(latest_usage or 0, 2),
+            "avg_usage_7d": round(avg_usage, 2),
+            "estimated_days": estimated_days,
+            "daily": [
+                {
+                    "date": date,
+                    "balance": round(balance, 2),
+                    "usage": None if usage is None else round(usage, 2),
+                }
+                for date, balance, usage in recent[-recent_limit:]
+            ],
+            "weekly": [
+                {"week": key, "usage": round(usage, 2)}
+                for key, usage in store.rollups(meter, "week", weekly_limit)
+            ],
+            "monthly": [
+                {"month": key, "usage": round(usage, 2)}
+                for key, usage in store.rollups(meter, "month", monthly_limit)
+            ],
+        }
+    )
+    return summary
@@ -0,0 +1,163 @@
+"""多电表并发查询：从配置文件读取电表列表，由有限大小的线程池并发查询"""
+
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+from meter_balance.query import (
+    check_low_balance,
+    get_meter_reading,
+    init_driver_pool,
+    refresh_ingester,
+    setup_logging,
+)
+from meter_balance.meter_cache import force_refresh_requested
+from meter_balance.meter_metrics import labels, span, write_metrics
+from meter_balance.update_meter_data import ingest_readings, result_line
+
+
+DEFAULT_CONFIG_FILE = "meters.json"
+DEFAULT_RESULT_FILE = "meter_results.json"
+DEFAULT_WORKERS = 4
+
+
+def load_meter_config(file_path):
+    """加载电表配置文件，返回电表列表
+
+    配置文件格式:
+    {"meters": [{"name": "101", "openid": "...", "meter_id": "...", "type_remark": "..."}]}
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    meters = config["meters"] if isinstance(config, dict) else config
+    required_keys = ["name", "openid", "meter_id", "type_remark"]
+    for index, meter in enumerate(meters):
+        missing_keys = [key for key in required_keys if not meter.get(key)]
+        if missing_keys:
+            raise ValueError(f"第 {index + 1} 个电表配置缺少字段: {', '.join(missing_keys)}")
+
+    names = [meter["name"] for meter in meters]
+    if len(set(names)) != len(names):
+        raise ValueError("电表配置中存在重复的name")
+    return meters
+
+
+def query_meter(meter, query_func=get_meter_reading):
+    """查询单个电表，返回包含余额、查询时间、是否来自缓存、错误和耗时的结果
+
+    query_func 返回 meter_cache.Reading，失败时返回None。
+    """
+    logger = logging.getLogger(__name__)
+    start = time.monotonic()
+    result = {"name": meter["name"], "balance": None, "error": None}
+
+    try:
+        # 查询过程中记录的各阶段耗时都带上电表名称
+        with labels(meter=meter["name"]), span("query") as query_span:
+            reading = query_func(meter["openid"], meter["meter_id"], meter["type_remark"])
+            if not reading or not reading.balance:
+                query_span["outcome"] = "failed"
+        if reading and reading.balance:
+            result["balance"] = float(reading.balance)
+            result["fetched_at"] = reading.fetched_at
+            result["cached"] = reading.cached
+        else:
+            result["error"] = "未能获取电表余额"
+    except Exception as e:
+        result["error"] = str(e)
+
+    result["elapsed"] = round(time.monotonic() - start, 3)
+    if result["error"]:
+        logger.error(f"电表 {meter['name']} 查询失败 ({result['elapsed']}秒): {result['error']}")
+    else:
+        logger.info(f"电表 {meter['name']} 查询完成 ({result['elapsed']}秒): {result['balance']}度")
+        check_low_balance(result["balance"], logger, meter["name"])
+    return result
+
+
+def poll_meters(meters, max_workers=DEFAULT_WORKERS, query_func=get_meter_reading):
+    """使用有限大小的线程池并发查询所有电表，结果按配置顺序返回"""
+    start = time.monotonic()
+    workers = max(1, min(max_workers, len(meters)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meter") as executor:
+        results = list(executor.map(lambda meter: query_meter(meter, query_func), meters))
+
+    return {
+        "results": results,
+        "succeeded": sum(1 for r in results if r["error"] is None),
+        "failed": sum(1 for r in results if r["error"] is not None),
+        "workers": workers,
+        "elapsed": round(time.monotonic() - start, 3),
+    }
+
+
+def result_time(result):
+    """查询结果的实际查询时间（带时区的datetime）"""
+    return datetime.fromtimestamp(result["fetched_at"], timezone.utc)
+
+
+def save_results(result_set, file_path):
+    """保存查询结果集"""
+    beijing_time = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=8)))
+    result_set = dict(result_set, finished_at=beijing_time.strftime("%Y-%m-%d %H:%M:%S"))
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(result_set, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    """主函数"""
+    logger = setup_logging()
+    args = [arg for arg in sys.argv[1:] if arg != "--force-refresh"]
+    config_file = args[0] if args else os.environ.get("METER_CONFIG", DEFAULT_CONFIG_FILE)
+    force_refresh = force_refresh_requested()
+    workers = int(os.environ.get("METER_WORKERS", DEFAULT_WORKERS))
+
+    try:
+        meters = load_meter_config(config_file)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"加载电表配置失败: {str(e)}")
+        return 1
+
+    # 每个工作线程对应一个预热的浏览器实例，回退到浏览器查询时复用
+    init_driver_pool(max_size=workers)
+
+    names = {(meter["openid"], meter["meter_id"], meter["type_remark"]): meter["name"] for meter in meters}
+    logger.info(f"开始并发查询 {len(meters)} 个电表（并发数 {workers}）...")
+    result_set = poll_meters(
+        meters,
+        max_workers=workers,
+        query_func=lambda *params: get_meter_reading(
+            *params, force_refresh=force_refresh, on_refresh=refresh_ingester(names[params])
+        ),
+    )
+
+    readings = []
+    for result in result_set["results"]:
+        if result["error"] is None:
+            logger.info(
+                result_line(result["name"], result_time(result), result["balance"], result["cached"])
+            )
+            # 缓存的读数在当时已经写入，后台刷新的新读数由回调写入
+            if not result["cached"]:
+                readings.append((result["name"], result_time(result), result["balance"]))
+
+    # 所有电表的读数一次写入数据库
+    with span("data_update", meters=len(readings)):
+        ingest_readings(readings)
+
+    logger.info(
+        f"查询结束: 成功 {result_set['succeeded']} 个，失败 {result_set['failed']} 个，"
+        f"总耗时 {result_set['elapsed']}秒"
+    )
+    save_results(result_set, os.environ.get("METER_RESULT_FILE", DEFAULT_RESULT_FILE))
+    write_metrics()
+    return 0 if result_set["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""基于页面信号的就绪检测，用于替代抓取流程中的固定等待"""
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# 统计页面中未完成的XHR/fetch请求数，需在页面脚本执行前注入
+NETWORK_TRACKER_JS = """
+(function () {
+    if (window.__meterNet) { return; }
+    var net = window.__meterNet = { pending: 0, lastChange: Date.now() };
+    function inc() { net.pending++; net.lastChange = Date.now(); }
+    function dec() { net.pending = Math.max(0, net.pending - 1); net.lastChange = Date.now(); }
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        inc();
+        this.addEventListener('loadend', dec);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            inc();
+            return originalFetch.apply(this, arguments).then(
+                function (r) { dec(); return r; },
+                function (e) { dec(); throw e; }
+            );
+        };
+    }
+})();
+"""
+
+# 文档解析完成且uni-app页面主体已挂载（eager加载策略下不必等待图片等子资源）
+APP_MOUNTED_JS = """
+return document.readyState !== 'loading'
+    && !!document.querySelector('uni-app uni-page-body *');
+"""
+
+# 网络空闲时返回距最后一次请求变化的毫秒数，否则返回-1
+NETWORK_IDLE_JS = """
+var net = window.__meterNet;
+if (!net || net.pending > 0) { return -1; }
+return Date.now() - net.lastChange;
+"""
+
+POLL_FREQUENCY = 0.1
+
+
+def install_network_tracker(driver):
+    """通过DevTools在每个新文档中预先注入请求计数器，成功返回True"""
+    try:
+        driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER_JS}
+        )
+        return True
+    except (WebDriverException, AttributeError):
+        return False
+
+
+def ensure_network_tracker(driver):
+    """当前页面缺少请求计数器时补注入（只能统计之后发起的请求）"""
+    try:
+        driver.execute_script(NETWORK_TRACKER_JS)
+    except WebDriverException:
+        pass
+
+
+def wait_for_app_mounted(driver, timeout):
+    """等待文档加载完成并且uni-app挂载，超时返回False"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: d.execute_script(APP_MOUNTED_JS)
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_network_idle(driver, timeout, idle_time=0.5):
+    """等待进行中的XHR/fetch请求数归零并保持idle_time秒，超时返回False"""
+    idle_ms = idle_time * 1000
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: d.execute_script(NETWORK_IDLE_JS) >= idle_ms
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def read_input_value(driver, css_selector):
+    """读取输入框当前值，元素不存在时返回None"""
+    return driver.execute_script(
+        "var el = document.querySelector(arguments[0]); return el ? el.value : null;",
+        css_selector,
+    )
+
+
+def is_numeric(value):
+    """判断字符串是否为数值"""
+    if not value:
+        return False
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def wait_for_numeric_value(driver, css_selector, timeout, previous=None):
+    """等待输入框出现数值余额并返回该值，超时抛出TimeoutException
+
+    值与点击前相同时，需等到网络空闲后才认为是最终结果。
+    """
+
+    def balance_ready(d):
+        value = read_input_value(d, css_selector)
+        if not is_numeric(value):
+            return False
+        if value != previous or d.execute_script(NETWORK_IDLE_JS) >= 0:
+            return value
+        return False
+
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+        balance_ready, "等待电表余额数值超时"
+    )
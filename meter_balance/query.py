@@ -0,0 +1,620 @@
+"""电表余额查询：读数缓存 -> 后端接口 -> 无头浏览器，查询成功后提交低余额提醒并写入数据库
+
+selenium 只在真正需要启动浏览器时才导入，直接请求接口成功或命中缓存时不会加载。
+"""
+
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+import os
+import sys
+import traceback
+import threading
+import atexit
+
+from meter_balance import PROJECT_DIR
+from meter_balance.driver_pool import DriverPool
+from meter_balance.meter_alerts import get_dispatcher
+from meter_balance.meter_api import build_page_url, fetch_balance, get_base_url
+from meter_balance.meter_cache import cache_key, force_refresh_requested, get_cache
+from meter_balance.meter_metrics import (
+    DEFAULT_METRICS_FILE,
+    current_labels,
+    labels,
+    load_history,
+    quantile,
+    span,
+    write_metrics,
+)
+from meter_balance.meter_store import DEFAULT_METER
+from meter_balance.retry_policy import (
+    AttemptCancelled,
+    CancelToken,
+    FatalError,
+    RetryPolicy,
+    get_breaker,
+    run_hedged,
+)
+from meter_balance.update_meter_data import ingest_readings, result_line
+
+# 电表余额输入框
+BALANCE_SELECTOR = "uni-input input.uni-input-input"
+
+# 对冲模式：没有足够的历史耗时样本时使用的对冲延迟（秒）和默认分位数
+DEFAULT_HEDGE_DELAY = 20.0
+DEFAULT_HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 5
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def setup_logging():
+    """设置日志记录"""
+    try:
+        # 日志文件保存在项目根目录
+        current_dir = PROJECT_DIR
+        print(f"当前目录: {current_dir}")
+
+        log_filename = os.path.join(current_dir, "meter_balance.log")
+        print(f"尝试创建/访问日志文件: {log_filename}")
+
+        # 设置基本日志配置
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            handlers=[
+                logging.StreamHandler()  # GitHub Actions环境下主要使用控制台输出
+            ],
+        )
+
+        # 尝试添加文件处理程序（如果可写入）
+        try:
+            file_handler = logging.FileHandler(log_filename, encoding="utf-8")
+            # 与控制台相同的格式，日志补录时可以从时间戳还原读数日期
+            file_handler.setFormatter(
+                logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+            )
+            logging.getLogger().addHandler(file_handler)
+            print(f"成功添加日志文件处理程序: {log_filename}")
+        except PermissionError:
+            print(f"警告: 无法写入日志文件 {log_filename}，将只使用控制台输出")
+
+        return logging.getLogger(__name__)
+
+    except Exception as e:
+        print(f"设置日志时出错: {str(e)}")
+        print(f"错误类型: {type(e)}")
+        return logging.getLogger(__name__)  # 返回一个默认的logger
+
+
+def build_edge_options():
+    """配置Edge浏览器选项"""
+    from selenium.webdriver.edge.options import Options as EdgeOptions
+
+    from meter_balance.lean_mode import apply_lean_options, lean_mode_enabled
+
+    options = EdgeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-logging")
+    options.add_argument("--disable-logging-redirect")
+    options.add_argument("--single-process")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--disable-infobars")
+    options.add_argument("--window-size=1920,1080")  # 设置窗口大小
+    options.add_argument("--start-maximized")  # 最大化窗口
+    options.add_argument(
+        "--disable-blink-features=AutomationControlled"
+    )  # 禁用自动化标志
+
+    # 增加稳定性参数
+    options.add_argument("--disable-features=NetworkService")
+    options.add_argument("--disable-features=VizDisplayCompositor")
+    options.add_argument("--disable-web-security")
+    options.add_argument("--dns-prefetch-disable")
+    options.add_argument("--disable-hang-monitor")
+
+    # 精简加载模式：eager加载策略 + 持久化磁盘缓存
+    if lean_mode_enabled():
+        apply_lean_options(options)
+    return options
+
+
+def create_edge_driver():
+    """启动一个新的Edge浏览器实例"""
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service as EdgeService
+
+    from meter_balance.lean_mode import enable_request_blocking, lean_mode_enabled
+    from meter_balance.page_ready import install_network_tracker
+
+    with span("driver_launch"):
+        service = EdgeService()
+        driver = webdriver.Edge(service=service, options=build_edge_options())
+        driver.set_page_load_timeout(60)  # 减少超时时间，防止长时间卡住
+        driver.set_script_timeout(60)
+        install_network_tracker(driver)
+        if lean_mode_enabled() and not enable_request_blocking(driver):
+            logging.getLogger(__name__).warning("无法启用请求屏蔽，将加载完整页面")
+    return driver
+
+
+def init_driver_pool(max_size=None):
+    """创建全局浏览器实例池（已存在时直接返回）
+
+    池大小、单实例最大使用次数和内存上限分别由环境变量
+    METER_DRIVER_POOL_SIZE、METER_DRIVER_MAX_USES、METER_DRIVER_MAX_MEMORY_MB 设置。
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            if max_size is None:
+                # 对冲模式需要第二个浏览器
+                default_size = 2 if hedging_enabled() else 1
+                max_size = int(os.environ.get("METER_DRIVER_POOL_SIZE", default_size))
+            _driver_pool = DriverPool(
+                create_edge_driver,
+                max_size=max_size,
+                max_uses=int(os.environ.get("METER_DRIVER_MAX_USES", 20)),
+                max_memory_mb=int(os.environ.get("METER_DRIVER_MAX_MEMORY_MB", 2048)),
+            )
+            atexit.register(_driver_pool.close)
+        return _driver_pool
+
+
+def close_driver_pool():
+    """关闭全局浏览器实例池，下次查询时重新创建（冷启动）"""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is not None:
+            _driver_pool.close()
+            _driver_pool = None
+
+
+def check_low_balance(balance, logger, meter=DEFAULT_METER):
+    """余额低于阈值时提交警告邮件（后台异步发送，按电表去重和限频）"""
+    dispatcher = get_dispatcher()
+    if dispatcher.submit(meter, balance):
+        logger.warning(f"电表 {meter} 电量低于{dispatcher.threshold:g}度 ({balance})，发送警告邮件...")
+
+
+def get_meter_balance(wechat_user_openid=None, meter_id=None, elemeter_type_remark=None,
+                      force_refresh=False):
+    """查询电表余额，只返回余额（参数同 get_meter_reading）"""
+    reading = get_meter_reading(wechat_user_openid, meter_id, elemeter_type_remark, force_refresh)
+    return reading.balance if reading else None
+
+
+def get_meter_reading(wechat_user_openid=None, meter_id=None, elemeter_type_remark=None,
+                      force_refresh=False, on_refresh=None):
+    """查询电表余额（先查读数缓存，再优先直接请求后端接口，失败时回退到浏览器查询）
+
+    返回 meter_cache.Reading（余额、实际查询时间、是否来自缓存），失败时返回None。
+    未传入电表参数时从环境变量 METER_OPENID/METER_ID/METER_TYPE_REMARK 读取，缺少时抛出 FatalError。
+    force_refresh 为True时跳过缓存，总是重新查询；返回旧值时后台刷新的结果交给 on_refresh。
+    """
+    if not (wechat_user_openid and meter_id and elemeter_type_remark):
+        # 检查必要的环境变量
+        required_vars = ["METER_OPENID", "METER_ID", "METER_TYPE_REMARK"]
+        missing_vars = [var for var in required_vars if not os.environ.get(var)]
+        if missing_vars:
+            raise FatalError(f"缺少必要的环境变量: {', '.join(missing_vars)}")
+
+        # 从环境变量获取电表查询参数
+        wechat_user_openid = os.environ.get("METER_OPENID")
+        meter_id = os.environ.get("METER_ID")
+        elemeter_type_remark = os.environ.get("METER_TYPE_REMARK")
+
+    return get_cache().fetch(
+        cache_key(wechat_user_openid, meter_id, elemeter_type_remark),
+        lambda: query_meter_engines(wechat_user_openid, meter_id, elemeter_type_remark),
+        force=force_refresh,
+        on_refresh=on_refresh,
+    )
+
+
+def reading_time(reading):
+    """读数的实际查询时间（带时区的datetime）"""
+    return datetime.fromtimestamp(reading.fetched_at, timezone.utc)
+
+
+def refresh_ingester(meter=DEFAULT_METER):
+    """后台刷新完成时把新读数按实际查询时间写入数据库的回调"""
+    def ingest(reading):
+        logging.getLogger(__name__).info(result_line(meter, reading_time(reading), reading.balance))
+        if not ingest_readings([(meter, reading_time(reading), reading.balance)]):
+            logging.getLogger(__name__).error(f"写入电表 {meter} 后台刷新的读数失败")
+    return ingest
+
+
+def query_meter_engines(wechat_user_openid, meter_id, elemeter_type_remark):
+    """按 METER_ENGINE 设置的查询引擎查询电表余额，不经过缓存"""
+    logger = logging.getLogger(__name__)
+
+    # 查询引擎: auto(先接口后浏览器) / http / selenium
+    engine = os.environ.get("METER_ENGINE", "auto").lower()
+    balance = None
+    # 接口请求和浏览器查询共享同一个总时间预算和网关熔断器
+    breaker = get_breaker(get_base_url())
+    policy = RetryPolicy.from_env(breaker=breaker)
+
+    if engine in ("auto", "http"):
+        with span("http_query") as http_span:
+            balance = fetch_balance(
+                wechat_user_openid, meter_id, elemeter_type_remark,
+                timeout=policy.timeout(15), breaker=breaker,
+            )
+            if balance is None:
+                http_span["outcome"] = "failed"
+        if balance is None and engine == "auto":
+            logger.info("直接请求接口失败，回退到浏览器查询...")
+
+    if balance is None and engine in ("auto", "selenium"):
+        balance = get_meter_balance_selenium(
+            wechat_user_openid, meter_id, elemeter_type_remark, policy=policy
+        )
+
+    return balance
+
+
+def hedging_enabled():
+    """是否开启对冲模式（环境变量 METER_HEDGE=1）"""
+    return os.environ.get("METER_HEDGE") == "1"
+
+
+def get_hedge_delay():
+    """对冲延迟（秒）
+
+    METER_HEDGE_DELAY 指定时直接使用；否则取耗时历史中最近成功的浏览器尝试耗时的
+    METER_HEDGE_PERCENTILE 分位数（默认0.9），样本不足时使用默认值。
+    """
+    if os.environ.get("METER_HEDGE_DELAY"):
+        return float(os.environ["METER_HEDGE_DELAY"])
+    percentile = float(os.environ.get("METER_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE))
+    metrics_file = os.environ.get("METER_METRICS_FILE", DEFAULT_METRICS_FILE)
+    durations = sorted(
+        record["seconds"]
+        for record in load_history(metrics_file)
+        if record.get("phase") == "selenium_attempt" and record.get("outcome") == "ok"
+    )
+    if len(durations) < HEDGE_MIN_SAMPLES:
+        return DEFAULT_HEDGE_DELAY
+    return max(1.0, quantile(durations, percentile))
+
+
+def get_meter_balance_selenium(wechat_user_openid, meter_id, elemeter_type_remark, policy=None):
+    """通过无头浏览器加载查询页面获取电表余额
+
+    policy 为重试策略（总时间预算、退避和熔断），未传入时按环境变量新建。
+    开启对冲模式（METER_HEDGE=1）时，一次尝试超过对冲延迟仍未得到余额就用第二个浏览器并行尝试，
+    取先得到余额的结果并取消另一个；两者都失败时才计为一次失败。
+    """
+    from meter_balance.webvpn_session import get_session_cache, session_cache_enabled
+
+    logger = logging.getLogger(__name__)
+    pool = init_driver_pool()
+    if policy is None:
+        policy = RetryPolicy.from_env(breaker=get_breaker(get_base_url()))
+    sessions = get_session_cache() if session_cache_enabled() else None
+    meter = (wechat_user_openid, meter_id, elemeter_type_remark)
+    hedge_delay = get_hedge_delay() if hedging_enabled() else None
+
+    for attempt in policy.attempts():
+        try:
+            logger.info(f"尝试第 {attempt} 次连接（剩余时间预算 {policy.remaining():.0f} 秒）...")
+            if hedge_delay is None:
+                balance = scrape_balance(pool, meter, policy, attempt, sessions)
+            else:
+                parent_labels = current_labels()
+
+                def hedged(hedge, token):
+                    with labels(**parent_labels):
+                        return scrape_balance(pool, meter, policy, attempt, sessions, hedge, token)
+
+                balance, winner = run_hedged(hedged, hedge_delay)
+                if winner:
+                    logger.info("并行尝试先获取到余额")
+            policy.record_success()
+            return balance
+
+        except Exception as e:
+            logger.error(f"第 {attempt} 次尝试失败: {str(e)}")
+            logger.error(f"错误详情: {traceback.format_exc()}")
+
+            delay = policy.on_failure(attempt, e)
+            if delay is None:
+                logger.error(f"{policy.stop_reason}，退出...")
+                return None
+            logger.info(f"等待{delay:.1f}秒后重试...")
+            with span("retry_wait", attempt=attempt):
+                time.sleep(delay)
+
+    logger.error(f"{policy.stop_reason}，退出...")
+    return None
+
+
+def scrape_balance(pool, meter, policy, attempt, sessions=None, hedge=0, token=None):
+    """用实例池中的一个浏览器完成一次查询，返回余额，失败时抛出异常
+
+    hedge 为对冲尝试的序号（0为最初的尝试），并行尝试只使用实例池中的空闲容量，不等待其他实例归还。
+    token 被取消时关闭本次使用的浏览器以中断阻塞中的等待，并在各阶段之间抛出 AttemptCancelled。
+    """
+    from selenium.common.exceptions import (
+        NoSuchElementException,
+        TimeoutException,
+        WebDriverException,
+    )
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    from meter_balance.lean_mode import lean_mode_enabled, measure_transfer
+    from meter_balance.page_ready import (
+        ensure_network_tracker,
+        read_input_value,
+        wait_for_app_mounted,
+        wait_for_network_idle,
+        wait_for_numeric_value,
+    )
+    from meter_balance.webvpn_session import capture_session, clear_session, finish_restore, restore_session
+
+    logger = logging.getLogger(__name__)
+    token = token or CancelToken()
+    session_key = cache_key(*meter)
+    driver = None
+    restore_id = None
+
+    with span("selenium_attempt", attempt=attempt, hedge=hedge):
+        try:
+            # 从实例池取出预热的浏览器，失败的实例归还时由健康检查决定是否回收
+            with span("driver_acquire", attempt=attempt):
+                driver = pool.acquire(timeout=0 if hedge else None)
+            acquired = driver
+            token.on_cancel(lambda: acquired.quit())
+            token.check()
+
+            logger.info("开始访问页面...")
+            full_url = build_page_url(*meter)
+
+            # 恢复上次成功查询时的webvpn会话，跳过登录重定向和应用初始化
+            session_state = "clean"
+            session = sessions.load(session_key) if sessions else None
+            if session is not None:
+                with span("session_restore", attempt=attempt) as restore_span:
+                    restore_id = restore_session(driver, session)
+                    if restore_id is None:
+                        restore_span["outcome"] = "failed"
+                    else:
+                        session_state = "restored"
+                        logger.info("已恢复缓存的webvpn会话")
+            navigation_start = time.monotonic()
+
+            # 尝试多次加载页面，共享外层的时间预算
+            page_policy = policy.child(max_attempts=3)
+            page_loaded = False
+
+            for page_attempt in page_policy.attempts():
+                try:
+                    logger.info(f"第 {page_attempt} 次尝试加载页面...")
+                    driver.set_page_load_timeout(page_policy.timeout(60))
+                    with span("page_load", attempt=attempt, page_attempt=page_attempt,
+                              session=session_state) as load_span:
+                        driver.get(full_url)
+                        # 检查页面是否成功加载
+                        page_loaded = "electricmeter" in driver.current_url
+                        if not page_loaded and session_state == "restored":
+                            # 恢复的会话已被webvpn拒绝（重定向到登录页），删除后直接用全新会话重新加载
+                            logger.warning("缓存的webvpn会话已失效，改用全新会话")
+                            sessions.invalidate(session_key)
+                            finish_restore(driver, restore_id)
+                            restore_id = None
+                            clear_session(driver)
+                            session_state = load_span["session"] = "expired"
+                            driver.get(full_url)
+                            page_loaded = "electricmeter" in driver.current_url
+                        if not page_loaded:
+                            load_span["outcome"] = "failed"
+                    if page_loaded:
+                        logger.info("页面成功加载")
+                        break
+                except WebDriverException as e:
+                    token.check()
+                    delay = page_policy.on_failure(page_attempt, e)
+                    if delay is None:
+                        logger.error(f"页面加载失败，{page_policy.stop_reason}: {str(e)}")
+                        raise
+                    logger.warning(
+                        f"页面加载失败 ({page_attempt}/{page_policy.max_attempts}): {str(e)}"
+                    )
+                    with span("retry_wait", attempt=attempt, page_attempt=page_attempt):
+                        time.sleep(delay)
+
+            if not page_loaded:
+                raise Exception(f"页面加载失败，{page_policy.stop_reason or 'URL加载不完整'}")
+
+            token.check()
+            logger.info("等待页面初始加载...")
+            # 最多等待10秒，uni-app挂载且初始请求完成即继续
+            with span("app_ready", attempt=attempt) as ready_span:
+                if not wait_for_app_mounted(driver, policy.timeout(10)):
+                    ready_span["outcome"] = "timeout"
+                    logger.warning("等待uni-app挂载超时，继续查找查询按钮")
+                wait_for_network_idle(driver, policy.timeout(5))
+
+            token.check()
+            logger.info("等待查询按钮出现...")
+            wait = WebDriverWait(driver, policy.timeout(20))
+
+            try:
+                with span("button_wait", attempt=attempt):
+                    query_button = wait.until(
+                        EC.element_to_be_clickable(
+                            (
+                                By.XPATH,
+                                "/html/body/uni-app/uni-page/uni-page-wrapper/uni-page-body/uni-view/uni-view[1]/uni-button",
+                            )
+                        )
+                    )
+
+                ready_at = time.monotonic()
+                token.check()
+                ensure_network_tracker(driver)
+                previous_value = read_input_value(driver, BALANCE_SELECTOR)
+
+                logger.info("找到查询按钮，准备点击...")
+                with span("click", attempt=attempt) as click_span:
+                    try:
+                        # 使用JavaScript点击按钮
+                        driver.execute_script("arguments[0].click();", query_button)
+                        logger.info("使用JavaScript成功点击查询按钮")
+                    except Exception as js_error:
+                        logger.warning(f"JavaScript点击失败: {str(js_error)}，尝试直接点击")
+                        click_span["method"] = "native"
+                        # 如果JavaScript点击失败，尝试直接点击
+                        query_button.click()
+                        logger.info("使用直接点击成功点击查询按钮")
+
+                logger.info("已点击查询按钮，等待数据加载...")
+                # 最多等待5秒查询请求完成
+                with span("post_click_wait", attempt=attempt):
+                    wait_for_network_idle(driver, policy.timeout(5), idle_time=0.2)
+
+                logger.info("尝试获取电表剩余值...")
+                with span("value_extract", attempt=attempt):
+                    balance = wait_for_numeric_value(
+                        driver, BALANCE_SELECTOR, policy.timeout(20), previous=previous_value
+                    )
+
+                logger.info(f"获取到电表剩余值: {balance}")
+                # 记录本次页面传输的字节数，便于对比精简加载模式的效果
+                with span("page_transfer", lean=lean_mode_enabled()) as transfer_span:
+                    transfer_span.update(measure_transfer(driver))
+                if sessions:
+                    sessions.record(session_state, ready_at - navigation_start)
+                    current = capture_session(driver)
+                    if current is not None:
+                        sessions.save(session_key, current)
+                return balance
+
+            except (TimeoutException, NoSuchElementException) as e:
+                token.check()
+                logger.error(f"查找元素超时或元素不存在: {str(e)}")
+                # 尝试截图保存错误状态
+                try:
+                    screenshot_path = os.path.join(PROJECT_DIR, f"error_screenshot_{attempt}.png")
+                    driver.save_screenshot(screenshot_path)
+                    logger.info(f"已保存错误截图: {screenshot_path}")
+                except Exception as ss_error:
+                    logger.warning(f"保存截图失败: {str(ss_error)}")
+                raise Exception(f"查找元素失败: {str(e)}")
+
+        except Exception:
+            if token.cancelled:
+                # 落败的并行尝试：浏览器已被关闭，其间的报错不再记录
+                raise AttemptCancelled(f"第 {attempt} 次尝试的并行尝试 {hedge} 已取消")
+            raise
+
+        finally:
+            cancelled = token.detach()
+            if driver is not None:
+                if cancelled:
+                    pool.discard(driver, quit=False)
+                else:
+                    # 归还当前driver实例，崩溃的实例会被回收
+                    finish_restore(driver, restore_id)
+                    pool.release(driver)
+
+
+def main(force_refresh=None, save=True):
+    """查询电表余额并提交低余额提醒
+
+    force_refresh 为None时按 --force-refresh 参数和 METER_FORCE_REFRESH 决定是否跳过缓存；
+    save 为True时（GitHub Actions定时运行）还会写入数据库并导出网站数据，此时要求配置邮箱。
+    """
+    if force_refresh is None:
+        force_refresh = force_refresh_requested()
+    try:
+        # 设置日志
+        logger = setup_logging()
+        logger.info("=== GitHub Actions 电表余额查询脚本开始执行 ===")
+
+        # 获取北京时间（UTC+8）
+        beijing_time = datetime.now(timezone.utc).astimezone(
+            timezone(timedelta(hours=8))
+        )
+        logger.info(f"执行时间(北京): {beijing_time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+        # 检查必要的环境变量
+        required_env_vars = ["METER_OPENID", "METER_ID", "METER_TYPE_REMARK"]
+        if save:
+            required_env_vars += ["SENDER_EMAIL", "SENDER_PASSWORD", "RECEIVER_EMAIL"]
+
+        missing_vars = []
+        for var in required_env_vars:
+            if not os.environ.get(var):
+                missing_vars.append(var)
+
+        if missing_vars:
+            raise FatalError(f"缺少必要的环境变量: {', '.join(missing_vars)}")
+
+        # 查询电表余额
+        logger.info("开始执行电表余额查询...")
+        with labels(meter=DEFAULT_METER):
+            reading = get_meter_reading(
+                force_refresh=force_refresh,
+                on_refresh=refresh_ingester() if save else None,
+            )
+        result = reading.balance if reading else None
+        if result:
+            check_low_balance(result, logger)
+
+        if result:
+            logger.info(f"查询完成，电表余额: {result}度")
+            # 将结果写入GitHub Actions输出
+            print(f"::set-output name=balance::{result}")
+            # 添加一个特殊格式的日志，方便后续提取
+            logger.info(result_line(DEFAULT_METER, reading_time(reading), result, reading.cached))
+            if not save:
+                return 0
+            if reading.cached:
+                # 缓存的读数已在当时写入数据库，不能当作现在的新读数再写一次；后台刷新的结果由回调写入
+                fetched = reading_time(reading).astimezone(timezone(timedelta(hours=8)))
+                logger.info(f"余额为 {fetched:%Y-%m-%d %H:%M:%S} 查询的缓存读数，不重复写入数据库")
+                return 0
+            
+            # 直接写入数据库并导出网站数据文件（即使更新失败，也不影响整体流程）
+            logger.info("开始更新电表数据文件...")
+            with span("data_update", meter=DEFAULT_METER) as update_span:
+                if ingest_readings([(DEFAULT_METER, reading_time(reading), result)]):
+                    logger.info("电表数据文件更新成功")
+                else:
+                    update_span["outcome"] = "failed"
+                    logger.error("更新电表数据文件失败")
+            
+            return 0
+        else:
+            logger.error("查询失败，未能获取电表余额")
+            return 1
+
+    except FatalError as e:
+        # 配置错误，重试无意义
+        logger.error(str(e))
+        logger.error("请确保在GitHub Secrets中设置了上述环境变量")
+        return 1
+
+    except Exception as e:
+        print(f"程序执行出错: {str(e)}")
+        print(f"错误详情: {traceback.format_exc()}")
+        return 1
+
+    finally:
+        # 导出各阶段耗时统计
+        write_metrics()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
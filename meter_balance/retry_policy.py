@@ -0,0 +1,351 @@
+"""查询重试策略：总时间预算、带抖动的指数退避、错误分类和熔断器，供各查询脚本共用
+
+- 一次查询（包括接口请求、浏览器的所有尝试和页面加载重试）共享 METER_RETRY_DEADLINE 秒的总预算，
+  每一步的超时都不会超过剩余时间
+- 重试间隔按 METER_RETRY_BASE_DELAY 指数增长，上限 METER_RETRY_MAX_DELAY 秒，并加入随机抖动
+- 缺少配置等不可重试的错误立即放弃；超时、连接失败等网关错误计入熔断器
+- 网关连续失败 METER_CIRCUIT_THRESHOLD 次后熔断，METER_CIRCUIT_RESET 秒内的查询直接失败，
+  之后放行一次试探查询，成功则恢复
+- 对冲执行：一次尝试超过对冲延迟仍未完成时并行启动第二次尝试，取先成功的结果并取消另一个
+"""
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_DEADLINE = 240.0
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_JITTER = 0.5
+DEFAULT_CIRCUIT_THRESHOLD = 3
+DEFAULT_CIRCUIT_RESET = 300.0
+# 同时进行的对冲尝试数上限（包括最初的尝试）
+MAX_HEDGED_ATTEMPTS = 2
+
+# 错误分类
+FATAL = "fatal"  # 不可重试
+GATEWAY = "gateway"  # 可重试，且说明网关可能不可用（计入熔断器）
+RETRYABLE = "retryable"  # 可重试
+
+# 浏览器报告的网络层错误
+NETWORK_ERROR_MARKERS = ("net::ERR_", "ERR_CONNECTION", "ERR_NAME_NOT_RESOLVED", "ERR_TIMED_OUT")
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class FatalError(Exception):
+    """不可重试的错误（如缺少必要的环境变量）"""
+
+
+class AttemptCancelled(Exception):
+    """对冲执行中落败的尝试被取消"""
+
+
+def classify_error(error):
+    """将异常分类为 FATAL / GATEWAY / RETRYABLE"""
+    if isinstance(error, FatalError):
+        return FATAL
+    # 本地的等待超时（如等待浏览器实例）与网关无关，不计入熔断器
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, ConnectionError)):
+        return GATEWAY
+    # selenium 尚未导入时不会出现它的异常，不必为了分类而加载
+    selenium_errors = sys.modules.get("selenium.common.exceptions")
+    if selenium_errors is None:
+        return RETRYABLE
+    if isinstance(error, selenium_errors.SessionNotCreatedException):
+        # 浏览器启动失败与网关无关，重试即可
+        return RETRYABLE
+    # 页面加载或等待元素超时可能只是单页应用渲染慢，只有浏览器报告的网络错误才说明网关故障
+    if isinstance(error, selenium_errors.WebDriverException) and any(
+        marker in str(error) for marker in NETWORK_ERROR_MARKERS
+    ):
+        return GATEWAY
+    return RETRYABLE
+
+
+class CircuitBreaker:
+    """网关熔断器：连续失败达到阈值后打开，冷却时间过后放行一次试探请求"""
+
+    def __init__(self, name, failure_threshold=DEFAULT_CIRCUIT_THRESHOLD,
+                 reset_timeout=DEFAULT_CIRCUIT_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """closed / open / half_open"""
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        """是否允许发起请求（半开状态下只放行一个试探请求）"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_after(self):
+        """距离允许试探还有多少秒"""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logging.getLogger(__name__).info(f"网关 {self.name} 已恢复，关闭熔断")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """试探请求以与网关无关的原因失败时，允许下一个请求继续试探"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logging.getLogger(__name__).warning(
+                    f"网关 {self.name} 连续失败 {self.failures} 次，熔断 {self.reset_timeout:g} 秒"
+                )
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+def get_breaker(name):
+    """获取进程内共享的网关熔断器（按网关地址区分）
+
+    阈值和冷却时间由 METER_CIRCUIT_THRESHOLD、METER_CIRCUIT_RESET 设置，阈值为0时关闭熔断。
+    """
+    threshold = int(os.environ.get("METER_CIRCUIT_THRESHOLD", DEFAULT_CIRCUIT_THRESHOLD))
+    if threshold <= 0:
+        return None
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=threshold,
+                reset_timeout=float(os.environ.get("METER_CIRCUIT_RESET", DEFAULT_CIRCUIT_RESET)),
+            )
+        return _breakers[name]
+
+
+class RetryPolicy:
+    """一次查询的重试策略，创建时开始计算总时间预算
+
+    用法:
+        for attempt in policy.attempts():
+            try:
+                ...
+                policy.record_success()
+                return result
+            except Exception as e:
+                delay = policy.on_failure(attempt, e)
+                if delay is None:
+                    break  # policy.stop_reason 说明放弃的原因
+                time.sleep(delay)
+    """
+
+    def __init__(self, max_attempts=DEFAULT_ATTEMPTS, deadline=DEFAULT_DEADLINE,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 jitter=DEFAULT_JITTER, breaker=None, deadline_at=None, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.breaker = breaker
+        self.deadline_at = deadline_at if deadline_at is not None else time.monotonic() + deadline
+        self.random = rng or random.Random()
+        self.stop_reason = None
+
+    @classmethod
+    def from_env(cls, breaker=None):
+        """根据环境变量 METER_RETRY_ATTEMPTS、METER_RETRY_DEADLINE、METER_RETRY_BASE_DELAY、
+        METER_RETRY_MAX_DELAY 创建策略"""
+        return cls(
+            max_attempts=int(os.environ.get("METER_RETRY_ATTEMPTS", DEFAULT_ATTEMPTS)),
+            deadline=float(os.environ.get("METER_RETRY_DEADLINE", DEFAULT_DEADLINE)),
+            base_delay=float(os.environ.get("METER_RETRY_BASE_DELAY", DEFAULT_BASE_DELAY)),
+            max_delay=float(os.environ.get("METER_RETRY_MAX_DELAY", DEFAULT_MAX_DELAY)),
+            breaker=breaker,
+        )
+
+    def child(self, max_attempts):
+        """共享总时间预算的内层重试策略（如同一浏览器内的页面加载重试）
+
+        内层不使用熔断器，内层放弃后由外层的 on_failure 统一计入一次失败。
+        """
+        return RetryPolicy(
+            max_attempts=max_attempts,
+            base_delay=self.base_delay,
+            max_delay=self.max_delay,
+            jitter=self.jitter,
+            deadline_at=self.deadline_at,
+            rng=self.random,
+        )
+
+    def remaining(self):
+        """剩余时间预算（秒）"""
+        return max(0.0, self.deadline_at - time.monotonic())
+
+    def timeout(self, limit):
+        """单步操作的超时：不超过 limit，也不超过剩余预算（至少1秒）"""
+        return max(1.0, min(limit, self.remaining()))
+
+    def backoff(self, attempt):
+        """第 attempt 次失败后的等待时间：指数增长，按 jitter 比例随机缩短"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * (1 - self.jitter * self.random.random())
+
+    def attempts(self):
+        """依次产生尝试序号，预算耗尽或网关熔断时提前结束"""
+        for attempt in range(1, self.max_attempts + 1):
+            if self.remaining() <= 0:
+                self.stop_reason = "已用完总时间预算"
+                return
+            if self.breaker is not None and not self.breaker.allow():
+                self.stop_reason = (
+                    f"网关处于熔断状态，{self.breaker.retry_after():.0f}秒后再试"
+                )
+                return
+            yield attempt
+
+    def record_success(self):
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def on_failure(self, attempt, error):
+        """记录一次失败，返回重试前应等待的秒数；不应再重试时返回None并设置 stop_reason"""
+        kind = classify_error(error)
+        if self.breaker is not None:
+            if kind == GATEWAY:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_probe()
+        if kind == FATAL:
+            self.stop_reason = f"不可重试的错误: {str(error)}"
+            return None
+        if attempt >= self.max_attempts:
+            self.stop_reason = "已达到最大重试次数"
+            return None
+        delay = self.backoff(attempt)
+        if delay >= self.remaining():
+            self.stop_reason = "剩余时间预算不足以再次重试"
+            return None
+        return delay
+
+
+class CancelToken:
+    """对冲尝试的取消标记
+
+    尝试方通过 on_cancel 注册清理函数（如关闭浏览器，以中断阻塞中的页面加载和等待），
+    结束时调用 detach 解除注册；取消发生在解除注册之前时清理函数会被调用。
+    """
+
+    def __init__(self):
+        self._cancelled = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        with self._lock:
+            return self._cancelled
+
+    def on_cancel(self, callback):
+        """注册清理函数，已经取消时立即调用"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def detach(self):
+        """解除所有清理函数，返回是否已被取消"""
+        with self._lock:
+            self._callbacks = []
+            return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.getLogger(__name__).debug(f"取消尝试时清理失败: {str(e)}")
+
+    def check(self):
+        """已取消时抛出 AttemptCancelled，供尝试在各阶段之间检查"""
+        if self.cancelled:
+            raise AttemptCancelled("尝试已被取消")
+
+
+def run_hedged(task, hedge_delay, max_attempts=MAX_HEDGED_ATTEMPTS):
+    """对冲执行 task(序号, CancelToken)，返回 (结果, 获胜的序号)
+
+    先启动序号0的尝试；超过 hedge_delay 秒仍未完成时再并行启动下一个，同时进行的尝试不超过
+    max_attempts 个。返回第一个成功的结果并取消其余尝试（不等待它们退出）；全部失败时抛出
+    最后一个错误。尝试在对冲启动之前就失败时直接抛出，由外层的重试策略决定是否重试。
+    """
+    executor = ThreadPoolExecutor(max_workers=max_attempts, thread_name_prefix="hedge")
+    tokens = {}
+
+    def start(index):
+        token = CancelToken()
+        future = executor.submit(task, index, token)
+        tokens[future] = (index, token)
+        return future
+
+    pending = {start(0)}
+    error = None
+    try:
+        while pending:
+            can_hedge = len(tokens) < max_attempts and error is None
+            done, pending = wait(pending, timeout=hedge_delay if can_hedge else None,
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                logging.getLogger(__name__).info(
+                    f"尝试超过 {hedge_delay:.1f} 秒仍未完成，启动第 {len(tokens) + 1} 个并行尝试"
+                )
+                # 新尝试可能在这里之前就已完成，不能按 done() 过滤，否则它的结果会被漏掉
+                pending.add(start(len(tokens)))
+                continue
+            for future in done:
+                try:
+                    return future.result(), tokens[future][0]
+                except Exception as e:
+                    error = e
+        raise error
+    finally:
+        for future, (_, token) in tokens.items():
+            if not future.done():
+                token.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,111 @@
+"""启动基准测试：在全新的Python进程中测量各子命令的启动耗时和导入开销
+
+用法: python -m meter_balance.startup [--runs 5] [--output startup.json]
+
+每个子命令按 cli.COMMAND_MODULES 导入所需模块（不执行查询），记录进程总耗时、
+-X importtime 统计的导入耗时、导入耗时最多的顶层模块，以及是否加载了 selenium 等较重的依赖。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from meter_balance import PROJECT_DIR
+from meter_balance.cli import COMMAND_MODULES
+
+
+# 关注是否被加载的较重依赖
+HEAVY_MODULES = ("selenium", "smtplib", "email", "numpy", "requests", "sqlite3")
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 (总导入耗时ms, 模块数, 已加载的较重依赖, 顶层模块累计耗时)"""
+    total_us = 0
+    modules = 0
+    loaded = set()
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        total_us += int(self_us)
+        modules += 1
+        module = name.strip()
+        root = module.split(".")[0]
+        if root in HEAVY_MODULES:
+            loaded.add(root)
+        # 缩进表示被其他模块间接导入，只统计顶层导入的累计耗时
+        if not name[1:].startswith(" "):
+            top_level[module] = int(cumulative_us) / 1000
+    return total_us / 1000, modules, sorted(loaded), top_level
+
+
+def run_python(code, importtime=False):
+    """在全新进程中运行一段代码，返回 (耗时ms, 标准错误输出)"""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", code]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else code)
+    return elapsed, result.stderr
+
+
+def bench_code(code, runs):
+    """多次运行取中位数：进程耗时和导入耗时（ms）"""
+    wall = []
+    imports = []
+    for _ in range(runs):
+        elapsed, _ = run_python(code)
+        wall.append(elapsed)
+        _, stderr = run_python(code, importtime=True)
+        imports.append(parse_importtime(stderr))
+    total_ms, modules, loaded, top_level = imports[-1]
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "wall_ms": round(statistics.median(wall), 1),
+        "import_ms": round(statistics.median(item[0] for item in imports), 1),
+        "modules": modules,
+        "heavy_modules": loaded,
+        "slowest_imports": [[name, round(ms, 1)] for name, ms in slowest],
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="各子命令的启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量的运行次数")
+    parser.add_argument("--output", help="报告输出文件（默认只打印）")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        # 空解释器和只解析命令行参数的基线
+        "baseline": bench_code("pass", args.runs),
+        "cli": bench_code("import meter_balance.cli", args.runs),
+        "commands": {
+            command: bench_code(
+                f"from meter_balance.cli import load_command_modules; load_command_modules({command!r})",
+                args.runs,
+            )
+            for command in COMMAND_MODULES
+        },
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
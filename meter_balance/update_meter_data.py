@@ -0,0 +1,303 @@
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+import logging
+import sqlite3
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_files import FileLock, quarantine, read_json, write_json
+from meter_balance.meter_store import DEFAULT_METER, HOURLY_RETENTION_DAYS, RAW_RETENTION_DAYS, MeterStore
+from meter_balance.meter_partitions import export_partitions
+from meter_balance.meter_summary import build_summary
+
+def setup_logging():
+    """设置日志记录"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler()
+        ]
+    )
+    return logging.getLogger(__name__)
+
+def get_data_file_path():
+    """获取数据文件路径"""
+    # 获取当前脚本所在目录
+    return os.path.join(PROJECT_DIR, "data.json")
+
+def get_store_file_path():
+    """获取读数数据库路径"""
+    return os.path.join(PROJECT_DIR, "meter_data.db")
+
+def get_export_lock_path():
+    """导出网站文件时使用的跨进程锁文件"""
+    return os.path.join(PROJECT_DIR, ".export.lock")
+
+def get_retention():
+    """日内读数的保留天数（METER_RAW_RETENTION_DAYS、METER_HOURLY_RETENTION_DAYS）"""
+    return {
+        "raw_retention_days": float(os.environ.get("METER_RAW_RETENTION_DAYS", RAW_RETENTION_DAYS)),
+        "hourly_retention_days": float(os.environ.get("METER_HOURLY_RETENTION_DAYS", HOURLY_RETENTION_DAYS)),
+    }
+
+# 与数据库文件一起改名保留的日志文件
+STORE_SIDECAR_SUFFIXES = ("-journal", "-wal", "-shm")
+
+def quarantine_store(store_path):
+    """把损坏的数据库连同其日志文件改名保留，返回数据库的新路径"""
+    corrupt_path = quarantine(store_path)
+    for suffix in STORE_SIDECAR_SUFFIXES:
+        if os.path.exists(f"{store_path}{suffix}"):
+            os.replace(f"{store_path}{suffix}", f"{corrupt_path}{suffix}")
+    return corrupt_path
+
+def open_store(store_path=None, json_path=None):
+    """打开读数数据库；新建数据库时从现有 data.json 导入历史数据
+
+    数据库文件损坏时将其改名保留，并从最近一次导出的 data.json 快照重建。
+    数据库被其他进程锁定、等待超时或没有权限（OperationalError）不是损坏，直接抛出。
+    """
+    store_path = store_path or get_store_file_path()
+    json_path = json_path or get_data_file_path()
+    try:
+        store = MeterStore(store_path, **get_retention())
+        if not store.check_integrity():
+            store.close()
+            raise sqlite3.DatabaseError("完整性检查未通过")
+    except sqlite3.OperationalError:
+        raise
+    except sqlite3.DatabaseError as e:
+        corrupt_path = quarantine_store(store_path)
+        logging.error(f"读数数据库已损坏（{str(e)}），已保留为 {corrupt_path}，从 {json_path} 重建")
+        store = MeterStore(store_path, **get_retention())
+    if store.is_empty() and os.path.exists(json_path):
+        count = store.import_json(load_existing_data(json_path))
+        logging.info(f"已从 {json_path} 导入 {count} 条历史记录")
+    return store
+
+def get_beijing_time():
+    """获取北京时间"""
+    return datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=8)))
+
+def to_reading(meter, timestamp, balance):
+    """将 (电表, 时间, 余额) 转换为数据库读数 (电表, 日期, 余额, 更新时间)
+
+    时间可以是datetime（带时区时换算为北京时间）或北京时间的 'YYYY-MM-DD HH:MM:SS' 字符串
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    elif timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone(timedelta(hours=8)))
+    return (
+        meter,
+        timestamp.strftime("%Y-%m-%d"),
+        float(balance),
+        timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+def result_line(meter, timestamp, balance, cached=False):
+    """查询结果的日志记录，meter_backfill 从中补录读数
+
+    记录中带有读数自身的查询时间（北京时间），重复补录已写入的日志时与原读数完全相同；
+    来自缓存的读数带 [cached] 标记，补录时跳过。
+    """
+    _, _, _, fetched_at = to_reading(meter, timestamp, balance)
+    name = "" if meter == DEFAULT_METER else f"[{meter}] "
+    tag = " [cached]" if cached else ""
+    return f"===METER_BALANCE_RESULT==={name}电表余额: {balance}度=== 查询时间(北京): {fetched_at}{tag}"
+
+def record_balance(store, balance, meter=DEFAULT_METER, beijing_time=None):
+    """写入一条余额读数，同一天已有记录时覆盖每日读数（日内读数另行保留）"""
+    reading = to_reading(meter, beijing_time or get_beijing_time(), balance)
+    store.upsert_many([reading])
+    logging.info(f"写入电表 {meter} 今天 ({reading[1]}) 的记录: {balance} 度")
+    return reading[1]
+
+def export_data(store, file_path, meter=DEFAULT_METER):
+    """从数据库导出 data.json"""
+    return save_data(store.export_json(meter), file_path)
+
+def get_summary_file_path():
+    """获取仪表盘摘要文件路径"""
+    return os.path.join(PROJECT_DIR, "summary.json")
+
+def export_summary(store, file_path, meter=DEFAULT_METER):
+    """生成仪表盘摘要文件 summary.json（摘要随时可以从数据库重新生成，不保留快照）"""
+    try:
+        write_json(file_path, build_summary(store, meter), snapshot=False, separators=(',', ':'))
+        logging.info(f"摘要已保存到 {file_path}")
+        return True
+    except Exception as e:
+        logging.error(f"保存摘要时出错: {str(e)}")
+        return False
+
+def get_partition_dir():
+    """获取月度分区数据目录"""
+    return os.path.join(PROJECT_DIR, "data")
+
+def export_partition_files(store, output_dir, meter=DEFAULT_METER, months=None):
+    """导出月度分区文件和清单，months 为空时重新导出全部月份"""
+    try:
+        export_partitions(store, output_dir, meter, months)
+        return True
+    except Exception as e:
+        logging.error(f"导出月度分区时出错: {str(e)}")
+        return False
+
+def export_site_files(store, meter=DEFAULT_METER, months=None):
+    """导出网站使用的 data.json、摘要和月度分区（分区只重写 months 中的月份）
+
+    多个进程同时导出时依次进行，后导出的进程读取到的总是最新的数据库内容，
+    三类文件不会混合来自不同进程的版本。
+    """
+    try:
+        with FileLock(get_export_lock_path()):
+            return (
+                export_data(store, get_data_file_path(), meter)
+                and export_summary(store, get_summary_file_path(), meter)
+                and export_partition_files(store, get_partition_dir(), meter, months)
+            )
+    except TimeoutError as e:
+        logging.error(f"导出网站文件失败: {str(e)}")
+        return False
+
+def ingest_readings(readings, store=None, export=True):
+    """批量写入 (电表, 时间, 余额) 读数，供其他脚本直接调用
+
+    所有读数在一个数据库事务中写入；默认电表有新读数时再导出一次网站文件。
+    未传入 store 时自动打开数据库并在结束后关闭。返回是否成功。
+    """
+    own_store = store is None
+    try:
+        rows = [to_reading(meter, timestamp, balance) for meter, timestamp, balance in readings]
+        if not rows:
+            return True
+        if own_store:
+            store = open_store()
+        store.upsert_many(rows)
+        logging.info(f"已写入 {len(rows)} 条读数（{len({row[0] for row in rows})} 个电表）")
+
+        default_months = sorted({date[:7] for meter, date, _, _ in rows if meter == DEFAULT_METER})
+        if export and default_months:
+            return export_site_files(store, DEFAULT_METER, default_months)
+        return True
+    except Exception as e:
+        logging.error(f"写入读数时出错: {str(e)}")
+        return False
+    finally:
+        if own_store and store is not None:
+            store.close()
+
+def load_existing_data(file_path):
+    """加载现有数据，如果文件不存在则创建新的数据结构
+
+    文件损坏时从上次保存的快照（data.json.bak）恢复；快照也不可用时，
+    损坏的文件会被改名保留，不会被新的空数据覆盖。
+    """
+    data = read_json(file_path)
+    if isinstance(data, dict) and isinstance(data.get("daily_data"), list):
+        return data
+    if data is not None:
+        logging.warning(f"数据文件 {file_path} 缺少 daily_data，将创建新的数据结构")
+    
+    # 如果文件不存在或无法恢复，返回初始数据结构
+    return {
+        "daily_data": []
+    }
+
+def update_data(data, balance):
+    """更新数据，添加今天的余额记录"""
+    # 获取北京时间
+    beijing_time = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=8)))
+    today_date = beijing_time.strftime("%Y-%m-%d")
+    current_time = beijing_time.strftime("%Y-%m-%d %H:%M:%S")
+    
+    # 检查今天是否已有记录
+    for entry in data["daily_data"]:
+        if entry["date"] == today_date:
+            # 更新今天的记录
+            entry["balance"] = float(balance)
+            logging.info(f"更新今天 ({today_date}) 的记录: {balance} 度")
+            # 更新最后更新时间
+            data["last_updated"] = current_time
+            logging.info(f"更新最后更新时间: {current_time}")
+            return data
+    
+    # 如果今天没有记录，添加新记录
+    new_entry = {
+        "date": today_date,
+        "balance": float(balance)
+    }
+    data["daily_data"].append(new_entry)
+    logging.info(f"添加今天 ({today_date}) 的新记录: {balance} 度")
+    
+    # 更新最后更新时间
+    data["last_updated"] = current_time
+    logging.info(f"更新最后更新时间: {current_time}")
+    
+    return data
+
+def save_data(data, file_path):
+    """保存数据到文件
+
+    加跨进程文件锁后先写临时文件再原子替换，写入中途崩溃不会截断原文件，
+    同时更新 data.json.bak 快照供文件损坏时恢复。
+    """
+    try:
+        write_json(file_path, data, indent=2)
+        logging.info(f"数据已保存到 {file_path}")
+        return True
+    except Exception as e:
+        logging.error(f"保存数据时出错: {str(e)}")
+        return False
+
+def main():
+    """主函数"""
+    logger = setup_logging()
+    
+    # 检查命令行参数
+    if len(sys.argv) < 2:
+        logger.error("缺少电表余额参数")
+        logger.info("用法: python update_meter_data.py <电表余额>")
+        logger.info("      python update_meter_data.py --export [电表名称] [输出文件]")
+        logger.info("      python update_meter_data.py --partitions [电表名称] [输出目录]")
+        return 1
+    
+    # 获取数据文件路径
+    data_file = get_data_file_path()
+    
+    # 按需从数据库导出 data.json
+    if sys.argv[1] == "--export":
+        meter = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_METER
+        output_file = sys.argv[3] if len(sys.argv) > 3 else data_file
+        with open_store() as store:
+            return 0 if export_data(store, output_file, meter) else 1
+    
+    # 重新生成全部月度分区
+    if sys.argv[1] == "--partitions":
+        meter = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_METER
+        output_dir = sys.argv[3] if len(sys.argv) > 3 else get_partition_dir()
+        with open_store() as store:
+            return 0 if export_partition_files(store, output_dir, meter) else 1
+    
+    logger.info("开始更新电表数据...")
+    
+    # 获取电表余额
+    try:
+        balance = float(sys.argv[1])
+        logger.info(f"获取到电表余额: {balance} 度")
+    except ValueError:
+        logger.error(f"无效的电表余额: {sys.argv[1]}")
+        return 1
+    
+    # 写入数据库并导出 data.json、摘要和月度分区供网站使用
+    if ingest_readings([(DEFAULT_METER, get_beijing_time(), balance)]):
+        logger.info("数据更新成功")
+        return 0
+    else:
+        logger.error("数据更新失败")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""webvpn会话缓存：保存查询成功时的cookie和页面存储，下次查询前恢复，跳过webvpn的登录重定向和应用初始化
+
+- 每个电表（按查询参数的哈希）一个会话文件，保存在 METER_SESSION_DIR（默认 .webvpn_sessions/）
+- 会话超过 METER_SESSION_MAX_AGE 秒（默认12小时）或cookie全部过期时不再使用
+- 恢复的会话被webvpn拒绝（页面被重定向到登录页）时删除该会话，并立即用全新会话重新加载
+- 记录会话命中率以及恢复会话与全新会话的页面就绪耗时，python webvpn_session.py 查看统计
+
+设置 METER_SESSION_CACHE=0 关闭。会话文件包含登录凭据，只有当前用户可读；
+设置 METER_SESSION_KEY 后会话文件用该密钥加密（需要 cryptography 包）。
+在GitHub Actions中，缓存的文件可能被其他工作流（如拉取请求触发的工作流）恢复，
+因此只有设置了 METER_SESSION_KEY 时才启用会话缓存。
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from meter_balance import PROJECT_DIR
+from meter_balance.meter_files import lock_for, write_atomic
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # cryptography为可选依赖，只有加密会话文件时才需要
+    Fernet = None
+
+
+DEFAULT_MAX_AGE = 12 * 3600
+STATS_FILE = "stats.json"
+RESTORED_MARKER = "__meterSessionRestored"
+# 恢复时设置的cookie字段（Network.setCookies 接受的参数）
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+# 会话结果：restored(恢复成功) / clean(没有可用会话) / expired(恢复的会话已失效)
+OUTCOMES = ("restored", "clean", "expired")
+
+CAPTURE_STORAGE_JS = f"""
+var session = Object.assign({{}}, sessionStorage);
+delete session['{RESTORED_MARKER}'];
+return {{ origin: location.origin, local: Object.assign({{}}, localStorage), session: session }};
+"""
+
+# 在每个新文档中、页面脚本执行前写入存储；同一标签页只写入一次，之后由页面自己维护
+RESTORE_STORAGE_JS = """
+(function (state) {
+    if (location.origin !== state.origin) { return; }
+    try {
+        if (sessionStorage.getItem('%(marker)s')) { return; }
+        Object.keys(state.local).forEach(function (k) { localStorage.setItem(k, state.local[k]); });
+        Object.keys(state.session).forEach(function (k) { sessionStorage.setItem(k, state.session[k]); });
+        sessionStorage.setItem('%(marker)s', '1');
+    } catch (e) {}
+})(%(state)s);
+"""
+
+_cache = None
+
+
+def session_cache_enabled():
+    """是否启用会话缓存
+
+    METER_SESSION_CACHE=0 关闭；设置了 METER_SESSION_KEY 但没有安装 cryptography 时关闭，
+    不会退回明文保存；GitHub Actions中没有设置 METER_SESSION_KEY 时关闭。
+    """
+    if os.environ.get("METER_SESSION_CACHE", "1") == "0":
+        return False
+    if os.environ.get("METER_SESSION_KEY"):
+        if Fernet is None:
+            logging.getLogger(__name__).warning("设置了 METER_SESSION_KEY 但未安装 cryptography，不使用会话缓存")
+            return False
+        return True
+    return os.environ.get("GITHUB_ACTIONS") != "true"
+
+
+def session_cipher(key):
+    """由任意长度的密钥生成会话文件的加密器"""
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(key.encode("utf-8")).digest()))
+
+
+def get_session_dir():
+    """会话缓存目录，可通过 METER_SESSION_DIR 修改"""
+    return os.environ.get("METER_SESSION_DIR", os.path.join(PROJECT_DIR, ".webvpn_sessions"))
+
+
+class SessionCache:
+    """按电表保存的webvpn会话，以及会话命中率和耗时统计
+
+    传入 key 时会话文件加密保存，无法用该密钥解密的文件视为不存在。
+    """
+
+    def __init__(self, directory, max_age=DEFAULT_MAX_AGE, key=None):
+        self.directory = directory
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+        self._cipher = session_cipher(key) if key else None
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _decrypt(self, content):
+        if self._cipher is None:
+            return content
+        try:
+            return self._cipher.decrypt(content)
+        except InvalidToken:
+            # 明文保存的旧文件或密钥已更换，视为没有会话
+            raise ValueError("无法解密会话文件")
+
+    def load(self, key, now=None):
+        """返回可用的会话，不存在、已过期或没有有效cookie时返回None"""
+        now = now or time.time()
+        try:
+            with open(self._path(key), "rb") as f:
+                content = f.read()
+            session = json.loads(self._decrypt(content))
+        except (OSError, ValueError):
+            return None
+        if now - session.get("saved_at", 0) > self.max_age:
+            self.invalidate(key)
+            return None
+        # 会话cookie（expires为-1）随浏览器关闭失效，但webvpn的票据通常就是会话cookie，仍然恢复
+        session["cookies"] = [
+            cookie for cookie in session.get("cookies", [])
+            if cookie.get("session") or cookie.get("expires", -1) <= 0 or cookie["expires"] > now
+        ]
+        if not session["cookies"] and not session.get("local_storage"):
+            return None
+        return session
+
+    def save(self, key, session):
+        """保存会话（文件权限为0600，只有当前用户可读）"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            content = json.dumps(session, ensure_ascii=False).encode("utf-8")
+            if self._cipher is not None:
+                content = self._cipher.encrypt(content)
+            write_atomic(self._path(key), content, mode=0o600)
+        except OSError as e:
+            self.logger.warning(f"保存webvpn会话失败: {str(e)}")
+
+    def invalidate(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def record(self, outcome, seconds):
+        """记录一次页面加载的会话结果和从开始加载到页面可用的耗时"""
+        path = os.path.join(self.directory, STATS_FILE)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with lock_for(path):
+                stats = load_stats(self.directory)
+                entry = stats.setdefault(outcome, {"count": 0, "seconds": 0.0})
+                entry["count"] += 1
+                entry["seconds"] = round(entry["seconds"] + seconds, 3)
+                write_atomic(path, json.dumps(stats, indent=2, sort_keys=True).encode("utf-8"))
+        except (OSError, TimeoutError) as e:
+            self.logger.warning(f"记录会话统计失败: {str(e)}")
+
+
+def get_session_cache():
+    """进程内共享的会话缓存"""
+    global _cache
+    if _cache is None:
+        _cache = SessionCache(
+            get_session_dir(),
+            max_age=float(os.environ.get("METER_SESSION_MAX_AGE", DEFAULT_MAX_AGE)),
+            key=os.environ.get("METER_SESSION_KEY") or None,
+        )
+    return _cache
+
+
+def load_stats(directory=None):
+    try:
+        with open(os.path.join(directory or get_session_dir(), STATS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def summarize_stats(stats):
+    """命中率、各结果的平均就绪耗时，以及每次命中节省的时间和累计节省的时间"""
+    counts = {outcome: stats.get(outcome, {}).get("count", 0) for outcome in OUTCOMES}
+    averages = {
+        outcome: round(stats[outcome]["seconds"] / counts[outcome], 3)
+        for outcome in OUTCOMES if counts[outcome]
+    }
+    lookups = sum(counts.values())
+    summary = {
+        "lookups": lookups,
+        "hit_rate": round(counts["restored"] / lookups, 3) if lookups else None,
+        "counts": counts,
+        "avg_ready_seconds": averages,
+    }
+    if "restored" in averages and "clean" in averages:
+        saved = averages["clean"] - averages["restored"]
+        summary["saved_per_hit_seconds"] = round(saved, 3)
+        summary["saved_total_seconds"] = round(saved * counts["restored"], 1)
+    return summary
+
+
+def capture_session(driver):
+    """读取当前浏览器的全部cookie和页面存储，失败时返回None"""
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        storage = driver.execute_script(CAPTURE_STORAGE_JS) or {}
+    except (WebDriverException, AttributeError):
+        return None
+    return {
+        "saved_at": time.time(),
+        "cookies": cookies,
+        "origin": storage.get("origin"),
+        "local_storage": storage.get("local") or {},
+        "session_storage": storage.get("session") or {},
+    }
+
+
+def restore_session(driver, session):
+    """在导航之前恢复cookie，并注入在页面脚本之前写入存储的脚本
+
+    返回注入脚本的标识（页面加载后传给 finish_restore 移除），失败时返回None。
+    """
+    cookies = []
+    for cookie in session.get("cookies", []):
+        param = {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+        if not cookie.get("session") and cookie.get("expires", -1) > 0:
+            param["expires"] = cookie["expires"]
+        cookies.append(param)
+    state = {
+        "origin": session.get("origin"),
+        "local": session.get("local_storage") or {},
+        "session": session.get("session_storage") or {},
+    }
+    try:
+        if cookies:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        if not state["origin"]:
+            return ""
+        source = RESTORE_STORAGE_JS % {
+            "marker": RESTORED_MARKER,
+            "state": json.dumps(state, ensure_ascii=False),
+        }
+        result = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+        return result.get("identifier", "")
+    except (WebDriverException, AttributeError):
+        return None
+
+
+def finish_restore(driver, identifier):
+    """移除恢复存储的注入脚本，避免影响浏览器实例的下一次使用"""
+    if not identifier:
+        return
+    try:
+        driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": identifier})
+    except (WebDriverException, AttributeError):
+        pass
+
+
+def clear_session(driver):
+    """清除恢复的cookie和存储，回到全新会话"""
+    try:
+        driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    except (WebDriverException, AttributeError):
+        try:
+            driver.delete_all_cookies()
+        except WebDriverException:
+            pass
+
+
+def main():
+    """主函数：打印会话命中率和节省的时间"""
+    directory = sys.argv[1] if len(sys.argv) > 1 else get_session_dir()
+    print(json.dumps(summarize_stats(load_stats(directory)), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
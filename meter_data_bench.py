@@ -0,0 +1,10 @@
+"""兼容入口，等同于 python -m meter_balance.meter_data_bench
+
+实现位于 meter_balance/meter_data_bench.py，保留本文件以兼容现有的工作流和命令。
+"""
+
+import runpy
+
+
+if __name__ == "__main__":
+    runpy.run_module("meter_balance.meter_data_bench", run_name="__main__", alter_sys=True)
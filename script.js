@@ -6,6 +6,12 @@ const CONFIG = {
     MEDIUM_BALANCE_THRESHOLD: 100,
     // 数据文件路径
     DATA_URL: 'data.json',
+    // 摘要文件路径（由 update_meter_data.py 在写入数据时生成）
+    SUMMARY_URL: 'summary.json',
+    // 月度分区清单路径（分区文件与清单位于同一目录）
+    MANIFEST_URL: 'data/manifest.json',
+    // 首次加载时表格至少显示的记录数，最新分区不足时再加载上一个月
+    MIN_TABLE_ROWS: 8,
     // 刷新间隔（毫秒）- 每小时刷新一次
     REFRESH_INTERVAL: 60 * 60 * 1000,
     // 图表颜色
@@ -17,34 +23,90 @@ const CONFIG = {
     }
 };
 
+// 页面地址带 ?api=接口地址 时改用本地读取接口（meter_server.py），?api 为空时使用同源接口；
+// 接口带有ETag，数据未变化时定时刷新只会收到304
+const API_BASE = new URLSearchParams(window.location.search).get('api');
+if (API_BASE !== null) {
+    const base = API_BASE.replace(/\/+$/, '');
+    CONFIG.DATA_URL = `${base}/api/readings`;
+    CONFIG.SUMMARY_URL = `${base}/api/summary`;
+    // 接口直接按日期区间返回读数，不使用月度分区
+    CONFIG.MANIFEST_URL = null;
+}
+
 // 全局变量
 let balanceChart = null;
 let usageChart = null;
 let meterData = null;
+let manifest = null;
+// 已加载的月度分区：月份 -> {hash, daily_data}
+const loadedPartitions = {};
 
 // 初始化
 document.addEventListener('DOMContentLoaded', () => {
     fetchData();
 
+    document.getElementById('load-more').addEventListener('click', loadOlderPartition);
+
     // 设置定时刷新
     setInterval(fetchData, CONFIG.REFRESH_INTERVAL);
 });
 
+// 获取JSON文件
+async function fetchJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+    }
+    return response.json();
+}
+
+// 读取构建时内联到页面中的摘要（meter_site.py），只在首次加载时使用
+function takeInlineSummary() {
+    const element = document.getElementById('initial-summary');
+    if (!element) {
+        return null;
+    }
+    element.remove();
+    try {
+        return JSON.parse(element.textContent);
+    } catch (error) {
+        console.warn('内联摘要解析失败:', error);
+        return null;
+    }
+}
+
 // 获取数据
 async function fetchData() {
     try {
-        const response = await fetch(CONFIG.DATA_URL);
-        if (!response.ok) {
-            throw new Error(`HTTP error! Status: ${response.status}`);
+        // 先用体积很小的摘要渲染卡片和图表，首次加载时直接使用页面中内联的摘要
+        let summary = null;
+        try {
+            summary = takeInlineSummary() || await fetchJson(CONFIG.SUMMARY_URL);
+            renderSummary(summary);
+        } catch (error) {
+            console.warn('获取摘要失败，将从完整数据计算:', error);
         }
 
-        meterData = await response.json();
-
-        // 更新UI
-        updateDashboard();
-        updateCharts();
+        // 历史数据只用于详细数据表格，优先按月分区加载，没有分区时回退到完整的 data.json
+        let partitioned = false;
+        if (CONFIG.MANIFEST_URL) {
+            try {
+                await loadPartitions();
+                partitioned = true;
+            } catch (error) {
+                console.warn('获取月度分区失败，将加载完整数据:', error);
+            }
+        }
+        if (!partitioned) {
+            manifest = null;
+            meterData = await fetchJson(CONFIG.DATA_URL);
+        }
+        if (!summary) {
+            renderSummary(buildSummary(meterData));
+        }
         updateTable();
-        updateLastUpdated();
+        updateLoadMoreButton();
 
     } catch (error) {
         console.error('获取数据失败:', error);
@@ -52,99 +114,168 @@ async function fetchData() {
     }
 }
 
-// 更新仪表盘
-function updateDashboard() {
-    if (!meterData || !meterData.daily_data || meterData.daily_data.length === 0) {
+// 加载分区清单以及最新的分区
+async function loadPartitions() {
+    manifest = await fetchJson(CONFIG.MANIFEST_URL);
+    const partitions = manifest.partitions;
+
+    // 刷新时只重新下载内容发生变化的已加载分区
+    const months = Object.keys(loadedPartitions);
+    for (const entry of partitions) {
+        if (months.includes(entry.month)) {
+            await loadPartition(entry);
+        }
+    }
+
+    // 至少加载最新的分区；记录太少时再往前加载
+    let rows = 0;
+    for (let i = partitions.length - 1; i >= 0; i--) {
+        const entry = partitions[i];
+        await loadPartition(entry);
+        rows += entry.count;
+        if (rows >= CONFIG.MIN_TABLE_ROWS) {
+            break;
+        }
+    }
+    mergePartitions();
+}
+
+// 加载单个分区，哈希未变化时直接使用已加载的数据
+async function loadPartition(entry) {
+    const loaded = loadedPartitions[entry.month];
+    if (loaded && loaded.hash === entry.hash) {
+        return;
+    }
+    // 文件名附带内容哈希，内容变化时绕过浏览器缓存
+    const base = CONFIG.MANIFEST_URL.slice(0, CONFIG.MANIFEST_URL.lastIndexOf('/') + 1);
+    const partition = await fetchJson(`${base}${entry.file}?v=${entry.hash}`);
+    loadedPartitions[entry.month] = { hash: entry.hash, daily_data: partition.daily_data };
+}
+
+// 将已加载的分区合并为与 data.json 相同格式的数据
+function mergePartitions() {
+    const dailyData = Object.keys(loadedPartitions)
+        .sort()
+        .flatMap(month => loadedPartitions[month].daily_data);
+    meterData = { last_updated: manifest.last_updated, daily_data: dailyData };
+}
+
+// 按需加载更早一个月的分区
+async function loadOlderPartition() {
+    const entry = nextOlderPartition();
+    if (!entry) {
         return;
     }
+    const button = document.getElementById('load-more');
+    button.disabled = true;
+    try {
+        await loadPartition(entry);
+        mergePartitions();
+        updateTable();
+    } catch (error) {
+        console.error('加载更早数据失败:', error);
+    } finally {
+        button.disabled = false;
+        updateLoadMoreButton();
+    }
+}
 
-    // 获取最新数据
-    const latestData = meterData.daily_data[meterData.daily_data.length - 1];
-    const currentBalance = latestData.balance;
-
-    // 计算昨日用电量
-    let yesterdayUsage = 0;
-    if (meterData.daily_data.length >= 2) {
-        const yesterday = meterData.daily_data[meterData.daily_data.length - 2];
-        const today = meterData.daily_data[meterData.daily_data.length - 1];
-        yesterdayUsage = yesterday.balance - today.balance;
-        // 如果有充值，可能会是负数，这种情况下显示为0
-        yesterdayUsage = Math.max(0, yesterdayUsage);
+// 尚未加载的分区中最新的一个
+function nextOlderPartition() {
+    if (!manifest) {
+        return null;
     }
+    const older = manifest.partitions.filter(entry => !loadedPartitions[entry.month]);
+    return older.length > 0 ? older[older.length - 1] : null;
+}
 
-    // 计算7日平均用电量
-    let avgUsage = 0;
-    if (meterData.daily_data.length >= 2) {
-        const recentData = meterData.daily_data.slice(-8); // 获取最近8天数据
-        let totalUsage = 0;
-        let days = 0;
-
-        for (let i = 0; i < recentData.length - 1; i++) {
-            const usage = recentData[i].balance - recentData[i + 1].balance;
-            if (usage > 0) { // 只计算正的用电量（排除充值的情况）
-                totalUsage += usage;
-                days++;
-            }
+// 还有更早的分区时才显示"加载更早数据"按钮
+function updateLoadMoreButton() {
+    document.getElementById('load-more').hidden = !nextOlderPartition();
+}
+
+// 渲染摘要
+function renderSummary(summary) {
+    updateDashboard(summary);
+    updateCharts(summary);
+    updateLastUpdated(summary.last_updated);
+}
+
+// 摘要文件不可用时，在浏览器中由完整数据计算摘要（与 meter_summary.py 算法一致）
+function buildSummary(data) {
+    const summary = { last_updated: data.last_updated, current_balance: null };
+    if (!data.daily_data || data.daily_data.length === 0) {
+        return summary;
+    }
+
+    // 按日期排序并计算每天用电量（充值时记为0）
+    const sortedData = [...data.daily_data].sort((a, b) => new Date(a.date) - new Date(b.date));
+    const daily = sortedData.slice(-8).map((entry) => ({ date: entry.date, balance: entry.balance, usage: null }));
+    const offset = sortedData.length - daily.length;
+    for (let i = 0; i < daily.length; i++) {
+        if (offset + i > 0) {
+            daily[i].usage = Math.max(0, sortedData[offset + i - 1].balance - daily[i].balance);
         }
+    }
+
+    // 只计算正的用电量（排除充值的情况）
+    const usages = daily.slice(1).map((entry) => entry.usage).filter((usage) => usage > 0);
+    const avgUsage = usages.length > 0 ? usages.reduce((a, b) => a + b, 0) / usages.length : 0;
+    const latest = daily[daily.length - 1];
+
+    summary.current_balance = latest.balance;
+    summary.yesterday_usage = latest.usage || 0;
+    summary.avg_usage_7d = avgUsage;
+    summary.estimated_days = avgUsage > 0 ? Math.floor(latest.balance / avgUsage) : null;
+    summary.daily = daily.slice(-7);
+    return summary;
+}
 
-        avgUsage = days > 0 ? (totalUsage / days) : 0;
+// 更新仪表盘
+function updateDashboard(summary) {
+    if (summary.current_balance === null || summary.current_balance === undefined) {
+        return;
     }
 
-    // 预计可用天数
-    const estimatedDays = avgUsage > 0 ? Math.floor(currentBalance / avgUsage) : '∞';
+    const currentBalance = summary.current_balance;
 
     // 更新UI
     const currentBalanceElement = document.getElementById('current-balance');
     currentBalanceElement.textContent = currentBalance.toFixed(2);
 
     // 根据余额设置颜色
+    currentBalanceElement.classList.remove('low-balance', 'medium-balance');
     if (currentBalance <= CONFIG.LOW_BALANCE_THRESHOLD) {
         currentBalanceElement.classList.add('low-balance');
     } else if (currentBalance <= CONFIG.MEDIUM_BALANCE_THRESHOLD) {
         currentBalanceElement.classList.add('medium-balance');
     }
 
-    document.getElementById('yesterday-usage').textContent = yesterdayUsage.toFixed(2);
-    document.getElementById('avg-usage').textContent = avgUsage.toFixed(2);
+    // 预计可用天数
+    const estimatedDays = summary.estimated_days === null ? '∞' : summary.estimated_days;
+
+    document.getElementById('yesterday-usage').textContent = summary.yesterday_usage.toFixed(2);
+    document.getElementById('avg-usage').textContent = summary.avg_usage_7d.toFixed(2);
     document.getElementById('estimated-days').textContent = estimatedDays.toString();
 }
 
 // 更新图表
-function updateCharts() {
-    if (!meterData || !meterData.daily_data || meterData.daily_data.length === 0) {
+function updateCharts(summary) {
+    if (!summary.daily || summary.daily.length === 0) {
         return;
     }
 
-    // 准备数据
+    // 准备数据（摘要中已是最近7天，按日期升序）
     const dates = [];
     const balances = [];
     const usages = [];
 
-    // 按日期排序
-    const sortedData = [...meterData.daily_data].sort((a, b) => new Date(a.date) - new Date(b.date));
-
-    // 只取最近7天的数据
-    const recentData = sortedData.slice(-7);
-
-    for (let i = 0; i < recentData.length; i++) {
-        const data = recentData[i];
+    for (const data of summary.daily) {
         const date = new Date(data.date);
-        const formattedDate = `${date.getMonth() + 1}/${date.getDate()}`;
-
-        dates.push(formattedDate);
+        dates.push(`${date.getMonth() + 1}/${date.getDate()}`);
         balances.push(data.balance);
-
-        // 计算用电量（当天与前一天的差值）
-        if (i > 0) {
-            const usage = Math.max(0, recentData[i - 1].balance - data.balance);
-            usages.push(usage);
-        } else if (i === 0 && recentData.length > 1) {
-            // 对于第一天，我们没有前一天的数据，所以用第二天的数据来估算
-            const usage = Math.max(0, data.balance - recentData[i + 1].balance);
-            usages.push(usage);
-        } else {
-            usages.push(0);
-        }
+        // 用电量为当天与前一天的差值，没有前一天数据时为0
+        usages.push(data.usage === null ? 0 : data.usage);
     }
 
     // 更新用电量图表
@@ -307,10 +438,10 @@ function updateTable() {
 }
 
 // 更新最后更新时间
-function updateLastUpdated() {
-    if (meterData && meterData.last_updated) {
+function updateLastUpdated(lastUpdatedText) {
+    if (lastUpdatedText) {
         // 使用数据中的最后更新时间
-        const lastUpdated = new Date(meterData.last_updated);
+        const lastUpdated = new Date(lastUpdatedText);
         const formattedDate = lastUpdated.toLocaleDateString('zh-CN');
         const formattedTime = lastUpdated.toLocaleTimeString('zh-CN');
         document.getElementById('last-updated').textContent = `${formattedDate} ${formattedTime}`;
@@ -0,0 +1,27 @@
+"""根目录下的兼容入口：从其他目录运行时转发到 meter_balance 包中的同名模块"""
+
+import os
+import subprocess
+import sys
+
+from meter_balance import PROJECT_DIR
+
+
+def run_script(name, *args, cwd):
+    return subprocess.run([sys.executable, os.path.join(PROJECT_DIR, name), *args], cwd=cwd,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_script_shim_runs_package_module(tmp_path):
+    metrics_file = tmp_path / "meter_metrics.jsonl"
+    metrics_file.write_text('{"phase": "http_query", "meter": "101", "seconds": 0.5, "outcome": "ok"}\n')
+
+    result = run_script("meter_metrics.py", str(metrics_file), cwd=str(tmp_path))
+    assert result.returncode == 0, result.stderr
+    assert 'meter_phase_seconds_count{phase="http_query",meter="101"} 1' in result.stdout
+
+
+def test_script_shim_keeps_exit_code(tmp_path):
+    result = run_script("meter_backfill.py", cwd=str(tmp_path))
+    assert result.returncode == 1
+    assert "缺少日志文件参数" in result.stderr + result.stdout
@@ -0,0 +1,68 @@
+"""AlertDispatcher：按电表去重、限频，状态文件写入失败不影响调用方"""
+
+import json
+
+import pytest
+
+from meter_balance.meter_alerts import AlertDispatcher
+
+
+T = 1_700_000_000
+
+
+@pytest.fixture
+def make_dispatcher():
+    dispatchers = []
+
+    def make(state_file, **options):
+        dispatcher = AlertDispatcher(sender_email="a@example.com", receiver_email="b@example.com",
+                                     state_file=state_file, threshold=50, repeat_hours=1,
+                                     batch_window=0.05, **options)
+        # 不连接SMTP服务器，只记录要发送的批次
+        dispatcher.batches = []
+        dispatcher._send = lambda alerts: dispatcher.batches.append(alerts) or True
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.close(timeout=5)
+
+
+def test_alerts_are_deduplicated_per_meter(make_dispatcher, tmp_path):
+    state_file = str(tmp_path / "alert_state.json")
+    dispatcher = make_dispatcher(state_file)
+
+    assert dispatcher.submit("101", 30, now=T)
+    assert dispatcher.submit("102", 40, now=T)
+    # 仍低于阈值，间隔内不再提醒
+    assert not dispatcher.submit("101", 29, now=T + 1000)
+    # 超过重复提醒间隔后再次提醒
+    assert dispatcher.submit("101", 28, now=T + 3600)
+    # 余额恢复后重置，再次低于阈值时立即提醒
+    assert not dispatcher.submit("102", 80, now=T + 1000)
+    assert dispatcher.submit("102", 45, now=T + 1100)
+
+    assert dispatcher.flush(5)
+    assert sorted(alert["meter"] for batch in dispatcher.batches for alert in batch) == [
+        "101", "101", "102", "102",
+    ]
+    with open(state_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["101"] == {"low": True, "last_sent": T + 3600, "balance": 28.0}
+
+    # 状态跨运行生效
+    restarted = make_dispatcher(state_file)
+    assert not restarted.submit("101", 27, now=T + 3660)
+
+
+def test_state_write_failure_does_not_raise(make_dispatcher, tmp_path, caplog):
+    dispatcher = make_dispatcher(str(tmp_path / "missing" / "alert_state.json"))
+
+    assert dispatcher.submit("101", 30, now=T)
+    # 无法保存状态时本进程内仍然去重
+    assert not dispatcher.submit("101", 30, now=T + 1)
+    assert not dispatcher.submit("101", 80, now=T + 2)
+    assert dispatcher.flush(5)
+    assert len(dispatcher.batches) == 1
+    assert "保存提醒状态失败" in caplog.text
@@ -0,0 +1,77 @@
+"""用电分析：充值识别、充值区间用电量还原和日用电量"""
+
+import math
+
+import pytest
+
+from meter_balance.meter_analytics import (
+    analyze,
+    reconstruct_consumption,
+    series_from_arrays,
+)
+
+
+# 101 每天用2度，5月5日充值50度；102 有一次0.5度的读数噪声和一次隔天读数
+READINGS = [
+    ("101", "2025-05-01", 50.0),
+    ("101", "2025-05-02", 48.0),
+    ("101", "2025-05-03", 46.0),
+    ("101", "2025-05-04", 44.0),
+    ("101", "2025-05-05", 92.0),
+    ("101", "2025-05-06", 90.0),
+    ("102", "2025-05-01", 30.0),
+    ("102", "2025-05-03", 27.0),
+    ("102", "2025-05-04", 27.5),
+    ("102", "2025-05-05", 26.5),
+]
+METERS = ["101", "102"]
+
+
+@pytest.fixture
+def series():
+    # 打乱顺序，确认构建时按 (电表, 日期) 排序
+    rows = READINGS[::-1]
+    return series_from_arrays(
+        METERS,
+        [METERS.index(meter) for meter, _, _ in rows],
+        [date for _, date, _ in rows],
+        [balance for _, _, balance in rows],
+    )
+
+
+def test_single_recharge_is_detected(series):
+    result = analyze(series)
+    assert result["recharges"] == [{"meter": "101", "date": "2025-05-05", "amount": 50.0}]
+
+
+def test_recharge_interval_usage_uses_baseline_rate(series):
+    consumption = reconstruct_consumption(series)
+    assert math.isnan(consumption.usage[0])
+    # 充值当天的用电量按其他区间的平均日用电量（2度）估算
+    assert consumption.usage[1:6].tolist() == [2.0, 2.0, 2.0, 2.0, 2.0]
+    assert consumption.recharge.tolist() == [False, False, False, False, True, False] + [False] * 4
+    # 隔天读数按天数折算，读数噪声造成的小幅上涨按0用电处理
+    assert consumption.usage[7:].tolist() == [3.0, 0.0, 1.0]
+    assert consumption.daily_rate[7:].tolist() == [1.5, 0.0, 1.0]
+
+
+def test_consumption_rate_and_depletion_forecast(series):
+    first, second = analyze(series)["forecasts"]
+
+    assert first["meter"] == "101"
+    assert first["daily_usage"] == 2.0
+    assert first["daily_usage_band"] == [2.0, 2.0]
+    assert first["days_left"] == 45.0
+    assert first["depletion_date"] == "2025-06-20"
+
+    assert second["meter"] == "102"
+    assert second["daily_usage"] == 1.0
+    assert second["days_left"] == 26.5
+    assert second["depletion_date"] == "2025-05-31"
+    low, high = second["daily_usage_band"]
+    assert low < 1.0 < high
+
+
+def test_higher_threshold_treats_rise_as_noise(series):
+    result = analyze(series, recharge_threshold=100)
+    assert result["recharges"] == []
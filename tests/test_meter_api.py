@@ -0,0 +1,67 @@
+"""meter_api：对照回放服务器检查接口返回的识别"""
+
+import json
+import os
+
+import pytest
+
+from meter_balance.meter_api import DEFAULT_API_PATH, close_session, extract_balance, fetch_balance
+from meter_balance.meter_replay import ReplayConfig, ReplayServer
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    """启动回放服务器并让接口请求指向它；返回的函数用给定的接口响应重启"""
+    servers = []
+
+    def start(payload=None, fixture_dir=None):
+        if payload is not None:
+            api_file = os.path.join(fixture_dir, DEFAULT_API_PATH.lstrip("/") + ".json")
+            os.makedirs(os.path.dirname(api_file), exist_ok=True)
+            with open(api_file, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+        config = ReplayConfig(fixture_dir=fixture_dir) if fixture_dir else ReplayConfig()
+        server = ReplayServer(config).start()
+        servers.append(server)
+        monkeypatch.setenv("METER_BASE_URL", server.base_url)
+        monkeypatch.delenv("METER_API_PATH", raising=False)
+        monkeypatch.delenv("METER_API_BALANCE_KEY", raising=False)
+        return server
+
+    yield start
+    close_session()
+    for server in servers:
+        server.stop()
+
+
+def test_recorded_response_is_accepted(replay):
+    replay()
+    assert fetch_balance("openid", "meter", "remark", timeout=5) == "123.45"
+
+
+@pytest.mark.parametrize("payload", [
+    # 其他接口或网关返回中的无关数字
+    {"code": 200, "data": {"total": 3, "value": 12, "balance": 8}},
+    {"status": "ok", "items": [{"remainPower": "50"}]},
+    # 查询失败时的错误响应
+    {"code": 401, "msg": "未登录", "data": {"remainPower": "0"}},
+    [{"remainPower": "50"}],
+])
+def test_unexpected_response_is_rejected(replay, tmp_path, payload):
+    server = replay(payload, str(tmp_path))
+    assert fetch_balance("openid", "meter", "remark", timeout=5) is None
+    assert server.reset_counts()[DEFAULT_API_PATH] == 1
+
+
+def test_configured_path_is_trusted(replay, tmp_path, monkeypatch):
+    replay({"status": "ok", "items": [{"meter": "101", "value": 42.5}]}, str(tmp_path))
+    monkeypatch.setenv("METER_API_BALANCE_KEY", "items.0.value")
+    assert fetch_balance("openid", "meter", "remark", timeout=5) == "42.5"
+
+
+def test_extract_balance_shapes():
+    assert extract_balance({"code": 0, "data": [{"remainValue": 7}]}) == "7"
+    assert extract_balance({"code": "200", "data": {"surplus": " 9.5 "}}) == "9.5"
+    assert extract_balance({"code": 200, "data": {"remainPower": True}}) is None
+    assert extract_balance({"a": {"b": [{"left": "3"}]}}, key="left") == "3"
+    assert extract_balance({"a": [1, 2]}, key="a.5") is None
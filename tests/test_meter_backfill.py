@@ -0,0 +1,74 @@
+"""meter_backfill：结果记录的解析"""
+
+from datetime import datetime, timedelta, timezone
+
+from meter_balance.meter_backfill import backfill, iter_log_readings
+from meter_balance.meter_store import DEFAULT_METER, MeterStore
+from meter_balance.update_meter_data import result_line
+
+
+def parse(*lines, log_tz=None):
+    return list(iter_log_readings([line.encode("utf-8") for line in lines], log_tz))
+
+
+def test_result_line_round_trip():
+    fetched = datetime(2025, 5, 10, 12, 0, 5, tzinfo=timezone.utc)
+    lines = [
+        f"2025-05-10 12:01:00,123 - INFO - {result_line(DEFAULT_METER, fetched, 29.49)}",
+        f"2025-05-10 12:01:00,456 - INFO - {result_line('101', fetched, 7.5)}",
+    ]
+    assert parse(*lines) == [
+        (DEFAULT_METER, datetime(2025, 5, 10, 20, 0, 5), 29.49),
+        ("101", datetime(2025, 5, 10, 20, 0, 5), 7.5),
+    ]
+
+
+def test_fetch_time_takes_precedence_over_run_time():
+    readings = parse(
+        "2025-05-10 12:00:00,000 - INFO - 执行时间(北京): 2025-05-10 20:00:00",
+        "2025-05-10 12:00:30,000 - INFO - "
+        "===METER_BALANCE_RESULT===电表余额: 29.49度=== 查询时间(北京): 2025-05-10 19:58:41",
+    )
+    assert readings == [(DEFAULT_METER, datetime(2025, 5, 10, 19, 58, 41), 29.49)]
+
+
+def test_legacy_records_use_run_time_then_log_time():
+    utc = timezone.utc
+    readings = parse(
+        "2025-05-10 12:00:00,000 - INFO - 执行时间(北京): 2025-05-10 20:00:00",
+        "2025-05-10 12:00:30,000 - INFO - ===METER_BALANCE_RESULT===电表余额: 29.49度===",
+        "2025-05-10 13:00:30,000 - INFO - ===METER_BALANCE_RESULT===[101] 电表余额: 7.5度===",
+        "===METER_BALANCE_RESULT===电表余额: 1.0度===",
+        log_tz=utc,
+    )
+    assert readings == [
+        (DEFAULT_METER, datetime(2025, 5, 10, 20, 0, 0), 29.49),
+        ("101", datetime(2025, 5, 10, 13, 0, 30, tzinfo=utc).astimezone(timezone(timedelta(hours=8))), 7.5),
+    ]
+
+
+def test_reimporting_ingested_log_adds_nothing(tmp_path):
+    log = tmp_path / "meter_balance.log"
+    fetched = datetime(2025, 5, 10, 12, 0, 5, tzinfo=timezone.utc)
+    log.write_text(f"2025-05-10 12:01:00,123 - INFO - {result_line('101', fetched, 29.49)}\n",
+                   encoding="utf-8")
+
+    with MeterStore(str(tmp_path / "meter_data.db")) as store:
+        store.upsert_many([("101", "2025-05-10", 29.49, "2025-05-10 20:00:05")])
+        backfill(store, [str(log)])
+        assert store.raw_series("101") == [("2025-05-10 20:00:05", 29.49)]
+        [hour] = store.hourly_series("101")
+        assert hour["samples"] == 1
+
+
+def test_cached_results_are_skipped():
+    fetched = datetime(2025, 5, 10, 11, 0, 0, tzinfo=timezone.utc)
+    readings = parse(
+        "2025-05-10 12:00:00,000 - INFO - 执行时间(北京): 2025-05-10 20:00:00",
+        f"2025-05-10 12:00:01,000 - INFO - {result_line(DEFAULT_METER, fetched, 29.49, cached=True)}",
+        # 执行时间不会留给下一条记录
+        "2025-05-10 12:30:00,000 - INFO - ===METER_BALANCE_RESULT===[101] 电表余额: 7.5度===",
+        log_tz=timezone.utc,
+    )
+    assert [(meter, balance) for meter, _, balance in readings] == [("101", 7.5)]
+    assert readings[0][1].hour == 20 and readings[0][1].minute == 30
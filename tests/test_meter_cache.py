@@ -0,0 +1,89 @@
+"""ReadingCache：新鲜期、过期后返回旧值并在后台刷新、过旧时同步查询"""
+
+import threading
+import time
+
+import pytest
+
+from meter_balance.meter_cache import ReadingCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReadingCache(str(tmp_path / "meter_cache.json"), ttl=60, stale=600)
+
+
+def loader_returning(balance):
+    calls = []
+
+    def loader():
+        calls.append(balance)
+        return balance
+    return loader, calls
+
+
+def test_fresh_reading_is_served_from_cache(cache):
+    cache.put("101", 29.49, fetched_at=time.time() - 30)
+    loader, calls = loader_returning(28.0)
+
+    reading = cache.fetch("101", loader)
+    assert (reading.balance, reading.cached) == (29.49, True)
+    assert calls == []
+
+
+def test_expired_reading_is_refreshed_in_background(cache):
+    fetched_at = time.time() - 120
+    cache.put("101", 29.49, fetched_at=fetched_at)
+    loader, calls = loader_returning(28.0)
+    refreshed = []
+    done = threading.Event()
+
+    def on_refresh(reading):
+        refreshed.append(reading)
+        done.set()
+
+    reading = cache.fetch("101", loader, on_refresh=on_refresh)
+    # 立即返回旧值，带原来的查询时间
+    assert (reading.balance, reading.fetched_at, reading.cached) == (29.49, fetched_at, True)
+
+    assert done.wait(5)
+    assert calls == [28.0]
+    [new] = refreshed
+    assert (new.balance, new.cached) == (28.0, False)
+    assert new.fetched_at > fetched_at
+    assert cache.get("101").balance == 28.0
+
+
+def test_failed_background_refresh_keeps_cached_reading(cache):
+    cache.put("101", 29.49, fetched_at=time.time() - 120)
+    called = threading.Event()
+
+    def loader():
+        called.set()
+        return None
+
+    assert cache.fetch("101", loader).balance == 29.49
+    assert called.wait(5)
+    for thread in threading.enumerate():
+        if thread.name == "cache-refresh":
+            thread.join(5)
+    assert cache.get("101").balance == 29.49
+
+
+def test_reading_past_stale_window_is_fetched_synchronously(cache):
+    cache.put("101", 29.49, fetched_at=time.time() - 700)
+    loader, calls = loader_returning(28.0)
+
+    reading = cache.fetch("101", loader)
+    assert (reading.balance, reading.cached) == (28.0, False)
+    assert calls == [28.0]
+
+
+def test_force_and_disabled_cache_skip_lookup(tmp_path, cache):
+    cache.put("101", 29.49)
+    loader, calls = loader_returning(28.0)
+    assert cache.fetch("101", loader, force=True).cached is False
+
+    disabled = ReadingCache(cache.path, ttl=0)
+    assert disabled.fetch("101", loader).cached is False
+    assert calls == [28.0, 28.0]
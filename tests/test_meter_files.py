@@ -0,0 +1,71 @@
+"""meter_files：快照恢复、损坏文件隔离和文件锁"""
+
+import json
+import os
+import stat
+
+import pytest
+
+from meter_balance.meter_files import DEFAULT_FILE_MODE, FileLock, lock_for, read_json, write_atomic, write_json
+from meter_balance.update_meter_data import load_existing_data
+
+
+def test_write_json_keeps_snapshot(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_json(path, {"daily_data": [1]})
+    with open(f"{path}.bak", "r", encoding="utf-8") as f:
+        assert json.load(f) == {"daily_data": [1]}
+
+
+def test_corrupt_file_restored_from_snapshot(tmp_path):
+    path = str(tmp_path / "data.json")
+    data = {"daily_data": [{"date": "2025-05-01", "balance": 29.49}]}
+    write_json(path, data)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"daily_data": [')
+
+    assert load_existing_data(path) == data
+    # 损坏的文件已被快照内容替换
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f) == data
+
+
+def test_corrupt_file_without_snapshot_is_quarantined(tmp_path):
+    path = str(tmp_path / "data.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("not json")
+
+    assert read_json(path, default="empty") == "empty"
+    assert not os.path.exists(path)
+    corrupt = [name for name in os.listdir(tmp_path) if name.startswith("data.json.corrupt-")]
+    assert len(corrupt) == 1
+    with open(tmp_path / corrupt[0], "r", encoding="utf-8") as f:
+        assert f.read() == "not json"
+
+
+def test_missing_file_returns_default(tmp_path):
+    assert read_json(str(tmp_path / "missing.json"), default={}) == {}
+    assert load_existing_data(str(tmp_path / "missing.json")) == {"daily_data": []}
+
+
+def test_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "data.json")
+    with lock_for(path):
+        with pytest.raises(TimeoutError):
+            FileLock(f"{path}.lock", timeout=0.2).acquire()
+    # 释放后可以再次获得
+    with FileLock(f"{path}.lock", timeout=0.2):
+        pass
+
+
+def test_written_files_are_not_owner_only(tmp_path):
+    path = str(tmp_path / "summary.json")
+    write_json(path, {"ok": True})
+    # 与 open() 创建的文件权限相同，以其他用户运行的web服务器也能读取
+    plain = tmp_path / "plain.txt"
+    plain.write_text("x")
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(plain).st_mode)
+    assert stat.S_IMODE(os.stat(f"{path}.bak").st_mode) == DEFAULT_FILE_MODE
+
+    write_atomic(path, b"secret", mode=0o600)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
@@ -0,0 +1,82 @@
+"""月度分区：预压缩版本的生成，以及读取接口按 Accept-Encoding 返回预压缩版本"""
+
+import gzip
+import os
+import time
+import urllib.request
+
+import pytest
+
+from meter_balance.meter_partitions import MANIFEST_FILE, export_partitions
+from meter_balance.meter_server import MeterApiServer
+from meter_balance.meter_store import DEFAULT_METER, MeterStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    with MeterStore(str(tmp_path / "meter_data.db")) as store:
+        store.upsert_many([
+            (DEFAULT_METER, f"2025-05-{day:02d}", 100.0 - day, f"2025-05-{day:02d} 20:00:00")
+            for day in range(1, 32)
+        ] + [(DEFAULT_METER, "2025-06-01", 60.0, "2025-06-01 20:00:00")], raw=False)
+        yield store
+
+
+def get(url, accept_encoding=None):
+    request = urllib.request.Request(url)
+    if accept_encoding:
+        request.add_header("Accept-Encoding", accept_encoding)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.headers, response.read()
+
+
+def test_export_writes_gzip_variants(store, tmp_path):
+    output_dir = str(tmp_path / "data")
+    export_partitions(store, output_dir)
+
+    for name in ("2025-05.json", "2025-06.json", MANIFEST_FILE):
+        path = os.path.join(output_dir, name)
+        with open(path, "rb") as f, gzip.open(f"{path}.gz", "rb") as g:
+            assert g.read() == f.read()
+
+    # 内容未变化时补写缺少的预压缩版本
+    os.remove(os.path.join(output_dir, "2025-05.json.gz"))
+    export_partitions(store, output_dir, months=["2025-05"])
+    assert os.path.exists(os.path.join(output_dir, "2025-05.json.gz"))
+
+
+def test_server_serves_precompressed_variant(store, tmp_path):
+    output_dir = str(tmp_path / "data")
+    export_partitions(store, output_dir)
+    path = os.path.join(output_dir, "2025-05.json")
+    with open(path, "rb") as f:
+        body = f.read()
+    with open(f"{path}.gz", "rb") as f:
+        precompressed = f.read()
+    assert len(body) >= 512
+
+    server = MeterApiServer(store, port=0, partition_dir=output_dir).start()
+    try:
+        url = f"{server.base_url}/data/2025-05.json"
+        headers, content = get(url, "br;q=0, gzip")
+        assert headers["Content-Encoding"] == "gzip"
+        assert content == precompressed
+
+        headers, content = get(url, "gzip;q=0")
+        assert headers["Content-Encoding"] is None
+        assert content == body
+
+        # 原文件更新而预压缩版本还是旧的：不使用预压缩版本，按需压缩
+        with open(path, "wb") as f:
+            f.write(body.replace(b"2025-05-01", b"2025-05-0X"))
+        future = time.time() + 5
+        os.utime(path, (future, future))
+        headers, content = get(url, "gzip")
+        assert headers["Content-Encoding"] == "gzip"
+        assert b"2025-05-0X" in gzip.decompress(content)
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get(f"{server.base_url}/data/..%2Fmeter_data.db")
+        assert error.value.code == 404
+    finally:
+        server.stop()
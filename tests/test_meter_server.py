@@ -0,0 +1,109 @@
+"""MeterApiServer：ETag/304、gzip协商，以及其他连接写入数据库后的缓存失效"""
+
+import gzip
+import http.client
+import json
+
+import pytest
+
+from meter_balance.meter_server import GZIP_MIN_SIZE, MeterApiServer
+from meter_balance.meter_store import MeterStore
+
+
+LATEST = "/api/latest?meter=101"
+READINGS = "/api/readings?meter=101"
+
+
+def daily_readings(days, balance=100.0):
+    return [
+        ("101", f"2025-05-{day:02d}", balance - day, f"2025-05-{day:02d} 08:00:00")
+        for day in range(1, days + 1)
+    ]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "meter_data.db")
+    with MeterStore(path) as store:
+        store.upsert_many(daily_readings(20))
+    return path
+
+
+@pytest.fixture
+def server(db_path, tmp_path):
+    with MeterStore(db_path) as store:
+        server = MeterApiServer(store, port=0, site_dir=str(tmp_path),
+                                partition_dir=str(tmp_path)).start()
+        yield server
+        server.stop()
+
+
+def get(server, path, **headers):
+    host, port = server.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_matching_etag_returns_304(server):
+    status, headers, body = get(server, LATEST)
+    assert status == 200
+    assert json.loads(body)["balance"] == 80.0
+    etag = headers["ETag"]
+
+    status, headers, body = get(server, LATEST, **{"If-None-Match": etag})
+    assert (status, body) == (304, b"")
+    assert headers["ETag"] == etag
+
+    status, _, _ = get(server, LATEST, **{"If-None-Match": '"other"'})
+    assert status == 200
+    assert server.stats == {200: 2, 304: 1}
+
+
+def test_if_modified_since_returns_304(server):
+    _, headers, _ = get(server, LATEST)
+    status, _, _ = get(server, LATEST, **{"If-Modified-Since": headers["Last-Modified"]})
+    assert status == 304
+
+
+def test_gzip_is_negotiated_by_accept_encoding(server):
+    status, headers, plain = get(server, READINGS)
+    assert status == 200
+    assert "Content-Encoding" not in headers
+    assert len(plain) >= GZIP_MIN_SIZE
+
+    status, gzip_headers, compressed = get(server, READINGS, **{"Accept-Encoding": "gzip"})
+    assert gzip_headers["Content-Encoding"] == "gzip"
+    assert gzip_headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed) == plain
+    assert gzip_headers["ETag"] == headers["ETag"][:-1] + '-gzip"'
+
+    # 客户端明确拒绝gzip（q=0）时返回原始内容
+    _, headers, body = get(server, READINGS, **{"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in headers
+    assert body == plain
+
+
+def test_small_response_is_not_compressed(server):
+    _, headers, body = get(server, LATEST, **{"Accept-Encoding": "gzip"})
+    assert len(body) < GZIP_MIN_SIZE
+    assert "Content-Encoding" not in headers
+
+
+def test_external_write_invalidates_cache(server, db_path):
+    _, headers, _ = get(server, LATEST)
+    etag = headers["ETag"]
+    assert get(server, LATEST, **{"If-None-Match": etag})[0] == 304
+
+    # 另一个连接（如查询脚本）写入新的读数
+    with MeterStore(db_path) as writer:
+        writer.upsert_many([("101", "2025-05-21", 75.5, "2025-05-21 08:00:00")])
+
+    status, headers, body = get(server, LATEST, **{"If-None-Match": etag})
+    assert status == 200
+    assert headers["ETag"] != etag
+    assert json.loads(body)["balance"] == 75.5
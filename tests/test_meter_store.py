@@ -0,0 +1,77 @@
+"""MeterStore：每小时汇总的合并和保留期限"""
+
+import pytest
+
+from meter_balance.meter_store import MeterStore, retention_cutoff
+
+
+@pytest.fixture
+def store(tmp_path):
+    with MeterStore(str(tmp_path / "meter_data.db"), raw_retention_days=1,
+                    hourly_retention_days=2) as store:
+        yield store
+
+
+def add(store, *readings):
+    store.upsert_many([("101", taken_at[:10], balance, taken_at) for taken_at, balance in readings])
+
+
+def test_out_of_order_readings_merge_into_same_hour(store):
+    add(store, ("2025-05-01 10:30:00", 20.0))
+    add(store, ("2025-05-01 10:50:00", 19.0), ("2025-05-01 10:10:00", 21.0))
+    add(store, ("2025-05-01 10:20:00", 22.0))
+    # 重复的读数只计一次
+    add(store, ("2025-05-01 10:30:00", 20.0))
+
+    row = store._conn.execute(
+        "SELECT first_at, first_balance, last_at, last_balance FROM hourly_readings "
+        "WHERE meter = '101' AND hour = '2025-05-01 10'"
+    ).fetchone()
+    assert row == ("2025-05-01 10:10:00", 21.0, "2025-05-01 10:50:00", 19.0)
+    [hour] = store.hourly_series("101")
+    assert hour["balance"] == 19.0
+    assert (hour["min"], hour["max"], hour["samples"]) == (19.0, 22.0, 4)
+    assert len(store.raw_series("101")) == 4
+
+
+def test_raw_readings_expire_at_cutoff(store):
+    now = "2025-05-10 12:00:00"
+    cutoff = retention_cutoff(now, 1)
+    add(store, ("2025-05-09 11:59:59", 30.0), (cutoff, 29.0), (now, 28.0))
+
+    assert store.raw_series("101") == [(cutoff, 29.0), (now, 28.0)]
+
+
+def test_hourly_summaries_expire_by_hour(store):
+    add(store, ("2025-05-08 11:59:00", 30.0), ("2025-05-08 12:30:00", 29.0))
+    add(store, ("2025-05-10 12:00:00", 28.0))
+
+    # 截止时间 2025-05-08 12:00:00 所在的小时整体保留
+    assert [h["hour"] for h in store.hourly_series("101")] == ["2025-05-08 12", "2025-05-10 12"]
+    # 每日读数永久保留
+    assert [date for date, _ in store.daily_series("101")] == ["2025-05-08", "2025-05-10"]
+
+
+def test_reading_older_than_raw_cutoff_only_fills_missing_hour(store):
+    add(store, ("2025-05-10 12:00:00", 28.0))
+    add(store, ("2025-05-09 09:10:00", 31.0), ("2025-05-09 09:40:00", 30.5))
+
+    # 旧读数不再保存原始记录，只在该小时没有汇总时写入第一条
+    assert store.raw_series("101") == [("2025-05-10 12:00:00", 28.0)]
+    [old, _] = store.hourly_series("101")
+    assert (old["hour"], old["balance"], old["samples"]) == ("2025-05-09 09", 31.0, 1)
+
+
+def test_older_reading_does_not_overwrite_daily_balance(store):
+    add(store, ("2025-05-10 20:00:00", 20.0))
+    add(store, ("2025-05-10 13:30:00", 25.0))
+
+    assert store.daily_series("101") == [("2025-05-10", 20.0)]
+    assert store.last_updated("101") == "2025-05-10 20:00:00"
+    # 较早的读数仍计入原始读数和每小时汇总
+    assert [taken_at for taken_at, _ in store.raw_series("101")] == [
+        "2025-05-10 13:30:00", "2025-05-10 20:00:00",
+    ]
+
+    add(store, ("2025-05-10 21:00:00", 19.5))
+    assert store.daily_series("101") == [("2025-05-10", 19.5)]
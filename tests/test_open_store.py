@@ -0,0 +1,58 @@
+"""open_store：损坏的数据库改名保留并重建，被锁定的数据库不会被当作损坏"""
+
+import os
+import sqlite3
+
+import pytest
+
+from meter_balance import meter_store
+from meter_balance.meter_files import write_json
+from meter_balance.update_meter_data import open_store
+
+
+@pytest.fixture
+def paths(tmp_path):
+    json_path = str(tmp_path / "data.json")
+    write_json(json_path, {
+        "last_updated": "2025-05-02 21:00:00",
+        "daily_data": [
+            {"date": "2025-05-01", "balance": 29.49},
+            {"date": "2025-05-02", "balance": 27.09},
+        ],
+    })
+    return str(tmp_path / "meter_data.db"), json_path
+
+
+def corrupt_files(directory):
+    return [name for name in os.listdir(directory) if ".corrupt-" in name]
+
+
+def test_locked_database_is_not_quarantined(paths, tmp_path, monkeypatch):
+    store_path, json_path = paths
+    with open_store(store_path, json_path) as store:
+        store.upsert_many([("101", "2025-05-02", 50.0, "2025-05-02 21:00:00")])
+
+    monkeypatch.setattr(meter_store, "BUSY_TIMEOUT", 0.1)
+    holder = sqlite3.connect(store_path)
+    holder.execute("BEGIN EXCLUSIVE")
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            open_store(store_path, json_path)
+    finally:
+        holder.rollback()
+        holder.close()
+
+    assert corrupt_files(tmp_path) == []
+    with open_store(store_path, json_path) as store:
+        # 其他电表的数据仍在，没有从 data.json 重建
+        assert store.meters() == ["101", "default"]
+
+
+def test_corrupt_database_is_quarantined_and_rebuilt(paths, tmp_path):
+    store_path, json_path = paths
+    with open(store_path, "wb") as f:
+        f.write(b"not a database" * 100)
+
+    with open_store(store_path, json_path) as store:
+        assert store.daily_series() == [("2025-05-01", 29.49), ("2025-05-02", 27.09)]
+    assert len(corrupt_files(tmp_path)) == 1
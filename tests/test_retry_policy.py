@@ -0,0 +1,125 @@
+"""RetryPolicy 的时间预算、CircuitBreaker 的熔断与半开试探、run_hedged 取消落败的尝试"""
+
+import threading
+import types
+
+import pytest
+
+from meter_balance import retry_policy
+from meter_balance.retry_policy import (
+    AttemptCancelled,
+    CircuitBreaker,
+    FatalError,
+    RetryPolicy,
+    run_hedged,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry_policy, "time", types.SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_deadline_cuts_backoff_short(clock):
+    policy = RetryPolicy(max_attempts=5, deadline=3, base_delay=2, jitter=0)
+
+    assert policy.on_failure(1, ConnectionError("refused")) == 2
+    clock.now += 2
+    # 第二次退避需要4秒，剩余预算只有1秒
+    assert policy.on_failure(2, ConnectionError("refused")) is None
+    assert policy.stop_reason == "剩余时间预算不足以再次重试"
+    assert policy.timeout(30) == 1.0
+
+
+def test_attempts_stop_when_budget_is_spent(clock):
+    policy = RetryPolicy(max_attempts=5, deadline=10)
+    attempts = []
+    for attempt in policy.attempts():
+        attempts.append(attempt)
+        clock.now += 6
+    assert attempts == [1, 2]
+    assert policy.stop_reason == "已用完总时间预算"
+
+
+def test_fatal_error_is_not_retried(clock):
+    policy = RetryPolicy(max_attempts=5)
+    assert policy.on_failure(1, FatalError("缺少 METER_ID")) is None
+    assert policy.stop_reason.startswith("不可重试的错误")
+
+
+def test_breaker_opens_at_threshold_and_probes_after_reset(clock):
+    breaker = CircuitBreaker("gateway", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now += 60
+    assert breaker.state == "half_open"
+    # 半开状态只放行一个试探请求
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = CircuitBreaker("gateway", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_after() == 60
+
+
+def test_policy_stops_while_breaker_is_open(clock):
+    breaker = CircuitBreaker("gateway", failure_threshold=1, reset_timeout=60)
+    policy = RetryPolicy(max_attempts=3, base_delay=1, jitter=0, breaker=breaker)
+    attempts = []
+    for attempt in policy.attempts():
+        attempts.append(attempt)
+        if policy.on_failure(attempt, ConnectionError("refused")) is None:
+            break
+    assert attempts == [1]
+    assert policy.stop_reason.startswith("网关处于熔断状态")
+
+
+def test_hedged_loser_is_cancelled():
+    slow_cancelled = threading.Event()
+    slow_tokens = []
+
+    def task(index, token):
+        if index == 0:
+            slow_tokens.append(token)
+            token.on_cancel(slow_cancelled.set)
+            slow_cancelled.wait(5)
+            token.check()
+            return "slow"
+        return "fast"
+
+    assert run_hedged(task, hedge_delay=0.05) == ("fast", 1)
+    assert slow_cancelled.wait(5)
+    with pytest.raises(AttemptCancelled):
+        slow_tokens[0].check()
+
+
+def test_hedged_failure_before_hedge_is_raised():
+    def task(index, token):
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        run_hedged(task, hedge_delay=5)